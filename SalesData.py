@@ -1,387 +1,1250 @@
-###########################################################################################
-# Bruce Rhoades 11/4/2019
-#
-# Sales Data class. This class serves as a facade over the processing of customer data
-# Given a start year, end year and a region, a variety of data can be generated:
-# 1.) Customer Data grouped by State and then Date for customer types
-# 2.) Customer Data grouped by Date and then State for customer types
-# 3.) Totals for each state for customer types
-# 4.) Totals for each date for customer types
-# 5.) Annual Data relative to Goals including percentage change year over year and next
-# year's forecast
-#
-# Data exported to spreadhseet for all processes and charts displayed for some
-#
-# TODO: Add Exception Handling
-#
-# Cheers!
-###########################################################################################
-
-import matplotlib
-import matplotlib.pyplot as plt
-import numpy.random as np
-import os
-import pandas as pd
-import random
-
-class SalesData:
-    excelFileName = ''
-    region = ''
-    startYear = ''
-    endYear = ''
-
-    ############################################################################################
-    # Method to initialize the processing of data with a new region and date range
-    ############################################################################################
-    @staticmethod
-    def setYearRangeAndRegion(startYear, endYear, region='NE', NumberOfSources=4):
-        sYear = int(startYear)
-        eYear = int(endYear)
-        if(sYear < 2015 or eYear > 2018 or sYear > eYear):
-            print("Please Enter a Valid Start and End Year Between 2015 and 2018")
-            return False
-        
-        if(region not in ['NE', 'MA', 'SE']):
-            print("Please Enter a Valid Region Value of NE, MA or SE")
-            return False        
-            
-        SalesData.region = region
-        SalesData.startYear = startYear
-        SalesData.endYear = endYear
-        SalesData.excelFileName = SalesData.region + 'SalesData' + SalesData.startYear + '-' + SalesData.endYear + '.xlsx'
-
-        # create a raw data spreadsheet file if one does not already exist for date range and region
-        if(os.path.isfile(SalesData.excelFileName) == False):
-            SalesData.__generateSalesData(NumberOfSources)
-        return True
-
-    ############################################################################################   
-    # Function to mimic pulling in sales data for a requested 
-    # year range and region and outputting to spreadsheet
-    ############################################################################################
-    @staticmethod
-    def __generateSalesData(NumberOfSources):        
-        dataSet = []
-        
-        # Generate Customer Statuses
-        states = []
-        status = [1,2,3]
-
-        # Generate regions and their states
-        # lower case states to mimic inconsistent data 
-        # amonst data "sources"
-        if(SalesData.region=='NE'):
-            np.seed(111)
-            states = ['NY','NJ','PA','nj','CT']
-        elif(SalesData.region=='MA'):
-            np.seed(110)
-            states = ['DE','MD','md','VA','WV']
-        elif(SalesData.region=='SE'):
-            np.seed(112)
-            states = ['NC','nc','SC','GA','FL']
-        else:
-            print("Invalid Region Entered")
-            return
-
-        # Generate data for each data "source"
-        for i in range(NumberOfSources):
-            
-            # Create a weekly (mondays) date range
-            startRange = '1/1/' + SalesData.startYear
-            endRange = '12/31/' + SalesData.endYear
-            rng = pd.date_range(start=startRange, end=endRange, freq='W-MON')
-            
-            # Create random customer data
-            data = np.randint(low=100,high=700,size=len(rng))
-            
-            # Make a random list of statuses
-            random_status = [status[np.randint(low=0,high=len(status))] for i in range(len(rng))]
-            
-            # Make a random list of states 
-            random_states = [states[np.randint(low=0,high=len(states))] for i in range(len(rng))]
-        
-            dataSet.extend(zip(random_states, random_status, data, rng))
-
-        # export data to spreadsheet file
-        SalesData.__exportRawSalesData(dataSet)
-
-    ############################################################################################
-    # Method to Read Data from the Raw Data spreadsheet, and "Clean" by upper casing States 
-    ############################################################################################
-    @staticmethod
-    def __cleanSalesData():
-        df = pd.read_excel(SalesData.excelFileName, 0, index_col='StatusDate')
-        # some states coming in as lower case, so upper them
-        df['State'] = df.State.apply(lambda x: x.upper())
-        return df
-
-    ############################################################################################
-    # Method to export raw sales (customer) data to a spreadsheet file. This file serves as the 
-    # Main Data set to be used in the application
-    ############################################################################################
-    @staticmethod
-    def __exportRawSalesData(dataSet):
-        dataFrame = pd.DataFrame(data=dataSet, columns=['State','Status','CustomerCount','StatusDate'])
-        print("Generating Raw Data Spreadsheet file:", SalesData.excelFileName)
-        dataFrame.to_excel(SalesData.excelFileName, index=False)
-    
-    ############################################################################################
-    # Method to export the given dataFrame to a spreadheet with the given file name
-    ############################################################################################
-    @staticmethod
-    def __exportSalesData(dataFrame, fileName):
-        filename = SalesData.region + fileName + SalesData.startYear + '-' + SalesData.endYear + '.xlsx'
-        print("Generating Spreadsheet file:", filename)
-        dataFrame.to_excel(filename, index=True)
-    
-    
-    ############################################################################################
-    # Method to group Customer Data By State and then by Date.
-    # Parameter status: If not given, data for all Customer Statuses will be used
-    ############################################################################################
-    @staticmethod
-    def __groupByStateDate(status=None):
-        # get "clean" data from the raw data file
-        df = SalesData.__cleanSalesData()
-        if(status != None and status not in [1,2,3]):
-            print("Invalid Status Value")
-            return
-
-        # group the data by State and then Date
-        if(status != None):
-            mask = df['Status'] == status
-            df = df[mask]
-            del df['Status']
-            grouped = df.reset_index().groupby(['State','StatusDate']).sum()
-        else:
-            grouped = df.reset_index().groupby(['State','StatusDate','Status']).sum()
-            
-        return grouped
-
-    ############################################################################################
-    # Helper method to generate chart titles and labels given a DataFrame and a Customer Status
-    ############################################################################################
-    @staticmethod
-    def __getChartNames(df, status):
-        chartNames = []
-        if(len(df.index) > 0):
-            chartNames.append(df.index[0][0])
-            temp = chartNames[0]
-            for value in df.index:
-                if(value[0] != temp):
-                    chartNames.append(value[0])
-                    temp = value[0]
-        # Add titles
-        if('NJ' in chartNames):
-            chartTitle = 'New Customer Totals for Northeast Region'
-        elif('MD' in chartNames):
-            chartTitle = 'New Customer Totals for Middle Atlantic Region'
-        else:
-            chartTitle = 'New Customer Totals for Southeast Region'
-        
-        chartTitle = chartTitle + " (Customer Type " + str(status) + ")"
-        return chartTitle, chartNames
-
-    
-    ############################################################################################
-    # Method to export customer information to a spreadsheet and, if a status is specified, 
-    # a chart, grouped by State and then by date. 
-    # Param status to indicate which customer type to report on. If none, all 3 will be reported
-    ############################################################################################
-    @staticmethod
-    def exportGroupedByStateDate(status=None):
-        # get the data grouped by State and then Date and output to spreadsheet 
-        grouped = SalesData.__groupByStateDate(status)
-        fileName = 'GroupedByStateDate'
-        if(status != None):
-            fileName += '[Status' + str(status) + ']'
-        SalesData.__exportSalesData(grouped, fileName)
-
-        # Create graphs for each state if status is specified
-        # TODO: show graphs for multiple statuses
-        if(status != None):
-            fig, axes = plt.subplots(nrows=2, ncols=2, figsize=(20, 10))
-            fig.subplots_adjust(hspace=1.0) 
-
-            # Set chart labels and plot the chart data
-            chartTitle, chartNames = SalesData.__getChartNames(grouped, status)
-            grouped.loc[chartNames[0]]['CustomerCount'][SalesData.startYear:SalesData.endYear].fillna(method='pad').plot(ax=axes[0,0])
-            grouped.loc[chartNames[1]]['CustomerCount'][SalesData.startYear:SalesData.endYear].fillna(method='pad').plot(ax=axes[0,1]) 
-            grouped.loc[chartNames[2]]['CustomerCount'][SalesData.startYear:SalesData.endYear].fillna(method='pad').plot(ax=axes[1,0])
-            if len(chartNames) > 3:
-                grouped.loc[chartNames[3]]['CustomerCount'][SalesData.startYear:SalesData.endYear].fillna(method='pad').plot(ax=axes[1,1])
-
-            fig.suptitle(chartTitle, fontsize=16)
-            axes[0,0].set_title(chartNames[0])
-            axes[0,1].set_title(chartNames[1])
-            axes[1,0].set_title(chartNames[2])
-            if len(chartNames) < 4:
-                axes[1,1].set_title('Intentionally Left Blank')
-            else:
-                axes[1,1].set_title(chartNames[3])
-            plt.show()
-    
-    
-    ############################################################################################
-    # Method to group Customer Data By Date and then by State.
-    # Parameter status: If not given, data for all Customer Statuses will be used
-    ############################################################################################
-    @staticmethod
-    def __groupByDateState(status=None):
-        # pull in clean customer data
-        df = SalesData.__cleanSalesData()
-        if(status != None and status not in [1,2,3]):
-            print("Invalid Status Value")
-            return
-
-        # group data by Date and then State, and also Customer Status if given
-        if(status != None):
-            mask = df['Status'] == status
-            df = df[mask]
-            del df['Status']
-            grouped = df.reset_index().groupby(['StatusDate','State']).sum()
-        else:
-            grouped = df.reset_index().groupby(['StatusDate','State','Status']).sum()
-            
-        return grouped
-
-
-    ############################################################################################
-    # Method to export customer information to a spreadsheet and, if a status is specified, 
-    # a chart, grouped by Date and then by state. 
-    # Param status to indicate which customer type to report on. If none, all 3 will be reported
-    ############################################################################################
-    @staticmethod
-    def exportGroupedByDateState(status=None):
-        grouped = SalesData.__groupByDateState(status)
-        fileName = 'GroupedByDateState'
-        if(status != None):
-            fileName += '[Status' + str(status) + ']'
-
-        SalesData.__exportSalesData(grouped, fileName)
-
-
-    ############################################################################################
-    # Method to sum the number of customers relative to State
-    ############################################################################################
-    @staticmethod
-    def __countByState(status=None):
-        # group customers by state
-        df = SalesData.__groupByStateDate(status)
-        
-        # Get the count by State
-        maxByDateAndMonth = pd.DataFrame(df['CustomerCount'].groupby(df.index.get_level_values(0)).sum())
-        return maxByDateAndMonth
-
-
-    ############################################################################################
-    # Method to export customer count data by state to spreadsheet and bar chart
-    ############################################################################################
-    @staticmethod
-    def exportCountByState(status=None):
-        # get the customer counts
-        df = SalesData.__countByState(status)
-
-        # export data to spreadsheet
-        fileName = 'CountByState'
-        if(status != None):
-            fileName += '[Status' + str(status) + ']'
-
-        SalesData.__exportSalesData(df, fileName)
-
-        # plot on bar graph
-        chartTitle = "New Customer Count for " + SalesData.startYear + " - " + SalesData.endYear
-        if(status != None):
-            chartTitle = chartTitle + " (Customer Type " + str(status) + ")"
-
-        x = []
-        lenIndex = len(df.index)
-        for i in range(0, lenIndex):
-            x.append(i)
-
-        plt.bar(x, df['CustomerCount'])
-        plt.title(chartTitle)
-        plt.xticks(x, df.index)
-        plt.show()
-
-
-    ############################################################################################
-    # Method to sum the number of customers relative to Date and output maximum weekly values
-    # for each month
-    ############################################################################################
-    @staticmethod
-    def __countByDate(status=None):
-        df = SalesData.__groupByDateState(status)
-        # Get the customer count by Date
-        maxByDateAndMonth = pd.DataFrame(df['CustomerCount'].groupby(df.index.get_level_values(0)).sum())
-        
-        # Group by Year and Month
-        yearMonth = maxByDateAndMonth.groupby([lambda x: x.year, lambda x: x.month])
-
-        # What is the max customer count per Year and Month
-        maxByDateAndMonth['Max'] = yearMonth['CustomerCount'].transform(lambda x: x.max())
-        return maxByDateAndMonth
-
-    
-    ############################################################################################
-    # Method to export maximum weekly values for each month and output to spreadsheet and chart
-    ############################################################################################
-    @staticmethod
-    def exportCountByDate(status=None):
-        # get values and export to spreadsheet
-        maxed = SalesData.__countByDate(status)
-        fileName = 'MaxWeeklyCountByDate'
-        if(status != None):
-            fileName += '[Status' + str(status) + ']'
-
-        SalesData.__exportSalesData(maxed, fileName)
-
-        # plot on line graph
-        chartTitle = "Max Weekly Customer Count"
-        if(status != None):
-            chartTitle = chartTitle + " (Customer Type " + str(status) + ")"
-
-        maxed['Max'].plot(figsize=(10, 5));plt.title(chartTitle)
-        plt.show()
-    
-    
-    ############################################################################################
-    # Method to generate Goals per year, annual customer totals, pct change year over year
-    # and next year forecasts
-    ############################################################################################
-    @staticmethod
-    def annualGoals(status=None):
-        # Create the annual goal dataframe. Use higher goals for when status is None which means
-        # for all customer statuses
-        data = []
-        yearDiff = int(SalesData.endYear) - int(SalesData.startYear) + 1
-        if(status==None):
-            for i in range(0, yearDiff):
-                data.append(80000 + (i*2000))
-        else:
-            for i in range(0, yearDiff):
-                data.append(25000 + (i*5000))
-
-        startRange = '12/31/' + SalesData.startYear
-        endRange = '12/31/' + SalesData.endYear
-        idx = pd.date_range(start=startRange, end=endRange, freq='A')
-        annualGoal = pd.DataFrame(data, index=idx, columns=['AnnualGoal'])
-
-        # Generate pct change data, forecasts and output to console and spreadsheet
-        maxByDateAndMonth = SalesData.__countByDate(status)
-        del maxByDateAndMonth['Max']
-        combined = pd.concat([maxByDateAndMonth,annualGoal], axis=0, sort=False)
-        Year = combined.groupby(lambda x: x.year).sum()
-        Year['YR_PCT_Change'] = Year['CustomerCount'].pct_change(periods=1)
-        print(Year)
-        lastYear = int(SalesData.endYear)
-        print(lastYear+1, "Forecast:", ((1 + Year.loc[lastYear,'YR_PCT_Change']) * Year.loc[lastYear,'CustomerCount']))
-
-        #TODO: Output to bar chart instead of outputting to command line
-        fileName = 'AnnualGoals'
-        if(status != None):
-            fileName += '[Status' + str(status) + ']'
-
-        SalesData.__exportSalesData(Year, fileName)
-
-
+###########################################################################################
+# Bruce Rhoades 11/4/2019
+#
+# Sales Data class. This class serves as a facade over the processing of customer data
+# Given a start year, end year and a region, a variety of data can be generated:
+# 1.) Customer Data grouped by State and then Date for customer types
+# 2.) Customer Data grouped by Date and then State for customer types
+# 3.) Totals for each state for customer types
+# 4.) Totals for each date for customer types
+# 5.) Annual Data relative to Goals including percentage change year over year and next
+# year's forecast
+#
+# Data exported to spreadhseet for all processes and charts displayed for some
+#
+# TODO: Add Exception Handling
+#
+# Cheers!
+###########################################################################################
+
+import glob
+import numpy
+import numpy.random as np
+import os
+import pandas as pd
+import random
+import re
+from SalesDataCache import SalesDataCache, SalesDataCacheWriter, SalesDataResultCache
+from SalesDataCube import SalesDataCube
+from SalesDataExport import SalesDataExport, SalesDataSpreadsheetWriter
+from SalesDataInstrumentation import SalesDataInstrumentation, profiled
+from SalesDataOptions import reportMethods
+import SalesDataForecast
+import SalesDataIngest
+from SalesDataQuery import SalesDataQuery
+from SalesDataRolling import SalesDataRollingWindows
+from SalesDataStore import SalesDataStore
+import SalesDataCharts as sdc
+
+class SalesData:
+    generateChunkRows = 500000
+    streamingBytesPerRow = 128
+    maxSpreadsheetRows = 1048576
+
+    # Options a data set is generated with when setYearRangeAndRegion is not given them
+    generateOptions = {'NumberOfSources': 4, 'RowsPerWeek': 1, 'NumberOfStates': None, 'DateFrequency': 'W-MON'}
+
+    # State codes as some sources send them, and the codes they stand for. Codes not listed
+    # are upper cased
+    stateLookup = {'nj': 'NJ', 'md': 'MD', 'nc': 'NC'}
+
+    # Reports getReport returns the data of, and the methods that export them
+    reportMethods = reportMethods
+    reportTypes = list(reportMethods.keys())
+
+    ############################################################################################
+    # Each SalesData instance holds its own data set context (region, year range and raw data
+    # file), result cache and instrumentation, so several can be used side by side or in
+    # separate processes
+    ############################################################################################
+    def __init__(self):
+        self.excelFileName = ''
+        self.region = ''
+        self.startYear = ''
+        self.endYear = ''
+        self.streamingMemoryBytes = None
+        self.exportFormat = 'xlsx'
+        self.chartDirectory = None
+        self.chartFormat = 'png'
+        self.resultCache = SalesDataResultCache()
+        self.cube = None
+        self.rollups = {}
+        self.store = None
+        self.instrumentation = SalesDataInstrumentation()
+
+    ############################################################################################
+    # Method to initialize the processing of data with a new region and date range.
+    # NumberOfSources, RowsPerWeek, NumberOfStates and DateFrequency scale the generated data
+    # when the data set does not exist yet (see __generateSalesData), the ones not given
+    # taken from generateOptions. The options are kept with the data set, and an existing
+    # data set is only used with options that match the ones it was generated with. The cube
+    # and rollups of a new data set are built right away unless prepareRollups is False
+    ############################################################################################
+    def setYearRangeAndRegion(self, startYear, endYear, region='NE', NumberOfSources=None, RowsPerWeek=None,
+                              NumberOfStates=None, DateFrequency=None, prepareRollups=True):
+        sYear = int(startYear)
+        eYear = int(endYear)
+        if(sYear < 2015 or eYear > 2018 or sYear > eYear):
+            print("Please Enter a Valid Start and End Year Between 2015 and 2018")
+            return False
+        
+        if(region not in ['NE', 'MA', 'SE']):
+            print("Please Enter a Valid Region Value of NE, MA or SE")
+            return False        
+
+        options = {'NumberOfSources': NumberOfSources, 'RowsPerWeek': RowsPerWeek, 'NumberOfStates': NumberOfStates,
+                   'DateFrequency': DateFrequency}
+        options = dict((name, value) for name, value in options.items() if value != None)
+        if(any(options.get(name, 1) < 1 for name in ['NumberOfSources', 'RowsPerWeek', 'NumberOfStates'])):
+            print("Please Enter at least 1 Source, Row per Week and State")
+            return False
+        generateOptions = dict(SalesData.generateOptions)
+        generateOptions.update(options)
+
+        excelFileName = region + 'SalesData' + startYear + '-' + endYear + '.xlsx'
+        if(self.store != None):
+            dataSets = [(self.store.getPartitionDirectory(region, year), region + ' ' + str(year) + ' partition')
+                        for year in range(sYear, eYear + 1) if self.store.hasPartition(region, year)]
+        elif(os.path.isfile(excelFileName) or SalesDataCache.exists(excelFileName, region, startYear, endYear)):
+            dataSets = [(SalesDataCache.getCacheDirectory(excelFileName), excelFileName + ' data set')]
+        else:
+            dataSets = []
+        if(self.__matchesGeneratedOptions(dataSets, options) == False):
+            return False
+
+        # drop cached results when switching to a different dataset
+        if(self.region != region or self.startYear != startYear or self.endYear != endYear):
+            self.__clearCachedResults()
+
+        self.region = region
+        self.startYear = startYear
+        self.endYear = endYear
+        self.excelFileName = excelFileName
+
+        # with a partitioned store only the region's missing year partitions are created
+        if(self.store != None):
+            if(self.__preparePartitions(generateOptions, options) and prepareRollups):
+                self.__buildRollups()
+            return True
+
+        # create a raw data spreadsheet file if one does not already exist for date range and region
+        # (data sets too big for a spreadsheet only exist as a columnar cache)
+        if(os.path.isfile(self.excelFileName) == False and
+           SalesDataCache.exists(self.excelFileName, region, startYear, endYear) == False):
+            self.__clearCachedResults()
+            self.__generateSalesData(generateOptions['NumberOfSources'], generateOptions['RowsPerWeek'],
+                                     generateOptions['NumberOfStates'], generateOptions['DateFrequency'])
+            SalesDataCache.setGeneratedOptions(SalesDataCache.getCacheDirectory(self.excelFileName), generateOptions)
+            if(prepareRollups):
+                self.__buildRollups()
+        return True
+
+    ############################################################################################
+    # Helper method to check that the given (directory, name) data sets were generated with
+    # the given options. Data sets whose options are not known (such as ones that were split
+    # out of a spreadsheet or built from extracts) can not be checked, so they only match
+    # when no options are given. Prints the first option that does not match
+    ############################################################################################
+    def __matchesGeneratedOptions(self, dataSets, options):
+        for cacheDirectory, name in dataSets:
+            generated = SalesDataCache.getGeneratedOptions(cacheDirectory)
+            if(SalesData.__isGeneratedWith(generated, options)):
+                continue
+            if(generated == None):
+                print("The existing " + name + " was not generated with known options, so it can not be used "
+                      "with " + ", ".join(option + "=" + str(value) for option, value in sorted(options.items())) +
+                      ". Delete it to generate it again")
+                return False
+            option = [option for option in sorted(options) if generated.get(option) != options[option]][0]
+            print("The existing " + name + " was generated with " + option + "=" + str(generated.get(option)) +
+                  ", not " + str(options[option]) + ". Delete it to generate it again")
+            return False
+        return True
+
+    ############################################################################################
+    # Helper method to check whether a data set generated with the given options (None if
+    # they are not known) matches every option given
+    ############################################################################################
+    @staticmethod
+    def __isGeneratedWith(generated, options):
+        if(len(options) == 0):
+            return True
+        return generated != None and all(generated.get(option) == value for option, value in options.items())
+
+    ############################################################################################
+    # Method to turn streaming aggregation on or off. With a memory budget (in MB) the raw data
+    # is read and grouped in chunks sized to the budget and the partial sums are folded
+    # together, so peak memory no longer depends on the size of the raw data. None turns
+    # streaming off and loads the raw data in one go
+    ############################################################################################
+    def setStreaming(self, maxMemoryMB=None):
+        if(maxMemoryMB == None):
+            self.streamingMemoryBytes = None
+        else:
+            self.streamingMemoryBytes = int(maxMemoryMB * 1024 * 1024)
+
+    ############################################################################################
+    # Method to keep the data in a partitioned store (see SalesDataStore) in the given
+    # directory, one partition per region and year, instead of a spreadsheet per region and
+    # year range. Any year range is then assembled from the partitions of its years, which
+    # overlapping ranges share. None goes back to a spreadsheet per year range
+    ############################################################################################
+    def setStore(self, directory='SalesDataStore'):
+        self.__clearCachedResults()
+        if(directory == None):
+            self.store = None
+        else:
+            self.store = SalesDataStore(directory)
+
+    ############################################################################################
+    # Helper method to create the missing year partitions of the active region and year
+    # range. Years covered by an existing spreadsheet (or cache) of the region are split out
+    # of it, so the store holds the same data, unless it was not generated with the options
+    # given; the rest are generated a year at a time with generateOptions. Returns whether
+    # any partition was created
+    ############################################################################################
+    def __preparePartitions(self, generateOptions, options):
+        years = [year for year in range(int(self.startYear), int(self.endYear) + 1)
+                 if self.store.hasPartition(self.region, year) == False]
+        if(len(years) == 0):
+            return False
+
+        dataSetNames = glob.glob(self.region + 'SalesData*-*.xlsx') + glob.glob(self.region + 'SalesData*-*.cache')
+        for dataSetName in sorted(set(os.path.splitext(name)[0] for name in dataSetNames)):
+            match = re.match(re.escape(self.region) + r'SalesData(\d{4})-(\d{4})$', dataSetName)
+            if(match == None):
+                continue
+            startYear, endYear = match.group(1), match.group(2)
+            coveredYears = [year for year in years if int(startYear) <= year <= int(endYear)]
+            if(len(coveredYears) == 0):
+                continue
+
+            excelFileName = dataSetName + '.xlsx'
+            generated = SalesDataCache.getGeneratedOptions(SalesDataCache.getCacheDirectory(excelFileName))
+            if(SalesData.__isGeneratedWith(generated, options) == False):
+                continue
+            df = SalesDataCache.load(excelFileName, self.region, startYear, endYear)
+            if(df is None and os.path.isfile(excelFileName)):
+                df = SalesData.cleanRawSalesData(pd.read_excel(excelFileName, 0, index_col='StatusDate'))
+            if(df is None):
+                continue
+            print("Partitioning", excelFileName, "into the store for", ", ".join(str(year) for year in coveredYears))
+            with self.instrumentation.stage('partition', rows=len(df.index)):
+                self.store.importDataSet(self.region, df, coveredYears)
+            if(generated != None):
+                for year in coveredYears:
+                    SalesDataCache.setGeneratedOptions(self.store.getPartitionDirectory(self.region, year), generated)
+            years = [year for year in years if year not in coveredYears]
+
+        if(len(years) > 0):
+            self.__generateSalesData(generateOptions['NumberOfSources'], generateOptions['RowsPerWeek'],
+                                     generateOptions['NumberOfStates'], generateOptions['DateFrequency'], years)
+            for year in years:
+                SalesDataCache.setGeneratedOptions(self.store.getPartitionDirectory(self.region, year), generateOptions)
+        return True
+
+    ############################################################################################
+    # Method to load the clean data for the active data set ahead of running reports, building
+    # its columnar cache if needed. Returns the number of rows loaded
+    ############################################################################################
+    def prepareSalesData(self):
+        return len(self.__cleanSalesData().index)
+
+    ############################################################################################
+    # Method to build and keep the cube and rollups of the active data set ahead of running
+    # reports, unless they are kept already, so reports run side by side (in other
+    # processes) only ever read them
+    ############################################################################################
+    def prepareRollups(self):
+        for period in SalesDataCube.periods:
+            self.getRollup(period)
+
+    ############################################################################################
+    # Method to get the State x Date x Status cube of customer counts for the active data set.
+    # It is built in one pass over the clean data (streamed when streaming is on), kept in the
+    # columnar cache (or the store's partitions) along with its rollups, and every report is
+    # sliced out of it or one of its rollups
+    ############################################################################################
+    def getSalesDataCube(self):
+        if(self.cube == None):
+            with self.instrumentation.stage('load', source='cube') as info:
+                self.cube = self.__loadCube()
+                if(self.cube != None):
+                    info['rows'] = self.cube.totals.size
+                    info['bytesRead'] = self.__getCubeBytes()
+            if(self.cube != None):
+                self.instrumentation.count('cubeCacheHit')
+                return self.cube
+            self.instrumentation.count('cubeCacheMiss')
+
+            if(self.streamingMemoryBytes != None):
+                rows = SalesDataCache.getRows(self.excelFileName, self.region, self.startYear, self.endYear)
+                with self.instrumentation.stage('group', streaming=True) as info:
+                    grouped = self.__streamGroupedSums(['State','StatusDate','Status'])
+                    self.cube = SalesDataCube.fromGroupedSums(grouped)
+                    info['rows'] = len(grouped.index)
+            else:
+                df = self.__cleanSalesData()
+                rows = len(df.index)
+                with self.instrumentation.stage('group') as info:
+                    self.cube = SalesDataCube.fromSalesData(df)
+                    info['rows'] = rows
+
+            # keep the cube with the cache (when there is one) for the next instance to load
+            self.__saveCube(rows)
+        return self.cube
+
+    ############################################################################################
+    # Method to get the rollup of the active data set's cube to a period (see
+    # SalesDataCube.periods). Rollups are built with the cube and kept next to it, so a
+    # rollup is read on its own without loading the cube or the rows
+    ############################################################################################
+    def getRollup(self, period):
+        if(period not in SalesDataCube.periods):
+            raise ValueError("Unknown rollup period: " + str(period))
+
+        rollup = self.rollups.get(period)
+        if(rollup == None and self.cube == None):
+            with self.instrumentation.stage('load', source='rollup', period=period) as info:
+                rollup = self.__loadCube(period)
+                if(rollup != None):
+                    info['rows'] = rollup.totals.size
+                    info['bytesRead'] = self.__getCubeBytes(period)
+            if(rollup != None):
+                self.instrumentation.count('rollupCacheHit')
+            else:
+                # a cube kept before rollups were, keep them with it now
+                self.instrumentation.count('rollupCacheMiss')
+                self.getSalesDataCube()
+                self.__saveCube()
+        if(rollup == None):
+            with self.instrumentation.stage('rollup', period=period):
+                rollup = self.cube.rollup(period)
+        self.rollups[period] = rollup
+        return rollup
+
+    ############################################################################################
+    # Method to check the rollups kept for the active data set against its clean rows, each
+    # period's sums summed up from the rows again. Returns a frame with a row per period
+    # holding whether the rollup was kept, its number of State x period x Status cells, the
+    # total of the rows and of the rollup and the number of cells that do not match
+    ############################################################################################
+    def checkRollups(self):
+        df = self.scanSalesData(['State', 'Status', 'CustomerCount', 'StatusDate']).reset_index()
+        states = df['State'].astype(str).to_numpy()
+        checks = []
+        for period in SalesDataCube.periods:
+            rollup = self.__loadCube(period)
+            kept = rollup != None
+            if(kept == False):
+                rollup = self.getRollup(period)
+
+            expected = df.groupby([states, SalesDataCube.getPeriodStarts(df['StatusDate'], period), df['Status']],
+                                  observed=True)['CustomerCount'].sum()
+            actual = rollup.aggregate(['State', 'StatusDate', 'Status'])['CustomerCount']
+            actual.index = pd.MultiIndex.from_arrays([actual.index.get_level_values(0).astype(str),
+                                                      actual.index.get_level_values(1),
+                                                      actual.index.get_level_values(2)])
+            cells = pd.concat([expected, actual], axis=1, keys=['Rows', 'Rollup']).fillna(0)
+            checks.append([period, kept, len(actual.index), int(expected.sum()), int(actual.sum()),
+                           int((cells['Rows'] != cells['Rollup']).sum())])
+        return pd.DataFrame(checks, columns=['Period', 'Kept', 'Cells', 'RowsTotal', 'RollupTotal',
+                                             'Mismatches']).set_index('Period')
+
+    ############################################################################################
+    # Method to append new raw rows (State, Status, CustomerCount and StatusDate, as a column
+    # or the index), such as a new week or a new source's extract, to the active data set.
+    # Only the new rows are cleaned and written to the columnar cache, and their cube is
+    # merged into the stored cube, so the cost depends on the new rows rather than all of
+    # the history. Appended rows are kept in the columnar cache (or the store's partitions)
+    # only, the raw data spreadsheet is left as it is
+    ############################################################################################
+    def appendSalesData(self, dataFrame):
+        if(self.excelFileName == ''):
+            print("Please Set a Year Range and Region before Appending Data")
+            return False
+
+        try:
+            df = self.__validateRawSalesData(dataFrame)
+        except ValueError as e:
+            print(e)
+            return False
+
+        self.__prepareAppend()
+        with self.instrumentation.stage('append', rows=len(df.index)):
+            self.__appendCleanSalesData(SalesData.cleanRawSalesData(df))
+            self.__saveCube()
+
+        # the cached results (and clean data) no longer cover every row
+        self.resultCache.clear()
+        return True
+
+    ############################################################################################
+    # Method to ingest raw rows from several sources (see SalesDataIngest) into the active
+    # data set at once. Sources are pulled on up to threads threads and each chunk is
+    # cleaned as it arrives; the cleaned chunks wait in a queue of queueSize chunks, which
+    # holds sources back when they get ahead of the appends. A source with rows that can not
+    # be appended (see appendSalesData) stops there, keeping its earlier chunks. Prints and
+    # returns the latency and throughput of every source
+    ############################################################################################
+    def ingestSalesData(self, sources, threads=None, queueSize=8):
+        if(self.excelFileName == ''):
+            print("Please Set a Year Range and Region before Ingesting Data")
+            return None
+
+        self.__prepareAppend()
+        with self.instrumentation.stage('ingest') as info:
+            stats = SalesDataIngest.ingestSources(sources, self.__validateAndCleanRawSalesData,
+                                                  self.__appendCleanSalesData, threads, queueSize)
+            self.__saveCube()
+            info['rows'] = sum(sourceStats['rows'] for sourceStats in stats)
+        for sourceStats in stats:
+            self.instrumentation.count('ingestedRows', sourceStats['rows'])
+
+        self.resultCache.clear()
+        SalesDataIngest.printIngestStats(stats)
+        return stats
+
+    ############################################################################################
+    # Helper method to check raw rows can be appended to the active data set. Returns them
+    # with just the State, Status and CustomerCount columns and a StatusDate index, raising
+    # ValueError when they can not
+    ############################################################################################
+    def __validateRawSalesData(self, dataFrame):
+        df = dataFrame
+        if('StatusDate' in df.columns):
+            df = df.set_index('StatusDate')
+        if(any(column not in df.columns for column in ['State', 'Status', 'CustomerCount'])):
+            raise ValueError("Please Append Data with State, Status, CustomerCount and StatusDate columns")
+        df = df[['State', 'Status', 'CustomerCount']].copy()
+        df.index = pd.DatetimeIndex(df.index, name='StatusDate')
+
+        if(df.index.hasnans):
+            raise ValueError("Please Append Data with a StatusDate for every row")
+        if(df['State'].isna().any()):
+            raise ValueError("Please Append Data with a State for every row")
+        counts = pd.to_numeric(df['CustomerCount'], errors='coerce')
+        if(counts.isna().any() or (counts % 1 != 0).any()):
+            raise ValueError("Invalid Customer Count Value")
+        df['CustomerCount'] = counts.astype('int64')
+
+        if(len(df.index) > 0 and (df.index.year.min() < int(self.startYear) or df.index.year.max() > int(self.endYear))):
+            raise ValueError("Please Append Data Dated Between " + self.startYear + " and " + self.endYear)
+        if(df['Status'].isin([1,2,3]).all() == False):
+            raise ValueError("Invalid Status Value")
+        return df
+
+    def __validateAndCleanRawSalesData(self, dataFrame):
+        return SalesData.cleanRawSalesData(self.__validateRawSalesData(dataFrame))
+
+    ############################################################################################
+    # Helper methods to get the stored cube (and with it the columnar cache) in place before
+    # rows are appended, and to append cleaned rows to the data set and its cube
+    ############################################################################################
+    def __prepareAppend(self):
+        self.getSalesDataCube()
+        if(self.store == None and SalesDataCache.exists(self.excelFileName, self.region, self.startYear, self.endYear) == False):
+            self.prepareSalesData()
+
+    def __appendCleanSalesData(self, df):
+        if(self.store != None):
+            # with a store the rows go to the partitions of their years
+            self.store.append(self.region, df)
+        else:
+            SalesDataCache.append(df, self.excelFileName, self.region, self.startYear, self.endYear)
+        self.cube = self.cube.merge(SalesDataCube.fromSalesData(df))
+        self.rollups = {}
+
+    ############################################################################################
+    # Helper methods to save the cube (and its rollups) of the given number of rows, all of
+    # the rows if None, and to load the cube or its rollup to a period back. With a store they
+    # are kept in the partitions, otherwise in the columnar cache
+    ############################################################################################
+    def __saveCube(self, rows=None):
+        if(self.store != None):
+            self.store.saveCube(self.region, self.startYear, self.endYear, self.cube)
+            return
+        if(rows == None):
+            rows = SalesDataCache.getRows(self.excelFileName, self.region, self.startYear, self.endYear)
+        SalesDataCache.saveCube(self.cube, rows, self.excelFileName, self.region, self.startYear, self.endYear)
+
+    def __loadCube(self, period=None):
+        if(self.store != None):
+            return self.store.loadCube(self.region, self.startYear, self.endYear, period)
+        return SalesDataCache.loadCube(self.excelFileName, self.region, self.startYear, self.endYear, period)
+
+    ############################################################################################
+    # Helper method to get the size in bytes of the kept cube (or its rollup to a period) of
+    # the active data set, over every partition it was loaded from
+    ############################################################################################
+    def __getCubeBytes(self, period=None):
+        fileName = SalesDataCache.cubeFileName if period == None else SalesDataCache.getRollupFileName(period)
+        if(self.store != None):
+            directories = [directory for directory, meta in self.store.getPartitions(self.region, self.startYear,
+                                                                                       self.endYear)]
+        else:
+            directories = [SalesDataCache.getCacheDirectory(self.excelFileName)]
+        total = 0
+        for directory in directories:
+            path = os.path.join(directory, fileName)
+            if(os.path.isfile(path)):
+                total += os.path.getsize(path)
+        return total
+
+    ############################################################################################
+    # Helper method to build the cube and rollups of a data set just created, so they are kept
+    # with it from the start
+    ############################################################################################
+    def __buildRollups(self):
+        self.getSalesDataCube()
+
+    ############################################################################################
+    # Method to start a lazy query (see SalesDataQuery) over the active data set
+    ############################################################################################
+    def query(self):
+        return SalesDataQuery(self)
+
+    ############################################################################################
+    # Method to read just the given columns (all of them if None) of the active data set's
+    # clean rows with one of the given States and Statuses and a StatusDate between minDate
+    # and maxDate (None for any). The filters and columns are pushed down into the store or
+    # columnar cache so only the matching rows of the needed columns are read; without a
+    # cache the clean data is loaded (creating it) and filtered. StatusDate, if read, is the
+    # index
+    ############################################################################################
+    def scanSalesData(self, columns=None, states=None, statuses=None, minDate=None, maxDate=None):
+        if(columns == None):
+            columns = SalesDataCache.columns
+        with self.instrumentation.stage('load', source='scan') as info:
+            if(self.store != None):
+                df = self.store.scan(self.region, self.startYear, self.endYear, columns, states, statuses,
+                                     minDate, maxDate)
+            else:
+                df = SalesDataCache.scan(self.excelFileName, self.region, self.startYear, self.endYear, columns,
+                                         states, statuses, minDate, maxDate)
+            if(df is not None):
+                info['rows'] = len(df.index)
+        if(df is not None):
+            return df
+
+        df = self.__cleanSalesData()
+        mask = numpy.ones(len(df.index), dtype=bool)
+        if(states != None):
+            mask &= df['State'].isin([str(state) for state in states]).to_numpy()
+        if(statuses != None):
+            mask &= df['Status'].isin(list(statuses)).to_numpy()
+        if(minDate != None):
+            mask &= df.index >= pd.Timestamp(minDate)
+        if(maxDate != None):
+            mask &= df.index <= pd.Timestamp(maxDate)
+        df = df[mask]
+        if('StatusDate' not in columns):
+            df = df.reset_index(drop=True)
+        return df[[name for name in df.columns if name in columns]]
+
+    ############################################################################################
+    # Helper method to start a query of one Customer Status (all of them when None)
+    ############################################################################################
+    def __queryStatus(self, status):
+        if(status == None):
+            return self.query()
+        return self.query().where(statuses=status)
+
+    ############################################################################################
+    # Helper method to check for a valid Customer Status, None meaning all of them
+    ############################################################################################
+    def __isValidStatus(self, status):
+        if(status != None and status not in [1,2,3]):
+            print("Invalid Status Value")
+            return False
+        return True
+
+    ############################################################################################
+    # Helper method to drop the cached results, cube and rollups of the active data set
+    ############################################################################################
+    def __clearCachedResults(self):
+        self.resultCache.clear()
+        self.cube = None
+        self.rollups = {}
+
+    ############################################################################################
+    # Helper method to return the cached result of the given kind for the active dataset and
+    # status, computing and caching it on a miss. Callers get a copy so they may modify it
+    ############################################################################################
+    def __getCachedResult(self, kind, status, compute, deep=True):
+        key = (self.region, self.startYear, self.endYear, status, kind)
+        result = self.resultCache.get(key)
+        if(result is None):
+            self.instrumentation.count('resultCacheMiss')
+            result = compute()
+            if(result is None):
+                return None
+            self.resultCache.put(key, result)
+        else:
+            self.instrumentation.count('resultCacheHit')
+        return result.copy(deep=deep)
+
+    ############################################################################################   
+    # Function to mimic pulling in sales data for a requested 
+    # year range and region and outputting to spreadsheet.
+    # NumberOfSources: number of data "sources" to generate data for
+    # RowsPerWeek: rows each source produces for every date
+    # NumberOfStates: number of distinct states, padded with made up state codes when the
+    # region does not have enough. If not given, the region's states are used
+    # DateFrequency: pandas frequency of the dates, weekly on mondays by default
+    # years: the years to generate partitions of the store for, each seeded with its own year,
+    # instead of the data set's spreadsheet
+    ############################################################################################
+    def __generateSalesData(self, NumberOfSources, RowsPerWeek=1, NumberOfStates=None, DateFrequency='W-MON',
+                            years=None):
+        # Generate Customer Statuses
+        states = []
+        status = [1,2,3]
+
+        # Generate regions and their states
+        # lower case states to mimic inconsistent data 
+        # amonst data "sources"
+        if(self.region=='NE'):
+            seed = 111
+            states = ['NY','NJ','PA','nj','CT']
+        elif(self.region=='MA'):
+            seed = 110
+            states = ['DE','MD','md','VA','WV']
+        elif(self.region=='SE'):
+            seed = 112
+            states = ['NC','nc','SC','GA','FL']
+        else:
+            print("Invalid Region Entered")
+            return
+
+        if(NumberOfStates != None):
+            distinctStates = []
+            for state in states:
+                if(state.upper() not in distinctStates):
+                    distinctStates.append(state.upper())
+            keptStates = distinctStates[:NumberOfStates]
+            states = [state for state in states if state.upper() in keptStates]
+            states += [self.region + str(i).zfill(2) for i in range(len(keptStates), NumberOfStates)]
+
+        # Create the date range, weekly (mondays) unless another frequency is given
+        startRange = '1/1/' + self.startYear
+        endRange = '12/31/' + self.endYear
+        rng = pd.date_range(start=startRange, end=endRange, freq=DateFrequency)
+
+        cleanStates = [state.upper() for state in states]
+        stateCategories = sorted(set(cleanStates))
+        dtypes = {'State': 'int8' if len(stateCategories) < 128 else 'int16', 'Status': 'int8', 'CustomerCount': 'int16'}
+
+        if(years != None):
+            # one partition per year, each drawn from a seed of its own
+            for year in years:
+                yearRange = rng[rng.year == year]
+                print("Generating", self.region, year, "partition of the store:", self.store.directory)
+                with self.instrumentation.stage('generate', rows=NumberOfSources * len(yearRange) * RowsPerWeek):
+                    chunks = self.__generateSalesDataChunks([seed, year], NumberOfSources, RowsPerWeek, yearRange, states, status)
+                    cleanChunks = (SalesData.cleanRawSalesData(chunk.set_index('StatusDate')) for chunk in chunks)
+                    self.store.writePartitions(self.region, cleanChunks, stateCategories, dtypes, [year])
+            return
+
+        totalRows = NumberOfSources * len(rng) * RowsPerWeek
+        chunks = self.__generateSalesDataChunks(seed, NumberOfSources, RowsPerWeek, rng, states, status)
+
+        # export data to spreadsheet file
+        with self.instrumentation.stage('generate', rows=totalRows) as info:
+            self.__exportRawSalesData(chunks, totalRows, stateCategories, dtypes)
+            info['bytesWritten'] = self.__getDataSetBytes()
+
+    ############################################################################################
+    # Generator of the raw data, one chunk of at most generateChunkRows rows at a time. Every
+    # column of a chunk is drawn in one go from a RandomState seeded for the region, so the
+    # same parameters always produce the same data
+    ############################################################################################
+    def __generateSalesDataChunks(self, seed, NumberOfSources, RowsPerWeek, rng, states, status):
+        randomState = np.RandomState(seed)
+        states = pd.Index(states)
+        status = pd.Index(status)
+        datesPerChunk = max(1, self.generateChunkRows // RowsPerWeek)
+
+        # Generate data for each data "source"
+        for i in range(NumberOfSources):
+            for start in range(0, len(rng), datesPerChunk):
+                dates = rng[start:start + datesPerChunk]
+                size = len(dates) * RowsPerWeek
+
+                # Create random customer data, statuses and states
+                data = randomState.randint(low=100, high=700, size=size)
+                random_status = status[randomState.randint(low=0, high=len(status), size=size)]
+                random_states = states[randomState.randint(low=0, high=len(states), size=size)]
+
+                yield pd.DataFrame({'State': random_states,
+                                    'Status': random_status,
+                                    'CustomerCount': data,
+                                    'StatusDate': dates.repeat(RowsPerWeek)})
+
+    ############################################################################################
+    # Method to Read Data from the Raw Data spreadsheet, and "Clean" by upper casing States.
+    # The cleaned data is kept in a columnar cache next to the spreadsheet so only the first
+    # read after the spreadsheet changes has to parse it
+    ############################################################################################
+    def __cleanSalesData(self):
+        return self.__getCachedResult('clean', None, self.__loadCleanSalesData, deep=False)
+
+    ############################################################################################
+    # Helper method to load the cleaned data from the columnar cache or, failing that, the
+    # raw data spreadsheet
+    ############################################################################################
+    def __loadCleanSalesData(self):
+        if(self.store != None):
+            with self.instrumentation.stage('load', source='store') as info:
+                df = self.store.load(self.region, self.startYear, self.endYear)
+                info['rows'] = len(df.index)
+            return df
+
+        with self.instrumentation.stage('load', source='cache') as info:
+            df = SalesDataCache.load(self.excelFileName, self.region, self.startYear, self.endYear)
+            if(df is not None):
+                info['rows'] = len(df.index)
+                info['bytesRead'] = self.__getDataSetBytes(spreadsheet=False)
+        if(df is not None):
+            self.instrumentation.count('columnarCacheHit')
+            return df
+        self.instrumentation.count('columnarCacheMiss')
+
+        with self.instrumentation.stage('load', source='spreadsheet') as info:
+            df = pd.read_excel(self.excelFileName, 0, index_col='StatusDate')
+            info['rows'] = len(df.index)
+            info['bytesRead'] = os.path.getsize(self.excelFileName)
+        with self.instrumentation.stage('clean', rows=len(df.index)) as info:
+            info['memoryBefore'] = SalesData.getMemoryUsage(df)
+            df = SalesData.cleanRawSalesData(df)
+            info['memoryAfter'] = SalesData.getMemoryUsage(df)
+        self.instrumentation.count('cleanBytesSaved', info['memoryBefore'] - info['memoryAfter'])
+        with self.instrumentation.stage('cacheWrite', rows=len(df.index)) as info:
+            df = SalesDataCache.save(df, self.excelFileName, self.region, self.startYear, self.endYear)
+            info['bytesWritten'] = self.__getDataSetBytes(spreadsheet=False)
+        return df
+
+    ############################################################################################
+    # Helper method to get the size in bytes of the active data set's raw data spreadsheet
+    # and columnar cache (or only the cache)
+    ############################################################################################
+    def __getDataSetBytes(self, spreadsheet=True):
+        total = 0
+        if(spreadsheet and os.path.isfile(self.excelFileName)):
+            total += os.path.getsize(self.excelFileName)
+        cacheDirectory = SalesDataCache.getCacheDirectory(self.excelFileName)
+        if(os.path.isdir(cacheDirectory)):
+            for entry in os.scandir(cacheDirectory):
+                if(entry.is_file()):
+                    total += entry.stat().st_size
+        return total
+
+    ############################################################################################
+    # Method to "Clean" raw data (as read from the spreadsheet with a StatusDate index). Some
+    # states come in as lower case, so each distinct State is looked up once in stateLookup
+    # and the column becomes a categorical of the clean codes. Status becomes the smallest
+    # integer type that holds it
+    ############################################################################################
+    @staticmethod
+    def cleanRawSalesData(df):
+        codes, rawStates = pd.factorize(df['State'])
+        cleanStates = [SalesData.stateLookup.get(state, str(state).upper()) for state in rawStates]
+        categories = pd.Index(sorted(set(cleanStates)))
+        # the extra -1 at the end keeps missing States (code -1) missing
+        recode = numpy.append(categories.get_indexer(cleanStates), -1)
+        df['State'] = pd.Categorical.from_codes(recode[codes], categories=categories)
+        df['Status'] = pd.to_numeric(df['Status'], downcast='integer')
+        return df
+
+    ############################################################################################
+    # Method to get the memory a frame takes up, including the strings it points to
+    ############################################################################################
+    @staticmethod
+    def getMemoryUsage(df):
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    ############################################################################################
+    # Method to export raw sales (customer) data to a spreadsheet file. This file serves as the 
+    # Main Data set to be used in the application. Chunks are streamed to a write only spreadsheet
+    # and, cleaned, to the columnar cache so the whole data set is never held in memory.
+    # Data sets with more rows than a worksheet can hold only go to the columnar cache
+    ############################################################################################
+    def __exportRawSalesData(self, chunks, totalRows, stateCategories, dtypes):
+        workbook = None
+        if(totalRows < self.maxSpreadsheetRows):
+            print("Generating Raw Data Spreadsheet file:", self.excelFileName)
+            workbook = SalesDataSpreadsheetWriter(self.excelFileName)
+            workbook.append(['State','Status','CustomerCount','StatusDate'])
+        else:
+            print("Too many rows for a spreadsheet, generating Raw Data cache only:",
+                  SalesDataCache.getCacheDirectory(self.excelFileName))
+
+        cacheWriter = SalesDataCacheWriter(self.excelFileName, self.region, self.startYear,
+                                           self.endYear, stateCategories, dtypes)
+        for chunk in chunks:
+            if(workbook != None):
+                workbook.appendRows(zip(chunk['State'].tolist(), chunk['Status'].tolist(),
+                                        chunk['CustomerCount'].tolist(), chunk['StatusDate'].dt.to_pydatetime()))
+            cacheWriter.append(SalesData.cleanRawSalesData(chunk.set_index('StatusDate')))
+
+        # the cache is closed after the workbook is saved so it is signed with the spreadsheet
+        if(workbook != None):
+            workbook.close()
+        cacheWriter.close()
+
+    ############################################################################################
+    # Method to set the default export format of all reports: xlsx, csv, parquet, feather or
+    # none to skip writing files altogether
+    ############################################################################################
+    def setExportFormat(self, exportFormat):
+        if(SalesDataExport.isValidFormat(exportFormat) == False):
+            print("Please Enter a Valid Export Format of", ", ".join(SalesDataExport.formats))
+            return False
+        self.exportFormat = exportFormat
+        return True
+
+    ############################################################################################
+    # Method to render charts headless, saving them as png or svg files in the given directory
+    # instead of showing them on screen. A directory of None goes back to showing them, and a
+    # chartFormat of none turns charts off (so matplotlib is never imported)
+    ############################################################################################
+    def setChartOutput(self, directory=None, chartFormat='png'):
+        if(chartFormat not in sdc.chartFormats + ['none']):
+            print("Please Enter a Valid Chart Format of", ", ".join(sdc.chartFormats + ['none']))
+            return False
+        if(directory != None):
+            os.makedirs(directory, exist_ok=True)
+        self.chartDirectory = directory
+        self.chartFormat = chartFormat
+        return True
+
+    ############################################################################################
+    # Method to render the charts of several statuses at once in worker processes. Only
+    # available when charts are saved to files (see setChartOutput). Charts that do not exist
+    # for a status (grouped by state and date for all statuses) are skipped.
+    # Returns the names of the files written
+    ############################################################################################
+    def renderCharts(self, statuses=[1,2,3], charts=['groupedByStateDate', 'countByState', 'countByDate'],
+                     processes=None):
+        if(self.chartFormat == 'none'):
+            return []
+        if(self.chartDirectory == None):
+            print("Charts can only be rendered in parallel to files, see setChartOutput")
+            return []
+
+        jobs = []
+        for status in statuses:
+            for chart in charts:
+                job = self.__getChartJob(chart, status)
+                if(job != None):
+                    jobs.append(job)
+
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(sdc.renderChart, jobs))
+
+    ############################################################################################
+    # Helper method to build the job rendering the given chart for a status, or None if there
+    # is no such chart or no data for it
+    ############################################################################################
+    def __getChartJob(self, chart, status, data=None):
+        if(self.__isValidStatus(status) == False):
+            return None
+
+        statusTitle = ''
+        statusName = ''
+        if(status != None):
+            statusTitle = " (Customer Type " + str(status) + ")"
+            statusName = '[Status' + str(status) + ']'
+
+        if(chart == 'groupedByStateDate'):
+            if(status == None):
+                return None
+            if(data is None):
+                data = self.__groupByStateDate(status)
+            chartTitle, chartNames = SalesData.__getChartNames(data, status)
+            kwargs = {'grouped': data, 'chartTitle': chartTitle, 'chartNames': chartNames,
+                      'startYear': self.startYear, 'endYear': self.endYear}
+            fileName = 'GroupedByStateDate'
+        elif(chart == 'countByState'):
+            if(data is None):
+                data = self.__countByState(status)
+            chartTitle = "New Customer Count for " + self.startYear + " - " + self.endYear + statusTitle
+            kwargs = {'df': data, 'chartTitle': chartTitle}
+            fileName = 'CountByState'
+        elif(chart == 'countByDate'):
+            if(data is None):
+                data = self.__countByDate(status)
+            kwargs = {'maxed': data, 'chartTitle': "Max Weekly Customer Count" + statusTitle}
+            fileName = 'MaxWeeklyCountByDate'
+        else:
+            print("Invalid Chart Name")
+            return None
+
+        kwargs['fileName'] = None
+        if(self.chartDirectory != None):
+            fileName = self.region + fileName + statusName + self.startYear + '-' + self.endYear + '.' + self.chartFormat
+            kwargs['fileName'] = os.path.join(self.chartDirectory, fileName)
+        return (chart, kwargs)
+
+    ############################################################################################
+    # Helper method to show or save the given chart for a status and its data
+    ############################################################################################
+    def __renderChart(self, chart, status, data):
+        if(self.chartFormat == 'none'):
+            return
+        job = self.__getChartJob(chart, status, data)
+        if(job != None):
+            with self.instrumentation.stage('chart', chart=chart, status=status) as info:
+                fileName = sdc.renderChart(job)
+                if(fileName != None):
+                    info['bytesWritten'] = os.path.getsize(fileName)
+            if(fileName != None):
+                print("Generating Chart file:", fileName)
+
+    ############################################################################################
+    # Method to export the given dataFrame to a spreadheet (or the given export format, the
+    # default export format if None) with the given file name
+    ############################################################################################
+    def __exportSalesData(self, dataFrame, fileName, exportFormat=None):
+        if(exportFormat == None):
+            exportFormat = self.exportFormat
+        filename = self.region + fileName + self.startYear + '-' + self.endYear
+        with self.instrumentation.stage('export', format=exportFormat, rows=len(dataFrame.index)) as info:
+            writtenFile = SalesDataExport.exportFrame(dataFrame, filename, exportFormat, index=True)
+            if(writtenFile != None):
+                info['bytesWritten'] = os.path.getsize(writtenFile)
+    
+    
+    ############################################################################################
+    # Method to group Customer Data By State and then by Date.
+    # Parameter status: If not given, data for all Customer Statuses will be used
+    ############################################################################################
+    def __groupByStateDate(self, status=None):
+        return self.__getCachedResult('groupByStateDate', status, lambda: self.__computeGroupByStateDate(status))
+
+    def __computeGroupByStateDate(self, status):
+        if(self.__isValidStatus(status) == False):
+            return
+
+        # query the data grouped by State and then Date, and Status when no status is given
+        keys = SalesDataCube.withStatusKey(['State', 'StatusDate'], status)
+        return self.__queryStatus(status).groupBy(*keys).sum().collect()
+
+    ############################################################################################
+    # Method to sum CustomerCount by the given keys a chunk at a time. Each chunk's sums are
+    # folded into the running partial sums, which are combined whenever they grow past a
+    # chunk's worth of rows
+    ############################################################################################
+    def __streamGroupedSums(self, keys):
+        chunkRows = max(1, self.streamingMemoryBytes // self.streamingBytesPerRow)
+
+        partials = []
+        partialRows = 0
+        for df in self.__readCleanSalesDataChunks(chunkRows):
+            partial = df.reset_index().groupby(keys, observed=True).sum()
+            partials.append(partial)
+            partialRows += len(partial.index)
+            if(partialRows > chunkRows):
+                partials = [SalesData.__combinePartialSums(partials)]
+                partialRows = len(partials[0].index)
+
+        return SalesData.__combinePartialSums(partials).sort_index()
+
+    ############################################################################################
+    # Helper method to add up partial grouped sums sharing the same index levels
+    ############################################################################################
+    @staticmethod
+    def __combinePartialSums(partials):
+        if(len(partials) == 1):
+            return partials[0]
+        combined = pd.concat(partials)
+        return combined.groupby(level=list(range(combined.index.nlevels)), observed=True).sum()
+
+    ############################################################################################
+    # Generator of the clean data in chunks of at most chunkRows rows, memory mapped from the
+    # columnar cache or, without a current cache, read a row at a time from the spreadsheet
+    ############################################################################################
+    def __readCleanSalesDataChunks(self, chunkRows):
+        if(self.store != None):
+            yield from self.store.loadChunks(self.region, self.startYear, self.endYear, chunkRows)
+            return
+
+        chunks = SalesDataCache.loadChunks(self.excelFileName, self.region, self.startYear,
+                                           self.endYear, chunkRows)
+        if(chunks != None):
+            yield from chunks
+            return
+
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.excelFileName, read_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            columns = list(next(rows))
+            chunk = []
+            chunksRead = 0
+            for row in rows:
+                chunk.append(row)
+                if(len(chunk) == chunkRows):
+                    yield SalesData.cleanRawSalesData(pd.DataFrame(chunk, columns=columns).set_index('StatusDate'))
+                    chunksRead += 1
+                    chunk = []
+            if(len(chunk) > 0 or chunksRead == 0):
+                yield SalesData.cleanRawSalesData(pd.DataFrame(chunk, columns=columns).set_index('StatusDate'))
+        finally:
+            workbook.close()
+
+    ############################################################################################
+    # Helper method to generate chart titles and labels given a DataFrame and a Customer Status
+    ############################################################################################
+    @staticmethod
+    def __getChartNames(df, status):
+        chartNames = list(df.index.get_level_values(0).unique())
+        # Add titles
+        if('NJ' in chartNames):
+            chartTitle = 'New Customer Totals for Northeast Region'
+        elif('MD' in chartNames):
+            chartTitle = 'New Customer Totals for Middle Atlantic Region'
+        else:
+            chartTitle = 'New Customer Totals for Southeast Region'
+        
+        chartTitle = chartTitle + " (Customer Type " + str(status) + ")"
+        return chartTitle, chartNames
+
+    
+    ############################################################################################
+    # Method to export customer information to a spreadsheet and, if a status is specified, 
+    # a chart, grouped by State and then by date. 
+    # Param status to indicate which customer type to report on. If none, all 3 will be reported
+    # Param exportFormat overrides the default export format (see setExportFormat). Returns the data
+    ############################################################################################
+    @profiled
+    def exportGroupedByStateDate(self, status=None, exportFormat=None):
+        # get the data grouped by State and then Date and output to spreadsheet 
+        grouped = self.__groupByStateDate(status)
+        fileName = 'GroupedByStateDate'
+        if(status != None):
+            fileName += '[Status' + str(status) + ']'
+        self.__exportSalesData(grouped, fileName, exportFormat)
+
+        # Create graphs for each state if status is specified (see renderCharts for charting
+        # multiple statuses)
+        if(status != None):
+            self.__renderChart('groupedByStateDate', status, grouped)
+        return grouped
+    
+    
+    ############################################################################################
+    # Method to group Customer Data By Date and then by State.
+    # Parameter status: If not given, data for all Customer Statuses will be used
+    ############################################################################################
+    def __groupByDateState(self, status=None):
+        return self.__getCachedResult('groupByDateState', status, lambda: self.__computeGroupByDateState(status))
+
+    def __computeGroupByDateState(self, status):
+        if(self.__isValidStatus(status) == False):
+            return
+
+        # query the data grouped by Date and then State, and Status when no status is given
+        keys = SalesDataCube.withStatusKey(['StatusDate', 'State'], status)
+        return self.__queryStatus(status).groupBy(*keys).sum().collect()
+
+
+    ############################################################################################
+    # Method to export customer information to a spreadsheet and, if a status is specified, 
+    # a chart, grouped by Date and then by state. 
+    # Param status to indicate which customer type to report on. If none, all 3 will be reported
+    # Param exportFormat overrides the default export format (see setExportFormat). Returns the data
+    ############################################################################################
+    @profiled
+    def exportGroupedByDateState(self, status=None, exportFormat=None):
+        grouped = self.__groupByDateState(status)
+        fileName = 'GroupedByDateState'
+        if(status != None):
+            fileName += '[Status' + str(status) + ']'
+
+        self.__exportSalesData(grouped, fileName, exportFormat)
+        return grouped
+
+
+    ############################################################################################
+    # Method to sum the number of customers relative to State
+    ############################################################################################
+    def __countByState(self, status=None):
+        return self.__getCachedResult('countByState', status, lambda: self.__computeCountByState(status))
+
+    def __computeCountByState(self, status):
+        if(self.__isValidStatus(status) == False):
+            return
+
+        # Get the count by State
+        return self.__queryStatus(status).groupBy('State').sum().collect()
+
+
+    ############################################################################################
+    # Method to export customer count data by state to spreadsheet and bar chart
+    # Param exportFormat overrides the default export format (see setExportFormat). Returns the data
+    ############################################################################################
+    @profiled
+    def exportCountByState(self, status=None, exportFormat=None):
+        # get the customer counts
+        df = self.__countByState(status)
+
+        # export data to spreadsheet
+        fileName = 'CountByState'
+        if(status != None):
+            fileName += '[Status' + str(status) + ']'
+
+        self.__exportSalesData(df, fileName, exportFormat)
+
+        # plot on bar graph
+        self.__renderChart('countByState', status, df)
+        return df
+
+
+    ############################################################################################
+    # Method to sum the number of customers relative to Date and output maximum weekly values
+    # for each month
+    ############################################################################################
+    def __countByDate(self, status=None):
+        return self.__getCachedResult('countByDate', status, lambda: self.__computeCountByDate(status))
+
+    def __computeCountByDate(self, status):
+        if(self.__isValidStatus(status) == False):
+            return
+
+        # Get the customer count by Date and the max customer count per Year and Month
+        return SalesDataCube.addMonthlyMax(self.__queryStatus(status).groupBy('StatusDate').sum().collect())
+
+    
+    ############################################################################################
+    # Method to export maximum weekly values for each month and output to spreadsheet and chart
+    # Param exportFormat overrides the default export format (see setExportFormat). Returns the data
+    ############################################################################################
+    @profiled
+    def exportCountByDate(self, status=None, exportFormat=None):
+        # get values and export to spreadsheet
+        maxed = self.__countByDate(status)
+        fileName = 'MaxWeeklyCountByDate'
+        if(status != None):
+            fileName += '[Status' + str(status) + ']'
+
+        self.__exportSalesData(maxed, fileName, exportFormat)
+
+        # plot on line graph
+        self.__renderChart('countByDate', status, maxed)
+        return maxed
+    
+    
+    ############################################################################################
+    # Method to generate Goals per year, annual customer totals, pct change year over year
+    # and next year forecasts
+    # Param exportFormat overrides the default export format (see setExportFormat). Returns the data
+    ############################################################################################
+    @profiled
+    def annualGoals(self, status=None, exportFormat=None):
+        Year = self.__annualGoals(status)
+        if(Year is None):
+            return
+        print(Year)
+        lastYear = int(self.endYear)
+        print(lastYear+1, "Forecast:", SalesData.getNextYearForecast(Year, lastYear))
+
+        #TODO: Output to bar chart instead of outputting to command line
+        fileName = 'AnnualGoals'
+        if(status != None):
+            fileName += '[Status' + str(status) + ']'
+
+        self.__exportSalesData(Year, fileName, exportFormat)
+        return Year
+
+    ############################################################################################
+    # Method to get the annual customer totals, goals and pct change year over year
+    ############################################################################################
+    def __annualGoals(self, status=None):
+        return self.__getCachedResult('annualGoals', status, lambda: self.__computeAnnualGoals(status))
+
+    def __computeAnnualGoals(self, status):
+        if(self.__isValidStatus(status) == False):
+            return
+
+        # Create the annual goals. Use higher goals for when status is None which means for all
+        # customer statuses
+        years = numpy.arange(int(self.startYear), int(self.endYear) + 1)
+        if(status==None):
+            goals = 80000 + (years - years[0]) * 2000
+        else:
+            goals = 25000 + (years - years[0]) * 5000
+
+        # Sum the customer counts by year (from the year rollup) alongside the goals and generate
+        # pct change data
+        byYear = self.__queryStatus(status).groupBy('Year').sum().collect()
+        annual = pd.Series(byYear['CustomerCount'].to_numpy(), index=SalesDataCube.getYears(byYear.index))
+        Year = pd.DataFrame({'CustomerCount': annual.reindex(years, fill_value=0).astype('float64'),
+                             'AnnualGoal': goals.astype('float64')}, index=years)
+        Year['YR_PCT_Change'] = Year['CustomerCount'].pct_change(periods=1)
+        return Year
+
+    ############################################################################################
+    # Method to forecast the customer count of the year after lastYear from the annual goals
+    # data, growing lastYear's count by its pct change
+    ############################################################################################
+    @staticmethod
+    def getNextYearForecast(Year, lastYear):
+        history = Year.loc[:lastYear, ['CustomerCount']].T
+        return SalesDataForecast.forecast(history, 1, ['growth'])['Forecast'].iloc[0]
+
+    ############################################################################################
+    # Method to forecast the yearly customer counts of every series (each combination of the
+    # keys State and/or Status, or all rows without keys) horizons years ahead with the given
+    # models (see SalesDataForecast), all series at once. Returns a tidy frame with the series
+    # keys, Model, Horizon, Year and Forecast columns
+    ############################################################################################
+    def forecast(self, horizons=3, models=None, keys=['State', 'Status'], window=3):
+        history = self.getSalesDataCube().annualSeries(keys)
+        with self.instrumentation.stage('forecast', models=models, horizons=horizons) as info:
+            result = SalesDataForecast.forecast(history, horizons, models, window)
+            info['rows'] = len(result.index)
+        return result
+
+    ############################################################################################
+    # Method to get the trailing window sums and means of the given lengths in weeks and the
+    # week over week changes of every series (each combination of the keys State and/or
+    # Status, or all rows without keys) for every week, all in one pass (see
+    # SalesDataRolling). Returns a tidy frame with the series keys, StatusDate, CustomerCount
+    # and a column per metric
+    ############################################################################################
+    def rollingMetrics(self, windows=[4, 13, 52], keys=['State', 'Status']):
+        return self.updateRollingWindows(SalesDataRollingWindows(windows, keys))
+
+    ############################################################################################
+    # Method to feed the weeks of the active data set after the last week the given rolling
+    # windows have seen (all of them the first time) into the windows, such as the weeks just
+    # appended. Returns the metrics of those weeks only (see rollingMetrics)
+    ############################################################################################
+    def updateRollingWindows(self, rollingWindows):
+        series = self.getSalesDataCube().weeklySeries(rollingWindows.keys, rollingWindows.lastDate)
+        with self.instrumentation.stage('rolling', windows=rollingWindows.windows) as info:
+            result = rollingWindows.update(series)
+            info['rows'] = len(result.index)
+        return result
+
+    ############################################################################################
+    # Method to get the data of a report (see reportTypes) for a status without exporting or
+    # charting it. The data is cached just like the export methods' data. Returns None for an
+    # invalid status
+    ############################################################################################
+    def getReport(self, report, status=None):
+        if(report == 'groupByStateDate'):
+            return self.__groupByStateDate(status)
+        elif(report == 'groupByDateState'):
+            return self.__groupByDateState(status)
+        elif(report == 'countByState'):
+            return self.__countByState(status)
+        elif(report == 'countByDate'):
+            return self.__countByDate(status)
+        elif(report == 'annualGoals'):
+            return self.__annualGoals(status)
+        raise ValueError("Unknown report type: " + str(report))
+
+
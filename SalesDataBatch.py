@@ -0,0 +1,172 @@
+###########################################################################################
+# Sales Data Batch
+#
+# Non-interactive batch runner for SalesData reports. Takes a matrix of regions, year
+# ranges, customer statuses and report types and runs every combination on a process pool,
+# reporting how long each job took. Charts are saved as files instead of shown, so nothing
+# blocks and no display is needed.
+#
+# Jobs for the same data set share it: each data set is generated and loaded into its
+# columnar cache, and its cube and rollups are built, once up front, and the jobs for one
+# data set and status run in the same worker so later reports reuse the groupings of
+# earlier ones.
+#
+# With --store the data sets are read from a partitioned store (one partition per region
+# and year). The data sets of a region share its partitions, so they are prepared one after
+# the other while the regions are prepared in parallel.
+#
+# Example: python SalesDataBatch.py --regions NE MA --years 2015-2018 --statuses a 1
+#          --reports countByState annualGoals
+###########################################################################################
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import SalesData as sd
+from SalesDataExport import SalesDataExport
+from SalesDataOptions import parseYearRange, reportMethods
+
+############################################################################################
+# Method to run every combination of the given regions, year ranges ((startYear, endYear)
+# pairs), statuses (None for all customer types) and report types, exporting in the given
+# format and saving charts to chartDirectory, from the partitioned store in storeDirectory
+# if one is given. Returns one timing record per job (plus one
+# per data set for preparing it)
+############################################################################################
+def runBatch(regions, yearRanges, statuses, reports, processes=None, exportFormat='xlsx', chartDirectory='.',
+             storeDirectory=None):
+    for report in reports:
+        if(report not in reportMethods):
+            raise ValueError("Unknown report type: " + str(report))
+
+    dataSets = []
+    for region in regions:
+        for startYear, endYear in yearRanges:
+            if((region, str(startYear), str(endYear)) not in dataSets):
+                dataSets.append((region, str(startYear), str(endYear)))
+    uniqueStatuses = []
+    for status in statuses:
+        if(status not in uniqueStatuses):
+            uniqueStatuses.append(status)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # generate and cache each data set once before any report reads it
+        if(storeDirectory == None):
+            prepared = list(pool.map(prepareDataSet, dataSets))
+        else:
+            regionDataSets = [[dataSet for dataSet in dataSets if dataSet[0] == region] for region in set(regions)]
+            preparedByDataSet = {}
+            for regionPrepared in pool.map(prepareDataSets, regionDataSets, [storeDirectory] * len(regionDataSets)):
+                for preparation in regionPrepared:
+                    preparedByDataSet[(preparation['region'], preparation['startYear'], preparation['endYear'])] = preparation
+            prepared = [preparedByDataSet[dataSet] for dataSet in dataSets]
+        results.extend(prepared)
+
+        futures = []
+        for dataSet, preparation in zip(dataSets, prepared):
+            if(preparation['error'] != None):
+                continue
+            for status in uniqueStatuses:
+                futures.append(pool.submit(runDataSetJobs, dataSet, status, list(reports), exportFormat,
+                                              chartDirectory, storeDirectory))
+        for future in futures:
+            results.extend(future.result())
+
+    return results
+
+############################################################################################
+# Worker method to generate a data set if needed and build its columnar cache (or its
+# partitions in the store in storeDirectory) and its cube and rollups
+############################################################################################
+def prepareDataSet(dataSet, storeDirectory=None):
+    region, startYear, endYear = dataSet
+    result = {'region': region, 'startYear': startYear, 'endYear': endYear, 'status': None,
+              'report': 'prepare', 'seconds': 0.0, 'error': None}
+    start = time.perf_counter()
+    try:
+        salesData = sd.SalesData()
+        if(storeDirectory != None):
+            salesData.setStore(storeDirectory)
+        if(salesData.setYearRangeAndRegion(startYear, endYear, region) == False):
+            result['error'] = 'Invalid region or year range'
+        else:
+            salesData.prepareSalesData()
+            salesData.prepareRollups()
+    except Exception as e:
+        result['error'] = repr(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+############################################################################################
+# Worker method to prepare several data sets (of one region) one after the other
+############################################################################################
+def prepareDataSets(dataSets, storeDirectory=None):
+    return [prepareDataSet(dataSet, storeDirectory) for dataSet in dataSets]
+
+############################################################################################
+# Worker method to run the given reports for one data set and status, timing each one
+############################################################################################
+def runDataSetJobs(dataSet, status, reports, exportFormat, chartDirectory, storeDirectory=None):
+    region, startYear, endYear = dataSet
+    salesData = sd.SalesData()
+    if(storeDirectory != None):
+        salesData.setStore(storeDirectory)
+    salesData.setYearRangeAndRegion(startYear, endYear, region)
+    salesData.setExportFormat(exportFormat)
+    salesData.setChartOutput(chartDirectory)
+
+    results = []
+    for report in reports:
+        result = {'region': region, 'startYear': startYear, 'endYear': endYear, 'status': status,
+                  'report': report, 'seconds': 0.0, 'error': None}
+        start = time.perf_counter()
+        try:
+            getattr(salesData, reportMethods[report])(status)
+        except Exception as e:
+            result['error'] = repr(e)
+        result['seconds'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+############################################################################################
+# Method to print the timing records returned by runBatch as a table
+############################################################################################
+def printTimings(results):
+    print("\n%-6s %-9s %-6s %-18s %9s  %s" % ('Region', 'Years', 'Status', 'Report', 'Seconds', 'Error'))
+    for result in results:
+        status = 'all' if result['status'] == None else str(result['status'])
+        if(result['report'] == 'prepare'):
+            status = '-'
+        years = result['startYear'] + '-' + result['endYear']
+        error = '' if result['error'] == None else result['error']
+        print("%-6s %-9s %-6s %-18s %9.3f  %s" % (result['region'], years, status, result['report'],
+                                                 result['seconds'], error))
+    print("Total job seconds: %.3f" % sum(result['seconds'] for result in results))
+
+############################################################################################
+# Helper method to parse a customer status argument, a for all customer types
+############################################################################################
+def parseStatus(value):
+    if(value == 'a'):
+        return None
+    if(value not in ['1', '2', '3']):
+        raise argparse.ArgumentTypeError("Customer types are 1, 2, 3 or a for all")
+    return int(value)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run SalesData reports in batch')
+    parser.add_argument('--regions', nargs='+', default=['NE'], choices=['NE', 'MA', 'SE'])
+    parser.add_argument('--years', nargs='+', type=parseYearRange, default=[('2015', '2018')])
+    parser.add_argument('--statuses', nargs='+', type=parseStatus, default=[None])
+    parser.add_argument('--reports', nargs='+', default=list(reportMethods.keys()), choices=list(reportMethods.keys()))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--format', default='xlsx', choices=SalesDataExport.formats)
+    parser.add_argument('--charts', default='.', help='directory to save charts to')
+    parser.add_argument('--store', default=None, help='directory of a partitioned store to read the data from')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    printTimings(runBatch(args.regions, args.years, args.statuses, args.reports, args.processes, args.format,
+                          args.charts, args.store))
+    print("Wall clock seconds: %.3f" % (time.perf_counter() - start))
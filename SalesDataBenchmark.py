@@ -0,0 +1,351 @@
+###########################################################################################
+# Sales Data Benchmark
+#
+# Reproducible benchmark of the SalesData pipeline. For every combination of data size
+# (rows) and number of sources a deterministic synthetic data set is generated in its own
+# scratch directory, then each stage is timed (and, unless --no-memory is given, its peak
+# traced memory recorded) separately:
+#   generate             - setYearRangeAndRegion creating the raw spreadsheet and cache
+#   generate.rollups     - building and saving the new data set's cube and rollups, as
+#                          setYearRangeAndRegion does after generating it
+#   load                 - parsing the raw spreadsheet (skipped when it is too big for one)
+#   clean                - cleaning the parsed raw data (the memory the raw and cleaned frames
+#                          take up is recorded as well)
+#   cacheLoad            - loading the clean data from the columnar cache
+#   aggregate.cube       - building the State x Date x Status cube from the clean data
+#   aggregate.rollups    - building the cube's week, month, quarter and year rollups
+#   report.<report>      - each report with its export turned off (charts saved as png)
+#   export.<report>.<fmt> - exporting each report's data in each export format
+#   append.week          - appending one more week of rows from every source
+#
+# A second benchmark times grouping a weekly series of many years (--period-years) by month
+# and by year, with the Python functions per date the reports used to group on against the
+# integer period keys of SalesDataCube, and checks both give the same results.
+#
+# A third benchmark times startup in fresh processes (--startup-runs): importing SalesData
+# (and whether that pulled in matplotlib), the reporter's --help, and a scripted
+# countByState report of the data set in the current directory once its cache is warm.
+#
+# Results are written as JSON (with the git commit they were taken at) so runs can be
+# compared with --compare.
+#
+# Example: python SalesDataBenchmark.py --sizes 10000 1000000 --sources 4 16
+#          --output bench.json --compare bench-previous.json
+#
+# Memory tracing slows Python heavy stages down, so use --no-memory for pure timings.
+###########################################################################################
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy
+import pandas as pd
+import SalesData as sd
+from SalesDataCube import SalesDataCube
+from SalesDataExport import SalesDataExport
+
+reportMethods = list(sd.SalesData.reportMethods.values())
+
+############################################################################################
+# Method to run the benchmark for every size and source count. Returns the results dict
+############################################################################################
+def runBenchmark(sizes, sources, region='NE', startYear='2015', endYear='2018',
+                 exportFormats=['xlsx', 'csv'], traceMemory=True, workDirectory=None):
+    results = {
+        'commit': getCommit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': numpy.__version__,
+        'traceMemory': traceMemory,
+        'runs': []
+    }
+
+    scratch = tempfile.mkdtemp(prefix='SalesDataBenchmark', dir=workDirectory)
+    originalDirectory = os.getcwd()
+    try:
+        for rows in sizes:
+            for numberOfSources in sources:
+                runDirectory = os.path.join(scratch, str(rows) + 'x' + str(numberOfSources))
+                os.makedirs(runDirectory)
+                os.chdir(runDirectory)
+                try:
+                    run = benchmarkDataSet(rows, numberOfSources, region, startYear, endYear,
+                                           exportFormats, traceMemory)
+                finally:
+                    os.chdir(originalDirectory)
+                    shutil.rmtree(runDirectory, ignore_errors=True)
+                results['runs'].append(run)
+                printRun(run)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return results
+
+############################################################################################
+# Method to build every rollup of the given cube. Returns them by period
+############################################################################################
+def buildRollups(cube):
+    return dict((period, cube.rollup(period)) for period in SalesDataCube.periods)
+
+############################################################################################
+# Method to benchmark every stage for one data set. Returns the run's record
+############################################################################################
+def benchmarkDataSet(rows, numberOfSources, region, startYear, endYear, exportFormats, traceMemory):
+    dates = len(pd.date_range(start='1/1/' + startYear, end='12/31/' + endYear, freq='W-MON'))
+    rowsPerWeek = max(1, int(math.ceil(rows / float(numberOfSources * dates))))
+    run = {'requestedRows': rows, 'sources': numberOfSources, 'rowsPerWeek': rowsPerWeek,
+           'rows': numberOfSources * dates * rowsPerWeek, 'stages': {}}
+
+    salesData = sd.SalesData()
+    measureStage(run, 'generate', traceMemory, salesData.setYearRangeAndRegion, startYear, endYear,
+                 region, numberOfSources, rowsPerWeek, prepareRollups=False)
+    measureStage(run, 'generate.rollups', traceMemory, salesData.prepareRollups)
+
+    if(os.path.isfile(salesData.excelFileName)):
+        raw = measureStage(run, 'load', traceMemory, pd.read_excel, salesData.excelFileName, 0,
+                           index_col='StatusDate')
+        rawBytes = sd.SalesData.getMemoryUsage(raw)
+        clean = measureStage(run, 'clean', traceMemory, sd.SalesData.cleanRawSalesData, raw)
+        run['frameBytes'] = {'raw': rawBytes, 'clean': sd.SalesData.getMemoryUsage(clean)}
+        del raw, clean
+
+    # fresh instances so nothing is served from the in-process caches
+    salesData = sd.SalesData()
+    salesData.setYearRangeAndRegion(startYear, endYear, region)
+    measureStage(run, 'cacheLoad', traceMemory, salesData.prepareSalesData)
+    clean = salesData.scanSalesData()
+    cube = measureStage(run, 'aggregate.cube', traceMemory, SalesDataCube.fromSalesData, clean)
+    measureStage(run, 'aggregate.rollups', traceMemory, buildRollups, cube)
+    del clean, cube
+
+    reports = {}
+    for method in reportMethods:
+        salesData = sd.SalesData()
+        salesData.setYearRangeAndRegion(startYear, endYear, region)
+        salesData.prepareSalesData()
+        salesData.setChartOutput('charts')
+        reports[method] = measureStage(run, 'report.' + method, traceMemory, getattr(salesData, method),
+                                       None, 'none')
+
+    for method, frame in reports.items():
+        for exportFormat in exportFormats:
+            measureStage(run, 'export.' + method + '.' + exportFormat, traceMemory,
+                         SalesDataExport.exportFrame, frame, method, exportFormat)
+
+    # a weekly refresh: one more week of rows from every source, dated the last week
+    salesData = sd.SalesData()
+    salesData.setYearRangeAndRegion(startYear, endYear, region)
+    salesData.getSalesDataCube()
+    weekRows = numberOfSources * rowsPerWeek
+    states = reports['exportCountByState'].index.astype(str)
+    randomState = numpy.random.RandomState(dates)
+    week = pd.DataFrame({'State': states[randomState.randint(low=0, high=len(states), size=weekRows)],
+                         'Status': randomState.randint(low=1, high=4, size=weekRows),
+                         'CustomerCount': randomState.randint(low=100, high=700, size=weekRows),
+                         'StatusDate': pd.Timestamp('12/31/' + endYear)})
+    measureStage(run, 'append.week', traceMemory, salesData.appendSalesData, week)
+    return run
+
+############################################################################################
+# Method to benchmark grouping a weekly series of the given number of years by month (with
+# the maximum of each month) and by year, per date Python functions against the cube's
+# vectorized period keys. Returns the timings and whether the results matched
+############################################################################################
+def benchmarkPeriodGroupings(years, repeats=3):
+    # weekly dates from 1700, as far back as nanosecond timestamps allow for 500+ years
+    years = min(years, 560)
+    dates = pd.date_range(start='1/1/1700', end='12/31/' + str(1699 + years), freq='W-MON')
+    totals = numpy.random.RandomState(111).randint(low=100, high=700, size=len(dates))
+    cube = SalesDataCube(['NE'], dates, [1], totals.reshape(1, len(dates), 1),
+                         numpy.ones((1, len(dates), 1), dtype=bool))
+
+    # the per date versions slice the cube too, as the cube's methods do
+    def lambdaMonthlyMax():
+        maxed = cube.countByDate()
+        yearMonth = maxed.groupby([lambda x: x.year, lambda x: x.month])
+        maxed['Max'] = yearMonth['CustomerCount'].transform(lambda x: x.max())
+        return maxed
+
+    def lambdaAnnualTotals():
+        return cube.countByDate().groupby(lambda x: x.year).sum()
+
+    result = {'years': years, 'dates': len(dates), 'stages': {}}
+    pairs = [('monthlyMax', lambdaMonthlyMax, cube.monthlyMax),
+             ('annualTotals', lambdaAnnualTotals, cube.annualTotals)]
+    for name, lambdaVersion, vectorizedVersion in pairs:
+        timings = {}
+        for version, function in [('lambda', lambdaVersion), ('vectorized', vectorizedVersion)]:
+            start = time.perf_counter()
+            for i in range(repeats):
+                frame = function()
+            timings[version] = (time.perf_counter() - start) / repeats
+            timings[version + 'Frame'] = frame
+        result['stages'][name] = {'lambdaSeconds': timings['lambda'],
+                                  'vectorizedSeconds': timings['vectorized'],
+                                  'matches': timings['lambdaFrame'].equals(timings['vectorizedFrame'])}
+    return result
+
+############################################################################################
+# Method to print the period grouping benchmark as a table
+############################################################################################
+def printPeriodGroupings(periodGroupings):
+    print("\nPeriod groupings over %d years (%d weekly dates)" % (periodGroupings['years'], periodGroupings['dates']))
+    print("%-20s %10s %12s %8s %8s" % ('Grouping', 'Lambda', 'Vectorized', 'Speedup', 'Match'))
+    for name, stage in periodGroupings['stages'].items():
+        speedup = stage['lambdaSeconds'] / stage['vectorizedSeconds'] if stage['vectorizedSeconds'] > 0 else float('nan')
+        print("%-20s %10.4f %12.4f %8.1f %8s" % (name, stage['lambdaSeconds'], stage['vectorizedSeconds'],
+                                                speedup, stage['matches']))
+
+############################################################################################
+# Method to time startup in fresh Python processes, taking the fastest of runs runs of each:
+# importing SalesData, the reporter's --help and a countByState report (after one run to
+# warm the cache) of the given data set in the directory of this file. Returns the timings
+############################################################################################
+def benchmarkStartup(runs=3, region='NE', startYear='2015', endYear='2018'):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    importScript = ("import sys, time; start = time.perf_counter(); import SalesData; "
+                    "print(time.perf_counter() - start, 'matplotlib' in sys.modules)")
+    reporter = [sys.executable, 'SalesDataReporter.py']
+    commands = [
+        ('cli.help', reporter + ['--help']),
+        ('cli.countByState', reporter + ['countByState', '--region', region, '--years', startYear + '-' + endYear,
+                                         '--format', 'none'])
+    ]
+
+    result = {'runs': runs, 'importSeconds': None, 'matplotlibImported': None, 'stages': {}}
+    for i in range(runs):
+        output = subprocess.run([sys.executable, '-c', importScript], capture_output=True, text=True, cwd=directory)
+        seconds, matplotlibImported = output.stdout.split()
+        if(result['importSeconds'] == None or float(seconds) < result['importSeconds']):
+            result['importSeconds'] = float(seconds)
+        result['matplotlibImported'] = matplotlibImported == 'True'
+
+    subprocess.run(commands[1][1], capture_output=True, cwd=directory)
+    for name, command in commands:
+        times = []
+        for i in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, capture_output=True, cwd=directory)
+            times.append(time.perf_counter() - start)
+        result['stages'][name] = {'seconds': min(times)}
+    return result
+
+############################################################################################
+# Method to print the startup benchmark
+############################################################################################
+def printStartup(startup):
+    print("\nStartup (fastest of %d runs)" % startup['runs'])
+    print("%-20s %10.3f  (matplotlib imported: %s)" % ('import SalesData', startup['importSeconds'],
+                                                       startup['matplotlibImported']))
+    for name, stage in startup['stages'].items():
+        print("%-20s %10.3f" % (name, stage['seconds']))
+
+############################################################################################
+# Method to time one stage (and trace its peak memory), recording it in the run. Console
+# output of the stage is swallowed. Returns whatever the stage returned
+############################################################################################
+def measureStage(run, stageName, traceMemory, function, *args, **kwargs):
+    if(traceMemory):
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    peakBytes = None
+    if(traceMemory):
+        peakBytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    run['stages'][stageName] = {'seconds': seconds, 'peakBytes': peakBytes}
+    return result
+
+############################################################################################
+# Helper method to get the current git commit, if there is one
+############################################################################################
+def getCommit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    if(output.returncode != 0):
+        return None
+    return output.stdout.strip()
+
+############################################################################################
+# Method to print one run's stages as a table
+############################################################################################
+def printRun(run):
+    print("\n%d rows, %d sources (%d rows per week)" % (run['rows'], run['sources'], run['rowsPerWeek']))
+    print("%-45s %10s %12s" % ('Stage', 'Seconds', 'Peak MB'))
+    for stageName, stage in run['stages'].items():
+        peak = '' if stage['peakBytes'] == None else "%.1f" % (stage['peakBytes'] / 1048576.0)
+        print("%-45s %10.3f %12s" % (stageName, stage['seconds'], peak))
+    if('frameBytes' in run):
+        raw = run['frameBytes']['raw']
+        clean = run['frameBytes']['clean']
+        print("Frame memory: raw %.2f MB, clean %.2f MB (%.0f%% saved)" %
+              (raw / 1048576.0, clean / 1048576.0, 100.0 * (raw - clean) / raw if raw > 0 else 0.0))
+
+############################################################################################
+# Method to print the change in every stage's time between a previous results file and the
+# current results, for runs of the same size and source count
+############################################################################################
+def printComparison(previous, current):
+    print("\nCompared with commit", previous.get('commit'))
+    print("%-12s %-45s %10s %10s %8s" % ('Run', 'Stage', 'Before', 'After', 'Ratio'))
+    previousRuns = dict(((run['requestedRows'], run['sources']), run) for run in previous['runs'])
+    for run in current['runs']:
+        before = previousRuns.get((run['requestedRows'], run['sources']))
+        if(before == None):
+            continue
+        label = str(run['requestedRows']) + 'x' + str(run['sources'])
+        for stageName, stage in run['stages'].items():
+            if(stageName not in before['stages']):
+                continue
+            beforeSeconds = before['stages'][stageName]['seconds']
+            ratio = stage['seconds'] / beforeSeconds if beforeSeconds > 0 else float('nan')
+            print("%-12s %-45s %10.3f %10.3f %8.2f" % (label, stageName, beforeSeconds, stage['seconds'], ratio))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the SalesData pipeline')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 1000000, 10000000])
+    parser.add_argument('--sources', nargs='+', type=int, default=[4, 16])
+    parser.add_argument('--region', default='NE', choices=['NE', 'MA', 'SE'])
+    parser.add_argument('--formats', nargs='+', default=['xlsx', 'csv'], choices=SalesDataExport.formats)
+    parser.add_argument('--no-memory', action='store_true', help='do not trace memory (pure timings)')
+    parser.add_argument('--output', default='SalesDataBenchmark.json')
+    parser.add_argument('--compare', default=None, help='previous results file to compare against')
+    parser.add_argument('--work-directory', default=None, help='where to put the scratch data sets')
+    parser.add_argument('--period-years', type=int, default=500,
+                        help='years of weekly dates for the period grouping benchmark (0 to skip)')
+    parser.add_argument('--startup-runs', type=int, default=3,
+                        help='fresh processes to time startup in (0 to skip)')
+    args = parser.parse_args()
+
+    results = runBenchmark(args.sizes, args.sources, args.region, exportFormats=args.formats,
+                           traceMemory=not args.no_memory, workDirectory=args.work_directory)
+    if(args.period_years > 0):
+        results['periodGroupings'] = benchmarkPeriodGroupings(args.period_years)
+        printPeriodGroupings(results['periodGroupings'])
+    if(args.startup_runs > 0):
+        results['startup'] = benchmarkStartup(args.startup_runs, args.region)
+        printStartup(results['startup'])
+    with open(args.output, 'w') as outputFile:
+        json.dump(results, outputFile, indent=2)
+    print("\nResults written to", args.output)
+
+    if(args.compare != None):
+        with open(args.compare) as compareFile:
+            printComparison(json.load(compareFile), results)
@@ -0,0 +1,652 @@
+###########################################################################################
+# Sales Data Cache
+#
+# Persistent columnar cache of the "cleaned" raw sales data. Parsing the raw data
+# spreadsheet is by far the slowest step of every report, so the cleaned frame is kept
+# next to the spreadsheet in a <spreadsheet>.cache directory holding one binary file per
+# column plus a meta.json describing it:
+#
+#   State         - category codes (small integer) with the categories kept in meta.json
+#   Status        - small integer
+#   CustomerCount - small integer
+#   StatusDate    - int64 nanoseconds since the epoch
+#
+# The cache is keyed on region, year range and the source spreadsheet's size, mtime and
+# hash. It is thrown away when the spreadsheet changes (unless it holds appended rows, see
+# below). Warm reads memory map the columns.
+# meta.json also records the row count and the first and last StatusDate.
+#
+# New rows can be appended to a cache (see append) without touching the spreadsheet, so
+# appended rows only live in the cache. A cache with appended rows is therefore never
+# thrown away: it is kept, with a message, when its spreadsheet changes.
+#
+# The State x Date x Status cube of the data can be kept in the cache as well (cube.npz),
+# marked with the number of rows it covers, along with its week, month, quarter and year
+# rollups (rollup-<period>.npz).
+###########################################################################################
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+import numpy
+import pandas as pd
+from SalesDataCube import SalesDataCube
+
+class SalesDataCache:
+    version = 1
+    metaFileName = 'meta.json'
+    cubeFileName = 'cube.npz'
+    columns = ['State', 'Status', 'CustomerCount', 'StatusDate']
+
+    ############################################################################################
+    # Method to get the cache directory kept next to the given raw data spreadsheet
+    ############################################################################################
+    @staticmethod
+    def getCacheDirectory(excelFileName):
+        return os.path.splitext(excelFileName)[0] + '.cache'
+
+    ############################################################################################
+    # Method to load the cleaned frame for the given spreadsheet, region and year range.
+    # Returns None when there is no cache or it no longer matches the spreadsheet
+    ############################################################################################
+    @staticmethod
+    def load(excelFileName, region, startYear, endYear):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return SalesDataCache.readFrame(SalesDataCache.getCacheDirectory(excelFileName), meta)
+
+    ############################################################################################
+    # Method to read the meta of the cache in the given directory, or None if there is none
+    # or it was written by another version
+    ############################################################################################
+    @staticmethod
+    def readMeta(cacheDirectory):
+        meta = _readMeta(cacheDirectory)
+        if(meta == None or meta['version'] != SalesDataCache.version):
+            return None
+        return meta
+
+    ############################################################################################
+    # Methods to keep the options the data set cached in the given directory was generated
+    # with (see SalesData.setYearRangeAndRegion) in its meta, and to get them back (None if
+    # they are not known)
+    ############################################################################################
+    @staticmethod
+    def setGeneratedOptions(cacheDirectory, options):
+        meta = SalesDataCache.readMeta(cacheDirectory)
+        if(meta != None):
+            meta['generatedOptions'] = dict(options)
+            _writeMeta(cacheDirectory, meta)
+
+    @staticmethod
+    def getGeneratedOptions(cacheDirectory):
+        meta = SalesDataCache.readMeta(cacheDirectory)
+        if(meta == None):
+            return None
+        return meta.get('generatedOptions')
+
+    ############################################################################################
+    # Method to check whether a current cache exists for the given dataset
+    ############################################################################################
+    @staticmethod
+    def exists(excelFileName, region, startYear, endYear):
+        return SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear) != None
+
+    ############################################################################################
+    # Helper method to read the cache's meta, or None if it is missing, for another dataset or
+    # out of date
+    ############################################################################################
+    @staticmethod
+    def __getCurrentMeta(excelFileName, region, startYear, endYear):
+        cacheDirectory = SalesDataCache.getCacheDirectory(excelFileName)
+        meta = _readMeta(cacheDirectory)
+        if(meta == None):
+            return None
+
+        if(meta['version'] != SalesDataCache.version or meta['region'] != region or
+           meta['startYear'] != str(startYear) or meta['endYear'] != str(endYear)):
+            return None
+
+        if(SalesDataCache.__isCurrent(excelFileName, cacheDirectory, meta) == False):
+            return None
+        return meta
+
+    ############################################################################################
+    # Method to store a cleaned frame (StatusDate index; State, Status and CustomerCount
+    # columns) for the given spreadsheet. Returns the compact frame read back from the cache
+    ############################################################################################
+    @staticmethod
+    def save(dataFrame, excelFileName, region, startYear, endYear):
+        states = pd.Categorical(dataFrame['State'])
+        dtypes = SalesDataCache.getColumnDtypes(dataFrame, states.categories)
+        writer = SalesDataCacheWriter(excelFileName, region, startYear, endYear, list(states.categories), dtypes)
+        writer.append(dataFrame)
+        return writer.close()
+
+    ############################################################################################
+    # Method to get the smallest integer types to cache a cleaned frame's columns with, given
+    # its state categories
+    ############################################################################################
+    @staticmethod
+    def getColumnDtypes(dataFrame, stateCategories):
+        if(len(dataFrame.index) == 0):
+            return {'State': 'int8', 'Status': 'int8', 'CustomerCount': 'int16'}
+        return {'State': _getSmallestIntDtype(0, len(stateCategories)),
+                'Status': _getSmallestIntDtype(dataFrame['Status'].min(), dataFrame['Status'].max()),
+                'CustomerCount': _getSmallestIntDtype(dataFrame['CustomerCount'].min(), dataFrame['CustomerCount'].max())}
+
+    ############################################################################################
+    # Helper method to check the cache against the spreadsheet's size and mtime, falling
+    # back to its hash when only the mtime moved (e.g. the file was copied or touched).
+    # A cache written without a spreadsheet (too many rows for one) stays current until a
+    # spreadsheet shows up. A cache holding appended rows is the only copy of them, so it
+    # is kept (saying so) rather than thrown away when the spreadsheet changes
+    ############################################################################################
+    @staticmethod
+    def __isCurrent(excelFileName, cacheDirectory, meta):
+        if(SalesDataCache.__matchesSource(excelFileName, cacheDirectory, meta)):
+            return True
+        if(meta.get('appendedRows', 0) > 0):
+            if(cacheDirectory not in _keptCacheDirectories):
+                _keptCacheDirectories.add(cacheDirectory)
+                print("Keeping", cacheDirectory, "with", meta['appendedRows'], "appended rows that are not in",
+                      excelFileName + ", which has changed. Delete the cache to rebuild it from the spreadsheet")
+            return True
+        return False
+
+    @staticmethod
+    def __matchesSource(excelFileName, cacheDirectory, meta):
+        source = meta['source']
+        if(source == None):
+            return os.path.isfile(excelFileName) == False
+
+        if(os.path.isfile(excelFileName) == False):
+            return False
+
+        signature = _getSourceSignature(excelFileName, False)
+        if(signature['size'] != source['size']):
+            return False
+        if(signature['mtime_ns'] == source['mtime_ns']):
+            return True
+
+        signature = _getSourceSignature(excelFileName, True)
+        if(signature['sha1'] != source['sha1']):
+            return False
+
+        # same content, so remember the new mtime to keep later checks cheap
+        meta['source'] = signature
+        _writeMeta(cacheDirectory, meta)
+        return True
+
+    ############################################################################################
+    # Method to append cleaned rows (StatusDate index; State, Status and CustomerCount
+    # columns) to the current cache of the given dataset, writing only the new rows. A State
+    # the cache has not seen yet, or a value too big for a column's type, makes the affected
+    # column be rewritten once. Returns the number of rows in the cache, or None if there is
+    # no current cache
+    ############################################################################################
+    @staticmethod
+    def append(dataFrame, excelFileName, region, startYear, endYear):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return SalesDataCache.appendToDirectory(dataFrame, SalesDataCache.getCacheDirectory(excelFileName), meta)
+
+    ############################################################################################
+    # Method to append cleaned rows to the cache in the given directory, described by meta
+    # (which is updated). Raises ValueError, leaving the cache as it was, for rows that can
+    # not be stored. Returns the number of rows in the cache
+    ############################################################################################
+    @staticmethod
+    def appendToDirectory(dataFrame, cacheDirectory, meta):
+        # work out the state categories and column types first, so rows that can not be
+        # stored are turned away before anything on disk changes. States the cache has not
+        # seen yet are sorted in with the others, renumbering the codes
+        stateCategories = meta['stateCategories']
+        dtypes = dict(meta['dtypes'])
+        newStates = set(str(state) for state in dataFrame['State'].dropna().unique()) - set(stateCategories)
+        if(len(newStates) > 0):
+            stateCategories = sorted(set(stateCategories) | newStates)
+            dtypes['State'] = _getSmallestIntDtype(0, len(stateCategories))
+        for name in ['Status', 'CustomerCount']:
+            if(len(dataFrame.index) == 0):
+                break
+            info = numpy.iinfo(numpy.dtype(dtypes[name]))
+            low = dataFrame[name].min()
+            high = dataFrame[name].max()
+            if(low < info.min or high > info.max):
+                dtypes[name] = _getSmallestIntDtype(min(low, 0), max(high, info.max + 1))
+        columnData = _getColumnData(dataFrame, stateCategories)
+
+        # a column whose codes or type change is written whole to a new file, and meta.json
+        # switches to the new files in one step once every column is written. The other
+        # columns get the new rows added at the end; anything past the rows in meta is left
+        # over from an append that did not finish
+        newMeta = json.loads(json.dumps(meta))
+        oldPaths = []
+        existing = SalesDataCache.__mapColumns(cacheDirectory, meta)
+        for name in SalesDataCache.columns:
+            dtype = numpy.dtype(dtypes[name])
+            if((name == 'State' and len(newStates) > 0) or dtype != numpy.dtype(meta['dtypes'][name])):
+                values = existing[name]
+                if(name == 'State' and len(values) > 0):
+                    values = numpy.asarray(pd.Index(stateCategories).get_indexer(meta['stateCategories']))[values]
+                fileDescriptor, columnPath = tempfile.mkstemp(suffix='.bin', prefix=name + '-', dir=cacheDirectory)
+                with os.fdopen(fileDescriptor, 'wb') as columnFile:
+                    numpy.ascontiguousarray(values, dtype=dtype).tofile(columnFile)
+                    numpy.ascontiguousarray(columnData[name], dtype=dtype).tofile(columnFile)
+                oldPaths.append(_getColumnPath(cacheDirectory, meta, name))
+                newMeta.setdefault('columnFiles', {})[name] = os.path.basename(columnPath)
+            else:
+                with open(_getColumnPath(cacheDirectory, meta, name), 'r+b') as columnFile:
+                    columnFile.truncate(meta['rows'] * dtype.itemsize)
+                    columnFile.seek(0, os.SEEK_END)
+                    numpy.ascontiguousarray(columnData[name], dtype=dtype).tofile(columnFile)
+        del existing
+
+        newMeta['stateCategories'] = stateCategories
+        newMeta['dtypes'] = dict((name, numpy.dtype(dtype).str) for name, dtype in dtypes.items())
+        newMeta['rows'] += len(dataFrame.index)
+        newMeta['appendedRows'] = newMeta.get('appendedRows', 0) + len(dataFrame.index)
+        if(len(dataFrame.index) > 0):
+            _updateDateRange(newMeta, columnData['StatusDate'])
+        _writeMeta(cacheDirectory, newMeta)
+        for oldPath in oldPaths:
+            os.remove(oldPath)
+
+        meta.clear()
+        meta.update(newMeta)
+        return meta['rows']
+
+    ############################################################################################
+    # Method to keep the State x Date x Status cube of the given dataset, and its rollups, in
+    # its cache marked with the number of rows it was built from. Returns False if there is
+    # no current cache
+    ############################################################################################
+    @staticmethod
+    def saveCube(cube, rows, excelFileName, region, startYear, endYear):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None or meta['rows'] != rows):
+            return False
+        SalesDataCache.saveCubeToDirectory(cube, SalesDataCache.getCacheDirectory(excelFileName), meta)
+        return True
+
+    ############################################################################################
+    # Method to load the cube kept in the given dataset's cache, or its rollup to a period
+    # (see SalesDataCube.periods). Returns None if there is no current cache or its cube does
+    # not cover every row
+    ############################################################################################
+    @staticmethod
+    def loadCube(excelFileName, region, startYear, endYear, period=None):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return SalesDataCache.loadCubeFromDirectory(SalesDataCache.getCacheDirectory(excelFileName), meta, period)
+
+    ############################################################################################
+    # Methods to save a cube of all the rows of the cache in the given directory along with
+    # its rollup to every period (rollup-<period>.npz), and to load the cube or one of its
+    # rollups back. The rollups are small, so reports of whole months, quarters or years
+    # read one of them instead of the cube or the rows
+    ############################################################################################
+    @staticmethod
+    def saveCubeToDirectory(cube, cacheDirectory, meta):
+        cube.save(os.path.join(cacheDirectory, SalesDataCache.cubeFileName))
+        for period in SalesDataCube.periods:
+            cube.rollup(period).save(os.path.join(cacheDirectory, SalesDataCache.getRollupFileName(period)))
+        meta['cubeRows'] = meta['rows']
+        _writeMeta(cacheDirectory, meta)
+
+    @staticmethod
+    def loadCubeFromDirectory(cacheDirectory, meta, period=None):
+        if(meta.get('cubeRows') != meta['rows']):
+            return None
+        fileName = SalesDataCache.cubeFileName if period == None else SalesDataCache.getRollupFileName(period)
+        cubePath = os.path.join(cacheDirectory, fileName)
+        if(os.path.isfile(cubePath) == False):
+            return None
+        return SalesDataCube.load(cubePath)
+
+    @staticmethod
+    def getRollupFileName(period):
+        if(period not in SalesDataCube.periods):
+            raise ValueError("Unknown rollup period: " + str(period))
+        return 'rollup-' + period + '.npz'
+
+    ############################################################################################
+    # Method to get the number of rows in the current cache of the given dataset, or None if
+    # there is none
+    ############################################################################################
+    @staticmethod
+    def getRows(excelFileName, region, startYear, endYear):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return meta['rows']
+
+    ############################################################################################
+    # Method to get a generator of the cleaned frame in chunks of at most chunkRows rows, or
+    # None if there is no current cache. Only one chunk of the columns is paged in at a time
+    ############################################################################################
+    @staticmethod
+    def loadChunks(excelFileName, region, startYear, endYear, chunkRows):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return SalesDataCache.readChunks(SalesDataCache.getCacheDirectory(excelFileName), meta, chunkRows)
+
+    ############################################################################################
+    # Method to memory map the cached columns and build the cleaned frame from them
+    ############################################################################################
+    @staticmethod
+    def readFrame(cacheDirectory, meta):
+        columnData = SalesDataCache.__mapColumns(cacheDirectory, meta)
+        return SalesDataCache.__buildFrame(columnData, meta)
+
+    ############################################################################################
+    # Generator of the cleaned frame in chunks of at most chunkRows rows. Always yields at
+    # least one (possibly empty) chunk
+    ############################################################################################
+    @staticmethod
+    def readChunks(cacheDirectory, meta, chunkRows):
+        columnData = SalesDataCache.__mapColumns(cacheDirectory, meta)
+        yield SalesDataCache.__buildFrame(columnData, meta, slice(0, chunkRows))
+        for start in range(chunkRows, meta['rows'], chunkRows):
+            yield SalesDataCache.__buildFrame(columnData, meta, slice(start, start + chunkRows))
+
+    ############################################################################################
+    # Method to read just the given columns of the rows with one of the given States and
+    # Statuses and a StatusDate between minDate and maxDate (None for any) from the current
+    # cache of a dataset. Returns None if there is no current cache
+    ############################################################################################
+    @staticmethod
+    def scan(excelFileName, region, startYear, endYear, columns, states=None, statuses=None, minDate=None, maxDate=None):
+        meta = SalesDataCache.__getCurrentMeta(excelFileName, region, startYear, endYear)
+        if(meta == None):
+            return None
+        return SalesDataCache.scanDirectory(SalesDataCache.getCacheDirectory(excelFileName), meta, columns,
+                                            states, statuses, minDate, maxDate)
+
+    ############################################################################################
+    # Method to scan the cache in the given directory (see scan). The filters are applied to
+    # the stored codes before any frame is built, and a column that is neither read nor
+    # filtered on is never paged in. StatusDate, if read, is the index
+    ############################################################################################
+    @staticmethod
+    def scanDirectory(cacheDirectory, meta, columns, states=None, statuses=None, minDate=None, maxDate=None):
+        filters = [('State', states), ('Status', statuses), ('StatusDate', minDate), ('StatusDate', maxDate)]
+        mappedColumns = set(columns) | set(name for name, value in filters if value is not None)
+        columnData = SalesDataCache.__mapColumns(cacheDirectory, meta, mappedColumns)
+
+        mask = numpy.ones(meta['rows'], dtype=bool)
+        if(states != None):
+            codes = pd.Index(meta['stateCategories']).get_indexer([str(state) for state in states])
+            mask &= numpy.isin(columnData['State'], codes[codes >= 0])
+        if(statuses != None):
+            mask &= numpy.isin(columnData['Status'], list(statuses))
+        if(minDate != None):
+            mask &= columnData['StatusDate'] >= pd.Timestamp(minDate).value
+        if(maxDate != None):
+            mask &= columnData['StatusDate'] <= pd.Timestamp(maxDate).value
+
+        rows = slice(None) if mask.all() else numpy.flatnonzero(mask)
+        return SalesDataCache.__buildFrame(columnData, meta, rows, columns)
+
+    ############################################################################################
+    # Helper method to memory map each cached column (or just the given ones)
+    ############################################################################################
+    @staticmethod
+    def __mapColumns(cacheDirectory, meta, columns=None):
+        rows = meta['rows']
+        columnData = {}
+        for name in SalesDataCache.columns:
+            if(columns != None and name not in columns):
+                continue
+            dtype = numpy.dtype(meta['dtypes'][name])
+            if(rows == 0):
+                columnData[name] = numpy.empty(0, dtype=dtype)
+            else:
+                columnData[name] = numpy.memmap(_getColumnPath(cacheDirectory, meta, name),
+                                                dtype=dtype, mode='r', shape=(rows,))
+        return columnData
+
+    ############################################################################################
+    # Helper method to build the cleaned frame (or just the given columns of it) from the
+    # given rows (a slice or positions) of the mapped columns
+    ############################################################################################
+    @staticmethod
+    def __buildFrame(columnData, meta, rows=slice(None), columns=None):
+        if(columns == None):
+            columns = SalesDataCache.columns
+        data = {}
+        if('State' in columns):
+            data['State'] = pd.Categorical.from_codes(columnData['State'][rows], categories=meta['stateCategories'])
+        for name in ['Status', 'CustomerCount']:
+            if(name in columns):
+                data[name] = columnData[name][rows]
+
+        index = None
+        if('StatusDate' in columns):
+            index = pd.DatetimeIndex(columnData['StatusDate'][rows].view('datetime64[ns]'), name='StatusDate')
+        df = pd.DataFrame(data, index=index)
+        return df
+
+
+###########################################################################################
+# Writer that builds a cache a chunk at a time, so data sets bigger than memory can be
+# cached straight from wherever they are produced. State categories and column dtypes
+# have to be known up front; StatusDate is always int64 nanoseconds. The cache goes next to
+# the spreadsheet unless another cacheDirectory is given (excelFileName may then be None)
+###########################################################################################
+class SalesDataCacheWriter:
+
+    def __init__(self, excelFileName, region, startYear, endYear, stateCategories, dtypes, cacheDirectory=None):
+        self.excelFileName = excelFileName
+        self.cacheDirectory = cacheDirectory
+        if(cacheDirectory == None):
+            self.cacheDirectory = SalesDataCache.getCacheDirectory(excelFileName)
+        self.stateCategories = [str(state) for state in stateCategories]
+        self.dtypes = dict(dtypes)
+        self.dtypes['StatusDate'] = 'int64'
+        self.rows = 0
+        self.meta = {
+            'version': SalesDataCache.version,
+            'region': region,
+            'startYear': str(startYear),
+            'endYear': str(endYear),
+            'minDate': None,
+            'maxDate': None
+        }
+        os.makedirs(self.cacheDirectory, exist_ok=True)
+
+        # drop the old meta first so a half written cache is never picked up, along with the
+        # column files appends to the old cache rewrote
+        oldMeta = _readMeta(self.cacheDirectory)
+        metaPath = os.path.join(self.cacheDirectory, SalesDataCache.metaFileName)
+        if(os.path.isfile(metaPath)):
+            os.remove(metaPath)
+        if(oldMeta != None):
+            for fileName in oldMeta.get('columnFiles', {}).values():
+                if(os.path.isfile(os.path.join(self.cacheDirectory, fileName))):
+                    os.remove(os.path.join(self.cacheDirectory, fileName))
+
+        self.__files = {}
+        for name in SalesDataCache.columns:
+            self.__files[name] = open(os.path.join(self.cacheDirectory, name + '.bin'), 'wb')
+
+    ############################################################################################
+    # Method to append a cleaned chunk (StatusDate index; State, Status and CustomerCount
+    # columns) to the cache
+    ############################################################################################
+    def append(self, dataFrame):
+        columnData = _getColumnData(dataFrame, self.stateCategories)
+        for name in SalesDataCache.columns:
+            numpy.ascontiguousarray(columnData[name], dtype=self.dtypes[name]).tofile(self.__files[name])
+        self.rows += len(dataFrame.index)
+        if(len(dataFrame.index) > 0):
+            _updateDateRange(self.meta, columnData['StatusDate'])
+
+    ############################################################################################
+    # Method to finish the cache, signing it with the spreadsheet if there is one. Returns
+    # the cleaned frame memory mapped from the cache
+    ############################################################################################
+    def close(self):
+        for columnFile in self.__files.values():
+            columnFile.close()
+
+        self.meta['rows'] = self.rows
+        self.meta['dtypes'] = dict((name, numpy.dtype(dtype).str) for name, dtype in self.dtypes.items())
+        self.meta['stateCategories'] = self.stateCategories
+        self.meta['source'] = None
+        if(self.excelFileName != None and os.path.isfile(self.excelFileName)):
+            self.meta['source'] = _getSourceSignature(self.excelFileName, True)
+        _writeMeta(self.cacheDirectory, self.meta)
+
+        return SalesDataCache.readFrame(self.cacheDirectory, self.meta)
+
+
+# caches kept for their appended rows after their spreadsheet changed, said once each
+_keptCacheDirectories = set()
+
+############################################################################################
+# Helper to get the column arrays to store for a cleaned frame, with States as codes of the
+# given categories
+############################################################################################
+def _getColumnData(dataFrame, stateCategories):
+    states = pd.Categorical(dataFrame['State'], categories=stateCategories)
+    if((states.codes < 0).any()):
+        raise ValueError("State values outside of the cache's state categories")
+
+    return {
+        'State': states.codes,
+        'Status': dataFrame['Status'].values,
+        'CustomerCount': dataFrame['CustomerCount'].values,
+        'StatusDate': pd.DatetimeIndex(dataFrame.index).values.astype('datetime64[ns]').view('int64')
+    }
+
+############################################################################################
+# Helper to widen the minDate and maxDate (int64 nanoseconds) kept in a cache's meta to
+# cover the given dates
+############################################################################################
+def _updateDateRange(meta, dates):
+    low = int(dates.min())
+    high = int(dates.max())
+    if(meta.get('minDate') == None or low < meta['minDate']):
+        meta['minDate'] = low
+    if(meta.get('maxDate') == None or high > meta['maxDate']):
+        meta['maxDate'] = high
+
+############################################################################################
+# Helper to build the size/mtime (and optionally hash) signature of a file
+############################################################################################
+def _getSourceSignature(fileName, withHash):
+    stat = os.stat(fileName)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': None}
+    if(withHash):
+        sha1 = hashlib.sha1()
+        with open(fileName, 'rb') as sourceFile:
+            for block in iter(lambda: sourceFile.read(1 << 20), b''):
+                sha1.update(block)
+        signature['sha1'] = sha1.hexdigest()
+    return signature
+
+############################################################################################
+# Helpers to read and write a cache's meta.json
+############################################################################################
+def _readMeta(cacheDirectory):
+    metaPath = os.path.join(cacheDirectory, SalesDataCache.metaFileName)
+    if(os.path.isfile(metaPath) == False):
+        return None
+    try:
+        with open(metaPath) as metaFile:
+            return json.load(metaFile)
+    except ValueError:
+        return None
+
+def _writeMeta(cacheDirectory, meta):
+    metaPath = os.path.join(cacheDirectory, SalesDataCache.metaFileName)
+    fileDescriptor, tempPath = tempfile.mkstemp(suffix='.tmp', prefix='meta-', dir=cacheDirectory)
+    with os.fdopen(fileDescriptor, 'w') as metaFile:
+        json.dump(meta, metaFile)
+    os.replace(tempPath, metaPath)
+
+############################################################################################
+# Helper to get the path of a cached column's file. Columns rewritten by an append live in
+# the file meta names for them, the rest in <column>.bin
+############################################################################################
+def _getColumnPath(cacheDirectory, meta, name):
+    return os.path.join(cacheDirectory, meta.get('columnFiles', {}).get(name, name + '.bin'))
+
+############################################################################################
+# Helper to get the smallest signed integer type holding values from low to high
+############################################################################################
+def _getSmallestIntDtype(low, high):
+    for dtype in ['int8', 'int16', 'int32']:
+        info = numpy.iinfo(dtype)
+        if(low >= info.min and high <= info.max):
+            return dtype
+    return 'int64'
+
+
+###########################################################################################
+# In-process LRU cache of loaded and grouped frames. Entries are evicted least recently
+# used first once the total size of the cached frames goes over maxBytes
+###########################################################################################
+class SalesDataResultCache:
+
+    def __init__(self, maxBytes=256 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+
+    ############################################################################################
+    # Method to get a cached frame, or None if the key is not cached
+    ############################################################################################
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if(entry is None):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    ############################################################################################
+    # Method to cache a frame, evicting the least recently used ones to stay under maxBytes.
+    # Frames bigger than maxBytes on their own are not cached
+    ############################################################################################
+    def put(self, key, dataFrame):
+        self.remove(key)
+        size = int(dataFrame.memory_usage(index=True, deep=True).sum())
+        if(size > self.maxBytes):
+            return
+
+        self.__entries[key] = (dataFrame, size)
+        self.totalBytes += size
+        while(self.totalBytes > self.maxBytes):
+            evictedKey, evicted = self.__entries.popitem(last=False)
+            self.totalBytes -= evicted[1]
+
+    ############################################################################################
+    # Method to drop a single cached frame
+    ############################################################################################
+    def remove(self, key):
+        entry = self.__entries.pop(key, None)
+        if(entry is not None):
+            self.totalBytes -= entry[1]
+
+    ############################################################################################
+    # Method to drop every cached frame
+    ############################################################################################
+    def clear(self):
+        self.__entries.clear()
+        self.totalBytes = 0
+
+    def __len__(self):
+        return len(self.__entries)
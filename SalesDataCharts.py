@@ -0,0 +1,104 @@
+###########################################################################################
+# Sales Data Charts
+#
+# Chart rendering for the SalesData reports. Each chart is described by a job (the chart's
+# name plus the keyword arguments of its plot function) so it can be rendered in this
+# process or handed to a worker process.
+#
+# Without a file name a chart is shown on screen with pyplot (which blocks until the window
+# is closed). With a file name it is drawn on a stand alone Agg figure and saved as PNG or
+# SVG, which needs no display and leaves no figure open.
+#
+# matplotlib is only imported once a chart is drawn, so importing this module (and
+# SalesData) stays cheap for runs that never chart.
+###########################################################################################
+
+import math
+
+chartFormats = ['png', 'svg']
+
+############################################################################################
+# Method to render a chart job, a (chart name, keyword arguments) pair. Returns the file
+# the chart was saved to, or None when it was shown on screen
+############################################################################################
+def renderChart(job):
+    chartName, kwargs = job
+    return chartFunctions[chartName](**kwargs)
+
+############################################################################################
+# Method to plot the weekly customer counts of every state on its own axes, on a grid sized
+# to the number of states
+############################################################################################
+def plotGroupedByStateDate(grouped, chartTitle, chartNames, startYear, endYear, fileName=None):
+    columns = max(1, int(math.ceil(math.sqrt(len(chartNames)))))
+    rows = max(1, int(math.ceil(len(chartNames) / float(columns))))
+    fig, axes = newFigure(fileName, nrows=rows, ncols=columns, figsize=(10 * columns, 5 * rows), squeeze=False)
+    fig.subplots_adjust(hspace=1.0)
+
+    # Set chart labels and plot the chart data
+    axes = axes.flatten()
+    for position, chartName in enumerate(chartNames):
+        grouped.loc[chartName]['CustomerCount'][startYear:endYear].ffill().plot(ax=axes[position])
+        axes[position].set_title(chartName)
+    for position in range(len(chartNames), len(axes)):
+        axes[position].set_title('Intentionally Left Blank')
+
+    fig.suptitle(chartTitle, fontsize=16)
+    return finishFigure(fig, fileName)
+
+############################################################################################
+# Method to plot customer counts by state on a bar chart
+############################################################################################
+def plotCountByState(df, chartTitle, fileName=None):
+    fig, ax = newFigure(fileName)
+    x = list(range(0, len(df.index)))
+    ax.bar(x, df['CustomerCount'])
+    ax.set_title(chartTitle)
+    ax.set_xticks(x)
+    ax.set_xticklabels([str(label) for label in df.index])
+    return finishFigure(fig, fileName)
+
+############################################################################################
+# Method to plot the maximum weekly customer counts of each month on a line graph
+############################################################################################
+def plotCountByDate(maxed, chartTitle, fileName=None):
+    fig, ax = newFigure(fileName, figsize=(10, 5))
+    maxed['Max'].plot(ax=ax)
+    ax.set_title(chartTitle)
+    return finishFigure(fig, fileName)
+
+############################################################################################
+# Helper method to create a figure and its axes: a stand alone Agg figure when saving to a
+# file, a pyplot figure when showing on screen
+############################################################################################
+def newFigure(fileName, **kwargs):
+    if(fileName == None):
+        import matplotlib.pyplot as plt
+        return plt.subplots(**kwargs)
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figsize = kwargs.pop('figsize', None)
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(**kwargs)
+
+############################################################################################
+# Helper method to save the figure to its file, or show it on screen when there is none
+############################################################################################
+def finishFigure(fig, fileName):
+    if(fileName == None):
+        import matplotlib.pyplot as plt
+        plt.show()
+        return None
+
+    fig.savefig(fileName)
+    fig.clear()
+    return fileName
+
+chartFunctions = {
+    'groupedByStateDate': plotGroupedByStateDate,
+    'countByState': plotCountByState,
+    'countByDate': plotCountByDate
+}
@@ -0,0 +1,381 @@
+###########################################################################################
+# Sales Data Cube
+#
+# Dense State x Date x Status cube of customer counts built in a single pass over the
+# clean data. Every SalesData report is a slice or reduction of the cube:
+# 1.) Customer Data grouped by State and then Date (optionally for one status)
+# 2.) Customer Data grouped by Date and then State (optionally for one status)
+# 3.) Totals for each state
+# 4.) Totals for each date, and the maximum weekly total of each month
+# 5.) Totals for each year
+# 6.) Yearly or weekly totals of each State and/or Status series, for forecasts and rolling
+#     metrics
+# 7.) Rollups of the cube to week, month, quarter or year periods, each a (much smaller)
+#     cube of its own with the period start as the date
+#
+# Alongside the sums the cube keeps which State/Date/Status cells had any rows, so the
+# grouped reports list exactly the combinations found in the data, as a groupby would.
+# Cubes of new rows can be merged into an existing cube, and cubes saved to and loaded from
+# a file.
+###########################################################################################
+
+import numpy
+import os
+import pandas as pd
+import tempfile
+from SalesDataOptions import seriesKeys
+
+class SalesDataCube:
+    axisNames = ['State', 'StatusDate', 'Status']
+
+    # Periods the cube can be rolled up to, finest first
+    periods = ['week', 'month', 'quarter', 'year']
+
+    ############################################################################################
+    # states, dates and statuses label the three axes (sorted). totals holds the summed
+    # CustomerCount of each cell and present whether the cell had any rows
+    ############################################################################################
+    def __init__(self, states, dates, statuses, totals, present):
+        self.states = pd.Index(states, name='State')
+        self.dates = pd.DatetimeIndex(dates, name='StatusDate', freq=None)
+        self.statuses = pd.Index(statuses, name='Status')
+        self.totals = totals
+        self.present = present
+
+    ############################################################################################
+    # Method to build the cube from clean data (StatusDate index; State, Status and
+    # CustomerCount columns) with one bincount over the flattened cell numbers
+    ############################################################################################
+    @staticmethod
+    def fromSalesData(df):
+        states = pd.Categorical(df['State'])
+        stateCodes = states.codes.astype('int64')
+        dateCodes, dates = pd.factorize(df.index, sort=True)
+        statusCodes, statuses = pd.factorize(df['Status'], sort=True)
+
+        shape = (len(states.categories), len(dates), len(statuses))
+        cells = (stateCodes * shape[1] + dateCodes) * shape[2] + statusCodes
+        size = shape[0] * shape[1] * shape[2]
+        totals = numpy.bincount(cells, weights=df['CustomerCount'].values, minlength=size)
+        present = numpy.bincount(cells, minlength=size) > 0
+
+        return SalesDataCube(states.categories, dates, statuses,
+                             totals.round().astype('int64').reshape(shape), present.reshape(shape))
+
+    ############################################################################################
+    # Method to build the cube from CustomerCount sums grouped by State, StatusDate and Status
+    # (in any order), such as the result of a streamed aggregation
+    ############################################################################################
+    @staticmethod
+    def fromGroupedSums(grouped):
+        grouped = grouped.reset_index()
+        grouped = grouped.set_index('StatusDate')
+        return SalesDataCube.fromSalesData(grouped)
+
+    ############################################################################################
+    # Method to get a cube holding the sums of this cube and another one, over the union of
+    # their states, dates and statuses. Adding the cube of newly arrived rows this way costs
+    # the size of the cube, not the number of rows already summed into it
+    ############################################################################################
+    def merge(self, other):
+        states = self.states.union(other.states)
+        dates = self.dates.union(other.dates)
+        statuses = self.statuses.union(other.statuses)
+        shape = (len(states), len(dates), len(statuses))
+        totals = numpy.zeros(shape, dtype='int64')
+        present = numpy.zeros(shape, dtype=bool)
+
+        for cube in [self, other]:
+            cells = numpy.ix_(states.get_indexer(cube.states), dates.get_indexer(cube.dates),
+                              statuses.get_indexer(cube.statuses))
+            totals[cells] += cube.totals
+            present[cells] |= cube.present
+        return SalesDataCube(states, dates, statuses, totals, present)
+
+    ############################################################################################
+    # Methods to save the cube to a numpy .npz file and load it back
+    ############################################################################################
+    def save(self, fileName):
+        # a temporary file of its own, so processes saving the same cube do not clash
+        fileDescriptor, tempPath = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(fileName) + '-',
+                                                    dir=os.path.dirname(os.path.abspath(fileName)))
+        with os.fdopen(fileDescriptor, 'wb') as cubeFile:
+            numpy.savez(cubeFile, states=numpy.asarray(self.states, dtype=str),
+                        dates=self.dates.values.astype('datetime64[ns]').view('int64'),
+                        statuses=numpy.asarray(self.statuses), totals=self.totals, present=self.present)
+        os.replace(tempPath, fileName)
+
+    @staticmethod
+    def load(fileName):
+        with numpy.load(fileName) as arrays:
+            return SalesDataCube(arrays['states'].tolist(), arrays['dates'].view('datetime64[ns]'),
+                                 arrays['statuses'], arrays['totals'], arrays['present'])
+
+    ############################################################################################
+    # Method to get the CustomerCount sums grouped by the given keys (State, StatusDate and/or
+    # Status, in that order of levels) for the cells with one of the given States and
+    # Statuses and a StatusDate between minDate and maxDate (None for any). Only groups that
+    # had rows are listed, as a groupby would
+    ############################################################################################
+    def aggregate(self, keys, states=None, statuses=None, minDate=None, maxDate=None):
+        for key in keys:
+            if(key not in SalesDataCube.axisNames):
+                raise ValueError("Unknown group by key: " + str(key))
+
+        stateIndex = pd.CategoricalIndex(self.states, categories=self.states, name='State')
+        axes = [stateIndex, self.dates, self.statuses]
+        masks = self.__getMasks(states, statuses, minDate, maxDate)
+
+        totals = self.totals
+        present = self.present
+        for axis, mask in enumerate(masks):
+            if(mask is not None):
+                totals = totals.compress(mask, axis=axis)
+                present = present.compress(mask, axis=axis)
+                axes[axis] = axes[axis][mask]
+
+        # add up the axes that are not grouped on, then put the rest in the order of the keys
+        positions = [SalesDataCube.axisNames.index(key) for key in keys]
+        summed = tuple(axis for axis in range(3) if axis not in positions)
+        totals = totals.sum(axis=summed)
+        present = present.any(axis=summed)
+        order = [sorted(positions).index(position) for position in positions]
+        totals = totals.transpose(order)
+        present = present.transpose(order)
+
+        if(len(keys) == 0):
+            return pd.DataFrame({'CustomerCount': [totals.item()]})
+        cells = numpy.nonzero(present)
+        if(len(keys) == 1):
+            index = axes[positions[0]][cells[0]]
+        else:
+            levels = [axes[position] for position in positions]
+            index = pd.MultiIndex(levels=levels, codes=list(cells), names=list(keys))
+        return pd.DataFrame({'CustomerCount': totals[cells]}, index=index)
+
+    ############################################################################################
+    # Method to get the cube of just the cells with one of the given States and Statuses and
+    # a StatusDate between minDate and maxDate (None for any). The States not selected are
+    # emptied rather than dropped, so the State axis keeps every state of the data set
+    ############################################################################################
+    def select(self, states=None, statuses=None, minDate=None, maxDate=None):
+        masks = self.__getMasks(states, statuses, minDate, maxDate)
+        totals = self.totals
+        present = self.present
+        if(masks[0] is not None):
+            totals = totals * masks[0][:, None, None]
+            present = present & masks[0][:, None, None]
+        dates = self.dates
+        statuses = self.statuses
+        if(masks[1] is not None):
+            totals = totals.compress(masks[1], axis=1)
+            present = present.compress(masks[1], axis=1)
+            dates = dates[masks[1]]
+        if(masks[2] is not None):
+            totals = totals.compress(masks[2], axis=2)
+            present = present.compress(masks[2], axis=2)
+            statuses = statuses[masks[2]]
+        return SalesDataCube(self.states, dates, statuses, totals, present)
+
+    ############################################################################################
+    # Method to roll the cube up to a coarser period (see periods). Returns a cube with the
+    # start of each period that had dates as its dates, holding the sums of the period's
+    # dates, so its reports match the cube's for any date range of whole periods
+    ############################################################################################
+    def rollup(self, period):
+        starts = SalesDataCube.getPeriodStarts(self.dates, period)
+        if(len(starts) == 0):
+            return SalesDataCube(self.states, starts, self.statuses, self.totals, self.present)
+
+        # the dates are sorted, so each period is a run of dates folded by reduceat
+        first = numpy.flatnonzero(numpy.r_[True, starts.values[1:] != starts.values[:-1]])
+        return SalesDataCube(self.states, starts[first], self.statuses,
+                             numpy.add.reduceat(self.totals, first, axis=1),
+                             numpy.logical_or.reduceat(self.present, first, axis=1))
+
+    ############################################################################################
+    # Method to get the CustomerCount sums grouped by State and then Date, and also Status if
+    # no status is given
+    ############################################################################################
+    def groupedByStateDate(self, status=None):
+        return self.aggregate(SalesDataCube.withStatusKey(['State', 'StatusDate'], status),
+                              statuses=SalesDataCube.__getStatuses(status))
+
+    ############################################################################################
+    # Method to get the CustomerCount sums grouped by Date and then State, and also Status if
+    # no status is given
+    ############################################################################################
+    def groupedByDateState(self, status=None):
+        return self.aggregate(SalesDataCube.withStatusKey(['StatusDate', 'State'], status),
+                              statuses=SalesDataCube.__getStatuses(status))
+
+    ############################################################################################
+    # Method to get the total CustomerCount of each state
+    ############################################################################################
+    def countByState(self, status=None):
+        return self.aggregate(['State'], statuses=SalesDataCube.__getStatuses(status))
+
+    ############################################################################################
+    # Method to get the total CustomerCount of each date
+    ############################################################################################
+    def countByDate(self, status=None):
+        return self.aggregate(['StatusDate'], statuses=SalesDataCube.__getStatuses(status))
+
+    ############################################################################################
+    # Method to get the total CustomerCount of each date along with the maximum weekly total
+    # of the date's month in a Max column
+    ############################################################################################
+    def monthlyMax(self, status=None):
+        return SalesDataCube.addMonthlyMax(self.countByDate(status))
+
+    ############################################################################################
+    # Method to add a Max column with the maximum weekly total of the date's month to totals
+    # of each date
+    ############################################################################################
+    @staticmethod
+    def addMonthlyMax(maxByDateAndMonth):
+        # Group by Year and Month
+        yearMonth = maxByDateAndMonth.groupby(SalesDataCube.getMonthCodes(maxByDateAndMonth.index))
+
+        # What is the max customer count per Year and Month
+        maxByDateAndMonth['Max'] = yearMonth['CustomerCount'].transform('max')
+        return maxByDateAndMonth
+
+    ############################################################################################
+    # Method to get the total CustomerCount of each year
+    ############################################################################################
+    def annualTotals(self, status=None):
+        byDate = self.countByDate(status)
+        return byDate.groupby(SalesDataCube.getYears(byDate.index)).sum()
+
+    ############################################################################################
+    # Method to get the yearly CustomerCount totals of every series as a matrix with a row per
+    # series and a column per year. A series is a combination of the given keys (State and/or
+    # Status), and only series that had rows are listed. Without keys there is a single
+    # series of all the rows, labelled All
+    ############################################################################################
+    def annualSeries(self, keys=['State', 'Status']):
+        annual = self.rollup('year')
+        return self.__getSeries(annual.totals, keys, pd.Index(SalesDataCube.getYears(annual.dates), name='Year'))
+
+    ############################################################################################
+    # Method to get the CustomerCount totals of every series (see annualSeries) for each date,
+    # or only the dates after the given date, as a matrix with a column per date. Series
+    # without rows on a date have a total of 0 for it
+    ############################################################################################
+    def weeklySeries(self, keys=['State', 'Status'], after=None):
+        totals = self.totals
+        dates = self.dates
+        if(after != None):
+            mask = dates > pd.Timestamp(after)
+            totals = totals.compress(mask, axis=1)
+            dates = dates[mask]
+        return self.__getSeries(totals, keys, dates)
+
+    ############################################################################################
+    # Method to get the start of the period (see periods) each date falls in: its Monday,
+    # the first of its month, quarter or year
+    ############################################################################################
+    @staticmethod
+    def getPeriodStarts(dates, period):
+        values = numpy.asarray(dates, dtype='datetime64[ns]')
+        if(period == 'week'):
+            # day 0 (1/1/1970) was a Thursday, so a date's Monday is (day + 3) % 7 days back
+            days = values.astype('datetime64[D]').astype('int64')
+            starts = (days - (days + 3) % 7).astype('datetime64[D]')
+        elif(period == 'month'):
+            starts = values.astype('datetime64[M]')
+        elif(period == 'quarter'):
+            months = values.astype('datetime64[M]').astype('int64')
+            starts = (months - months % 3).astype('datetime64[M]')
+        elif(period == 'year'):
+            starts = values.astype('datetime64[Y]')
+        else:
+            raise ValueError("Unknown rollup period: " + str(period))
+        return pd.DatetimeIndex(starts.astype('datetime64[ns]'), name='StatusDate')
+
+    ############################################################################################
+    # Methods to get the year, or the month as year * 12 + month - 1, of every date as plain
+    # integer arrays. Grouping on these keys runs the built in reductions instead of calling
+    # a Python function for each date
+    ############################################################################################
+    @staticmethod
+    def getYears(dates):
+        return numpy.asarray(dates.year, dtype='int64')
+
+    @staticmethod
+    def getMonthCodes(dates):
+        return SalesDataCube.getYears(dates) * 12 + numpy.asarray(dates.month, dtype='int64') - 1
+
+    ############################################################################################
+    # Method to get the group keys of a report, with Status added when no status is given
+    ############################################################################################
+    @staticmethod
+    def withStatusKey(keys, status):
+        if(status == None):
+            return keys + ['Status']
+        return keys
+
+    ############################################################################################
+    # Helper method to get the masks of the States, StatusDates and Statuses to keep for the
+    # given filters, None for an axis that is not filtered
+    ############################################################################################
+    def __getMasks(self, states, statuses, minDate, maxDate):
+        masks = [None, None, None]
+        if(states != None):
+            masks[0] = self.states.isin([str(state) for state in states])
+        if(minDate != None or maxDate != None):
+            masks[1] = numpy.ones(len(self.dates), dtype=bool)
+            if(minDate != None):
+                masks[1] &= self.dates >= pd.Timestamp(minDate)
+            if(maxDate != None):
+                masks[1] &= self.dates <= pd.Timestamp(maxDate)
+        if(statuses != None):
+            masks[2] = self.statuses.isin(list(statuses))
+        return masks
+
+    ############################################################################################
+    # Helper method to get the statuses to keep for a status (None for all of them)
+    ############################################################################################
+    @staticmethod
+    def __getStatuses(status):
+        if(status == None):
+            return None
+        return [status]
+
+    ############################################################################################
+    # Helper method to fold State x period x Status totals into a frame with a row per series
+    # of the given keys (see annualSeries) and the given period columns
+    ############################################################################################
+    def __getSeries(self, totals, keys, columns):
+        for key in keys:
+            if(key not in seriesKeys):
+                raise ValueError("Unknown series key: " + str(key))
+
+        # fold away the keys not asked for, leaving State x Status x period
+        present = self.present.any(axis=1)
+        if('State' not in keys):
+            totals = totals.sum(axis=0, keepdims=True)
+            present = present.any(axis=0, keepdims=True)
+        if('Status' not in keys):
+            totals = totals.sum(axis=2, keepdims=True)
+            present = present.any(axis=1, keepdims=True)
+        rows = totals.shape[0] * totals.shape[2]
+        matrix = totals.transpose(0, 2, 1).reshape(rows, len(columns))[present.reshape(-1)]
+
+        levels = []
+        if('State' in keys):
+            levels.append(pd.CategoricalIndex(self.states, categories=self.states, name='State'))
+        if('Status' in keys):
+            levels.append(self.statuses)
+        if(len(levels) == 0):
+            index = pd.Index(['All'], name='Series')
+        elif(len(levels) == 1):
+            index = levels[0][present.reshape(-1)]
+        else:
+            index = pd.MultiIndex.from_product(levels)[present.reshape(-1)]
+            if(keys[0] != 'State'):
+                index = index.swaplevel()
+
+        series = pd.DataFrame(matrix, index=index, columns=columns)
+        return series.sort_index() if len(keys) > 1 and keys[0] != 'State' else series
@@ -0,0 +1,148 @@
+###########################################################################################
+# Sales Data Export
+#
+# Export layer for SalesData frames. A frame can be written as:
+#   xlsx    - streamed row by row through xlsxwriter's constant_memory mode when xlsxwriter
+#             is installed, otherwise through pandas/openpyxl
+#   csv     - plain text
+#   parquet - needs pyarrow
+#   feather - needs pyarrow
+#   none    - nothing is written, for when only the data itself is needed
+#
+# Parquet and Feather fall back to csv when pyarrow is not installed.
+###########################################################################################
+
+import importlib.util
+import math
+import pandas as pd
+from SalesDataOptions import exportFormats
+
+class SalesDataExport:
+    formats = exportFormats
+
+    ############################################################################################
+    # Method to check whether the given export format is supported
+    ############################################################################################
+    @staticmethod
+    def isValidFormat(exportFormat):
+        return exportFormat in SalesDataExport.formats
+
+    ############################################################################################
+    # Method to check whether an optional module is installed without importing it
+    ############################################################################################
+    @staticmethod
+    def hasModule(moduleName):
+        return importlib.util.find_spec(moduleName) != None
+
+    ############################################################################################
+    # Method to export a frame to baseFileName plus the format's extension. Returns the name
+    # of the file written, or None when the format is none
+    ############################################################################################
+    @staticmethod
+    def exportFrame(dataFrame, baseFileName, exportFormat='xlsx', index=True):
+        if(SalesDataExport.isValidFormat(exportFormat) == False):
+            raise ValueError("Unknown export format: " + str(exportFormat))
+        if(exportFormat == 'none'):
+            return None
+
+        if(exportFormat in ['parquet', 'feather'] and SalesDataExport.hasModule('pyarrow') == False):
+            print("pyarrow is not installed, exporting", baseFileName, "as csv instead of", exportFormat)
+            exportFormat = 'csv'
+
+        fileName = baseFileName + '.' + exportFormat
+        if(exportFormat == 'xlsx'):
+            print("Generating Spreadsheet file:", fileName)
+            SalesDataExport.__exportSpreadsheet(dataFrame, fileName, index)
+        else:
+            print("Generating", exportFormat, "file:", fileName)
+            if(exportFormat == 'csv'):
+                dataFrame.to_csv(fileName, index=index)
+            elif(exportFormat == 'parquet'):
+                SalesDataExport.__toColumnar(dataFrame, index).to_parquet(fileName, index=False)
+            else:
+                SalesDataExport.__toColumnar(dataFrame, index).to_feather(fileName)
+        return fileName
+
+    ############################################################################################
+    # Helper method to write a spreadsheet, streamed one row at a time when xlsxwriter is
+    # available. Index levels become leading columns with every value repeated rather than
+    # merged cells, since constant_memory mode can only write a row at a time
+    ############################################################################################
+    @staticmethod
+    def __exportSpreadsheet(dataFrame, fileName, index):
+        if(SalesDataExport.hasModule('xlsxwriter') == False):
+            dataFrame.to_excel(fileName, index=index)
+            return
+
+        writer = SalesDataSpreadsheetWriter(fileName)
+        header = list(dataFrame.columns)
+        if(index):
+            header = [name if name != None else '' for name in dataFrame.index.names] + header
+        writer.append(header)
+        for row in dataFrame.itertuples(index=index, name=None):
+            if(index and isinstance(dataFrame.index, pd.MultiIndex)):
+                row = row[0] + row[1:]
+            writer.append(row)
+        writer.close()
+
+    ############################################################################################
+    # Helper method to turn the index into columns and categoricals into plain values so
+    # Parquet and Feather writers accept the frame
+    ############################################################################################
+    @staticmethod
+    def __toColumnar(dataFrame, index):
+        if(index):
+            dataFrame = dataFrame.reset_index()
+        else:
+            dataFrame = dataFrame.reset_index(drop=True)
+        dataFrame.columns = [str(column) for column in dataFrame.columns]
+        return dataFrame
+
+
+###########################################################################################
+# Write only spreadsheet that is streamed to disk a row at a time, using xlsxwriter's
+# constant_memory mode when xlsxwriter is installed and openpyxl's write_only mode otherwise
+###########################################################################################
+class SalesDataSpreadsheetWriter:
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.rows = 0
+        if(SalesDataExport.hasModule('xlsxwriter')):
+            import xlsxwriter
+            self.__workbook = xlsxwriter.Workbook(fileName, {'constant_memory': True,
+                                                             'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+            self.__worksheet = self.__workbook.add_worksheet()
+            self.__openpyxl = False
+        else:
+            import openpyxl
+            self.__workbook = openpyxl.Workbook(write_only=True)
+            self.__worksheet = self.__workbook.create_sheet()
+            self.__openpyxl = True
+
+    ############################################################################################
+    # Method to append one row of values. NaN values are left blank
+    ############################################################################################
+    def append(self, row):
+        row = [None if isinstance(value, float) and math.isnan(value) else value for value in row]
+        if(self.__openpyxl):
+            self.__worksheet.append(row)
+        else:
+            self.__worksheet.write_row(self.rows, 0, row)
+        self.rows += 1
+
+    ############################################################################################
+    # Method to append many rows
+    ############################################################################################
+    def appendRows(self, rows):
+        for row in rows:
+            self.append(row)
+
+    ############################################################################################
+    # Method to finish writing the file
+    ############################################################################################
+    def close(self):
+        if(self.__openpyxl):
+            self.__workbook.save(self.fileName)
+        else:
+            self.__workbook.close()
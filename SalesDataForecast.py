@@ -0,0 +1,88 @@
+###########################################################################################
+# Sales Data Forecast
+#
+# Multi-year forecasts of annual customer counts for many series at once. The history is a
+# frame with a row per series (such as every State x Status, see SalesDataCube.annualSeries)
+# and a column per year. Each model works on the whole matrix with numpy, so thousands of
+# series are forecast in one call without a loop over them:
+#
+#   growth        - the last year grown by its pct change over the year before, compounded
+#                   for every year ahead
+#   movingAverage - the mean of the last window years
+#   linearTrend   - the least squares line through the series' years, extended
+#
+# Series without enough years for a model (two for growth and linearTrend) are forecast as
+# NaN, as are growth forecasts of series that had no customers the year before.
+#
+# forecast() returns a tidy frame with one row per series, model and year ahead.
+###########################################################################################
+
+import numpy
+import pandas as pd
+from SalesDataOptions import forecastModels
+
+############################################################################################
+# Method to forecast every series of the history horizons years ahead with each of the
+# given models (all of them if None), the moving average over the last window years.
+# Returns a frame with the series keys followed by Model, Horizon, Year and Forecast columns
+############################################################################################
+def forecast(history, horizons=3, models=None, window=3):
+    if(models == None):
+        models = forecastModels
+    for model in models:
+        if(model not in modelFunctions):
+            raise ValueError("Unknown forecast model: " + str(model))
+    if(horizons < 1 or window < 1):
+        raise ValueError("Please Enter at least 1 Horizon and Window Year")
+
+    values = history.to_numpy(dtype='float64')
+    years = numpy.asarray(history.columns, dtype='float64')
+    steps = numpy.arange(1, horizons + 1)
+    lastYear = int(years[-1]) if len(years) > 0 else 0
+
+    # one row per series and year ahead, repeated for every model
+    keys = history.index.repeat(horizons).to_frame(index=False)
+    frames = []
+    for model in models:
+        predictions = modelFunctions[model](values, years, steps, window)
+        frame = keys.copy()
+        frame['Model'] = model
+        frame['Horizon'] = numpy.tile(steps, len(history.index))
+        frame['Year'] = lastYear + frame['Horizon']
+        frame['Forecast'] = predictions.reshape(-1)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+############################################################################################
+# Model functions. Each takes the (series x years) values, the years, the steps ahead and
+# the window, and returns the (series x steps) forecasts
+############################################################################################
+def growthForecast(values, years, steps, window):
+    if(values.shape[1] < 2):
+        return numpy.full((values.shape[0], len(steps)), numpy.nan)
+    last = values[:, -1]
+    previous = values[:, -2]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        change = numpy.where(previous != 0, last / previous - 1, numpy.nan)
+    return last[:, None] * (1 + change[:, None]) ** steps[None, :]
+
+def movingAverageForecast(values, years, steps, window):
+    if(values.shape[1] == 0):
+        return numpy.full((values.shape[0], len(steps)), numpy.nan)
+    average = values[:, -window:].mean(axis=1)
+    return numpy.repeat(average[:, None], len(steps), axis=1)
+
+def linearTrendForecast(values, years, steps, window):
+    if(values.shape[1] < 2):
+        return numpy.full((values.shape[0], len(steps)), numpy.nan)
+    # fit every series against the same centred years at once
+    offsets = years - years.mean()
+    slopes = (values * offsets).sum(axis=1) / (offsets * offsets).sum()
+    ahead = years[-1] + steps - years.mean()
+    return values.mean(axis=1)[:, None] + slopes[:, None] * ahead[None, :]
+
+modelFunctions = {
+    'growth': growthForecast,
+    'movingAverage': movingAverageForecast,
+    'linearTrend': linearTrendForecast
+}
@@ -0,0 +1,203 @@
+###########################################################################################
+# Sales Data Ingest
+#
+# Concurrent ingestion of raw sales data from several sources, such as extract files or
+# local stand-in services. Every source is pulled on its own worker thread a chunk at a
+# time and each chunk is cleaned on that thread as soon as it arrives. Cleaned chunks go
+# through a bounded queue to the calling thread, which merges them into the data set one
+# at a time. When the queue is full the sources wait (backpressure), so slow merges never
+# let more than queueSize chunks pile up in memory.
+#
+# The latency (time to the first chunk) and throughput of every source are reported.
+#
+# Example: python SalesDataIngest.py --region NE --years 2015-2018 extract1.csv extract2.xlsx
+###########################################################################################
+
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from SalesDataOptions import parseYearRange
+
+###########################################################################################
+# A source of raw sales data (State, Status, CustomerCount and StatusDate columns) read a
+# chunk at a time. Subclasses implement chunks()
+###########################################################################################
+class SalesDataSource:
+
+    def __init__(self, name):
+        self.name = name
+
+    ############################################################################################
+    # Generator of the source's raw data as frames of at most chunkRows rows
+    ############################################################################################
+    def chunks(self, chunkRows):
+        raise NotImplementedError
+
+
+###########################################################################################
+# Source reading an extract file: csv, or xlsx read row by row in read only mode
+###########################################################################################
+class SalesDataFileSource(SalesDataSource):
+
+    def __init__(self, fileName, name=None):
+        SalesDataSource.__init__(self, name if name != None else os.path.basename(fileName))
+        self.fileName = fileName
+
+    def chunks(self, chunkRows):
+        if(self.fileName.lower().endswith('.csv')):
+            yield from pd.read_csv(self.fileName, parse_dates=['StatusDate'], chunksize=chunkRows)
+            return
+
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.fileName, read_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            columns = list(next(rows))
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if(len(chunk) == chunkRows):
+                    yield pd.DataFrame(chunk, columns=columns)
+                    chunk = []
+            if(len(chunk) > 0):
+                yield pd.DataFrame(chunk, columns=columns)
+        finally:
+            workbook.close()
+
+
+###########################################################################################
+# Source calling a function, such as a client of a local stand-in service, that returns a
+# frame or an iterable of frames
+###########################################################################################
+class SalesDataFunctionSource(SalesDataSource):
+
+    def __init__(self, name, function, *args, **kwargs):
+        SalesDataSource.__init__(self, name)
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    def chunks(self, chunkRows):
+        result = self.function(*self.args, **self.kwargs)
+        if(isinstance(result, pd.DataFrame)):
+            result = [result]
+        for frame in result:
+            for start in range(0, len(frame.index), chunkRows):
+                yield frame.iloc[start:start + chunkRows]
+
+
+############################################################################################
+# Method to ingest every source concurrently on up to threads threads (one per source by
+# default). Each raw chunk is passed through clean on its source's thread, and the cleaned
+# chunks are passed to merge on the calling thread through a queue holding at most
+# queueSize chunks. A source stops at the first chunk clean or reading fails on, with the
+# error kept in its stats. Returns a stats dict per source
+############################################################################################
+def ingestSources(sources, clean, merge, threads=None, queueSize=8, chunkRows=100000):
+    chunkQueue = queue.Queue(maxsize=queueSize)
+    stopping = threading.Event()
+    stats = [{'source': source.name, 'chunks': 0, 'rows': 0, 'latency': None, 'seconds': 0.0,
+              'readSeconds': 0.0, 'cleanSeconds': 0.0, 'waitSeconds': 0.0, 'mergeSeconds': 0.0,
+              'rowsPerSecond': 0.0, 'error': None} for source in sources]
+    if(len(sources) == 0):
+        return stats
+
+    def pullSource(position):
+        source = sources[position]
+        sourceStats = stats[position]
+        start = time.perf_counter()
+        try:
+            chunks = source.chunks(chunkRows)
+            while(stopping.is_set() == False):
+                readStart = time.perf_counter()
+                raw = next(chunks, None)
+                if(raw is None):
+                    break
+                cleanStart = time.perf_counter()
+                cleaned = clean(raw)
+                if(sourceStats['latency'] == None):
+                    sourceStats['latency'] = time.perf_counter() - start
+                sourceStats['readSeconds'] += cleanStart - readStart
+                sourceStats['cleanSeconds'] += time.perf_counter() - cleanStart
+
+                waitStart = time.perf_counter()
+                _putChunk(chunkQueue, (position, cleaned), stopping)
+                sourceStats['waitSeconds'] += time.perf_counter() - waitStart
+        except Exception as e:
+            sourceStats['error'] = repr(e)
+        finally:
+            sourceStats['seconds'] = time.perf_counter() - start
+            _putChunk(chunkQueue, (position, None), stopping)
+
+    with ThreadPoolExecutor(max_workers=threads if threads != None else len(sources)) as pool:
+        for position in range(len(sources)):
+            pool.submit(pullSource, position)
+
+        # merge chunks as they arrive until every source has finished
+        finished = 0
+        try:
+            while(finished < len(sources)):
+                position, cleaned = chunkQueue.get()
+                if(cleaned is None):
+                    finished += 1
+                    continue
+                mergeStart = time.perf_counter()
+                merge(cleaned)
+                stats[position]['mergeSeconds'] += time.perf_counter() - mergeStart
+                stats[position]['chunks'] += 1
+                stats[position]['rows'] += len(cleaned.index)
+        finally:
+            stopping.set()
+
+    for sourceStats in stats:
+        if(sourceStats['seconds'] > 0):
+            sourceStats['rowsPerSecond'] = sourceStats['rows'] / sourceStats['seconds']
+    return stats
+
+############################################################################################
+# Helper to put an item on the queue, waiting while it is full unless ingestion is stopping
+############################################################################################
+def _putChunk(chunkQueue, item, stopping):
+    while(stopping.is_set() == False):
+        try:
+            chunkQueue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+############################################################################################
+# Method to print the stats returned by ingestSources as a table
+############################################################################################
+def printIngestStats(stats):
+    print("\n%-24s %7s %10s %9s %9s %9s %9s %12s  %s" % ('Source', 'Chunks', 'Rows', 'Latency', 'Seconds',
+                                                        'Waited', 'Merged', 'Rows/Second', 'Error'))
+    for sourceStats in stats:
+        latency = '' if sourceStats['latency'] == None else "%.3f" % sourceStats['latency']
+        error = '' if sourceStats['error'] == None else sourceStats['error']
+        print("%-24s %7d %10d %9s %9.3f %9.3f %9.3f %12.0f  %s" % (sourceStats['source'], sourceStats['chunks'],
+              sourceStats['rows'], latency, sourceStats['seconds'], sourceStats['waitSeconds'],
+              sourceStats['mergeSeconds'], sourceStats['rowsPerSecond'], error))
+
+if __name__ == '__main__':
+    import SalesData as sd
+
+    parser = argparse.ArgumentParser(description='Ingest extract files into a SalesData data set')
+    parser.add_argument('files', nargs='+', help='csv or xlsx extracts')
+    parser.add_argument('--region', default='NE', choices=['NE', 'MA', 'SE'])
+    parser.add_argument('--years', type=parseYearRange, default='2015-2018', help='year range of the data set, e.g. 2015-2018')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=8)
+    parser.add_argument('--store', default=None, help='directory of a partitioned store to ingest into')
+    args = parser.parse_args()
+
+    startYear, endYear = args.years
+    salesData = sd.SalesData()
+    if(args.store != None):
+        salesData.setStore(args.store)
+    if(salesData.setYearRangeAndRegion(startYear, endYear, args.region)):
+        salesData.ingestSalesData([SalesDataFileSource(fileName) for fileName in args.files], args.threads,
+                                  args.queue_size)
@@ -0,0 +1,172 @@
+###########################################################################################
+# Sales Data Instrumentation
+#
+# Timers and counters for the stages of a SalesData report run (generate, load, clean,
+# group, transform, export, chart ...) along with the rows and bytes each one handled and
+# the hits and misses of the caches.
+#
+# Every finished stage and every counter update is sent as an event (a dict) to the
+# registered listeners, e.g. a logger, and totals are kept for a summary table. Reports
+# can also be profiled with cProfile or tracemalloc.
+###########################################################################################
+
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+############################################################################################
+# Decorator profiling a report method of an object with an instrumentation attribute under
+# the method's name
+############################################################################################
+def profiled(method):
+    @functools.wraps(method)
+    def profiledMethod(self, *args, **kwargs):
+        with self.instrumentation.profile(method.__name__):
+            return method(self, *args, **kwargs)
+    return profiledMethod
+
+class SalesDataInstrumentation:
+    profileModes = [None, 'cprofile', 'tracemalloc']
+
+    def __init__(self):
+        self.listeners = []
+        self.profileMode = None
+        self.reset()
+
+    ############################################################################################
+    # Method to forget all stage totals, counters and profiles collected so far
+    ############################################################################################
+    def reset(self):
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.profiles = []
+
+    ############################################################################################
+    # Method to register a callback that is called with every event dict
+    ############################################################################################
+    def addListener(self, callback):
+        self.listeners.append(callback)
+
+    ############################################################################################
+    # Method to log every event to the given logger (the SalesData logger if none is given)
+    ############################################################################################
+    def addLogger(self, logger=None, level=logging.INFO):
+        if(logger == None):
+            logger = logging.getLogger('SalesData')
+        self.addListener(lambda event: logger.log(level, "%s", event))
+
+    ############################################################################################
+    # Method to set how reports are profiled: None, 'cprofile' or 'tracemalloc'
+    ############################################################################################
+    def setProfileMode(self, profileMode):
+        if(profileMode not in SalesDataInstrumentation.profileModes):
+            raise ValueError("Unknown profile mode: " + str(profileMode))
+        self.profileMode = profileMode
+
+    ############################################################################################
+    # Context manager timing a stage. Yields a dict the stage can fill in with rows,
+    # bytesRead and bytesWritten (or any other detail) to be reported with it
+    ############################################################################################
+    @contextmanager
+    def stage(self, name, **details):
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            seconds = time.perf_counter() - start
+            totals = self.stages.get(name)
+            if(totals == None):
+                totals = {'calls': 0, 'seconds': 0.0, 'rows': 0, 'bytesRead': 0, 'bytesWritten': 0}
+                self.stages[name] = totals
+            totals['calls'] += 1
+            totals['seconds'] += seconds
+            for key in ['rows', 'bytesRead', 'bytesWritten']:
+                totals[key] += details.get(key, 0) or 0
+
+            event = {'event': 'stage', 'stage': name, 'seconds': seconds}
+            event.update(details)
+            self.__emit(event)
+
+    ############################################################################################
+    # Method to add to a counter, such as cache hits and misses
+    ############################################################################################
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+        self.__emit({'event': 'counter', 'counter': name, 'amount': amount, 'total': self.counters[name]})
+
+    ############################################################################################
+    # Context manager profiling a report with the current profile mode (doing nothing when
+    # there is none). The profile's text is kept in profiles
+    ############################################################################################
+    @contextmanager
+    def profile(self, name):
+        if(self.profileMode == None):
+            yield
+            return
+
+        if(self.profileMode == 'cprofile'):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(15)
+                self.__addProfile(name, output.getvalue())
+        else:
+            alreadyTracing = tracemalloc.is_tracing()
+            if(alreadyTracing == False):
+                tracemalloc.start()
+            try:
+                yield
+            finally:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if(alreadyTracing == False):
+                    tracemalloc.stop()
+                lines = ["Peak traced memory: %.1f MB" % (peak / 1048576.0)]
+                for statistic in snapshot.statistics('lineno')[:10]:
+                    lines.append(str(statistic))
+                self.__addProfile(name, "\n".join(lines))
+
+    ############################################################################################
+    # Method to get the stage totals and counters as a printable table
+    ############################################################################################
+    def getSummaryTable(self):
+        lines = ["%-20s %6s %10s %12s %14s %14s" % ('Stage', 'Calls', 'Seconds', 'Rows', 'Bytes Read', 'Bytes Written')]
+        for name, totals in self.stages.items():
+            lines.append("%-20s %6d %10.3f %12d %14d %14d" % (name, totals['calls'], totals['seconds'], totals['rows'],
+                                                             totals['bytesRead'], totals['bytesWritten']))
+        if(len(self.counters) > 0):
+            lines.append("")
+            lines.append("%-20s %6s" % ('Counter', 'Total'))
+            for name, total in self.counters.items():
+                lines.append("%-20s %6d" % (name, total))
+        return "\n".join(lines)
+
+    ############################################################################################
+    # Method to print the summary table followed by any captured profiles
+    ############################################################################################
+    def printSummary(self):
+        print(self.getSummaryTable())
+        for name, text in self.profiles:
+            print("\nProfile of", name)
+            print(text)
+
+    ############################################################################################
+    # Helper methods to keep a profile and to send an event to every listener
+    ############################################################################################
+    def __addProfile(self, name, text):
+        self.profiles.append((name, text))
+        self.__emit({'event': 'profile', 'report': name, 'mode': self.profileMode})
+
+    def __emit(self, event):
+        for listener in self.listeners:
+            listener(event)
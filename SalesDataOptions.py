@@ -0,0 +1,46 @@
+###########################################################################################
+# Sales Data Options
+#
+# The option values and argument parsers shared by SalesData and its command lines.
+# Nothing here imports pandas, so a command line can check its arguments before SalesData
+# is imported.
+###########################################################################################
+
+import argparse
+
+# Reports of SalesData (see SalesData.reportTypes) and the SalesData methods that export them
+reportMethods = {
+    'groupByStateDate': 'exportGroupedByStateDate',
+    'groupByDateState': 'exportGroupedByDateState',
+    'countByState': 'exportCountByState',
+    'countByDate': 'exportCountByDate',
+    'annualGoals': 'annualGoals'
+}
+
+# Models SalesDataForecast forecasts with, and the keys a series can be made up of
+forecastModels = ['growth', 'movingAverage', 'linearTrend']
+seriesKeys = ['State', 'Status']
+
+# Formats SalesDataExport can write a frame in
+exportFormats = ['xlsx', 'csv', 'parquet', 'feather', 'none']
+
+############################################################################################
+# Helper method to parse a year range argument such as 2015-2018 (or just 2016)
+############################################################################################
+def parseYearRange(value):
+    years = value.split('-')
+    if(len(years) == 1):
+        years = [years[0], years[0]]
+    if(len(years) != 2 or not all(year.isdigit() for year in years)):
+        raise argparse.ArgumentTypeError("Year ranges look like 2015-2018")
+    if(int(years[0]) > int(years[1])):
+        raise argparse.ArgumentTypeError("The start year of " + value + " is after its end year")
+    return years[0], years[1]
+
+############################################################################################
+# Helper method to parse an argument that must be a whole number of at least 1
+############################################################################################
+def parsePositiveInteger(value):
+    if(not value.isdigit() or int(value) < 1):
+        raise argparse.ArgumentTypeError("Please Enter a Whole Number of at least 1, not " + value)
+    return int(value)
@@ -0,0 +1,232 @@
+###########################################################################################
+# Sales Data Query
+#
+# Lazy query builder over the active data set of a SalesData instance. A query is built up
+# with filters on State, Status and a StatusDate range, the keys to group by (State,
+# StatusDate or one of the periods Week, Month, Quarter and Year, and/or Status) and an
+# aggregation of CustomerCount, and nothing is read until collect() is called:
+#
+#   salesData.query().where(states='NJ', statuses=1).groupBy('StatusDate').sum().collect()
+#   salesData.query().where(startDate='2016-01-01').groupBy('State', 'Quarter').sum().collect()
+#
+# The query is planned before it runs. Sums are answered from the coarsest rollup of the
+# data set's cube (see SalesData.getRollup) that still has the periods grouped by and whose
+# periods the StatusDate range covers whole, so a query of years reads the year rollup.
+# Sums by StatusDate, or over a range of partial weeks, are answered from the cube itself,
+# which is already aggregated on every key. Neither touches the rows. Other aggregations
+# scan the rows with the filters and the needed columns pushed down into the load (see
+# SalesData.scanSalesData), so rows and columns that are filtered out are never built into
+# a frame. explain() describes the plan.
+###########################################################################################
+
+import copy
+import pandas as pd
+from SalesDataCube import SalesDataCube
+
+class SalesDataQuery:
+    # group keys of the periods of SalesDataCube.periods, in the same order
+    periodKeys = ['Week', 'Month', 'Quarter', 'Year']
+    groupKeys = SalesDataCube.axisNames + periodKeys
+    aggregations = ['sum', 'count', 'mean', 'max', 'min']
+
+    def __init__(self, salesData):
+        self.salesData = salesData
+        self.states = None
+        self.statuses = None
+        self.startDate = None
+        self.endDate = None
+        self.keys = []
+        self.aggregation = 'sum'
+
+    ############################################################################################
+    # Method to filter the rows on one or more States and Statuses (a value or a list) and
+    # on a StatusDate range, both ends included. Filters given replace earlier ones of the
+    # same kind. Returns a new query
+    ############################################################################################
+    def where(self, states=None, statuses=None, startDate=None, endDate=None):
+        query = copy.copy(self)
+        if(states != None):
+            query.states = [str(state).upper() for state in SalesDataQuery.__asList(states)]
+        if(statuses != None):
+            query.statuses = SalesDataQuery.__asList(statuses)
+            if(any(status not in [1,2,3] for status in query.statuses)):
+                raise ValueError("Invalid Status Value")
+        if(startDate != None):
+            query.startDate = startDate
+        if(endDate != None):
+            query.endDate = endDate
+        return query
+
+    ############################################################################################
+    # Method to set the keys to group by, in the order of the result's index levels. A
+    # period key groups on the start of each StatusDate's period. Without keys the
+    # aggregation covers every row. Returns a new query
+    ############################################################################################
+    def groupBy(self, *keys):
+        for key in keys:
+            if(key not in SalesDataQuery.groupKeys):
+                raise ValueError("Unknown group by key: " + str(key))
+        if(len([key for key in keys if key == 'StatusDate' or key in SalesDataQuery.periodKeys]) > 1):
+            raise ValueError("Please Group by only one of StatusDate, " + ", ".join(SalesDataQuery.periodKeys))
+        query = copy.copy(self)
+        query.keys = list(keys)
+        return query
+
+    ############################################################################################
+    # Method to set how CustomerCount is aggregated: sum, count, mean, max or min. Returns a
+    # new query
+    ############################################################################################
+    def aggregate(self, aggregation):
+        if(aggregation not in SalesDataQuery.aggregations):
+            raise ValueError("Unknown aggregation: " + str(aggregation))
+        query = copy.copy(self)
+        query.aggregation = aggregation
+        return query
+
+    def sum(self):
+        return self.aggregate('sum')
+
+    ############################################################################################
+    # Method to get how the query will run: 'rollup' when it can be answered from a rollup
+    # of the cube (see getRollupPeriod), 'cube' from the cube of customer counts itself,
+    # 'scan' when the rows have to be read
+    ############################################################################################
+    def getPlan(self):
+        if(self.aggregation != 'sum'):
+            return 'scan'
+        if(self.getRollupPeriod() != None):
+            return 'rollup'
+        return 'cube'
+
+    ############################################################################################
+    # Method to get the coarsest period (see SalesDataCube.periods) whose rollup answers the
+    # query: no coarser than the period grouped by, with the StatusDate range starting and
+    # ending on the period's bounds. None if only the cube (or a scan) can answer it
+    ############################################################################################
+    def getRollupPeriod(self):
+        if(self.aggregation != 'sum' or 'StatusDate' in self.keys):
+            return None
+        periods = SalesDataCube.periods
+        keyPeriod = self.__getKeyPeriod()
+        if(keyPeriod != None):
+            periods = periods[:periods.index(keyPeriod) + 1]
+
+        for period in reversed(periods):
+            if(SalesDataQuery.__isPeriodStart(self.startDate, period, 0) and
+               SalesDataQuery.__isPeriodStart(self.endDate, period, 1)):
+                return period
+        return None
+
+    ############################################################################################
+    # Method to get the columns a scan has to read: the group keys (StatusDate for a period)
+    # and CustomerCount
+    ############################################################################################
+    def getColumns(self):
+        columns = ['StatusDate' if key in SalesDataQuery.periodKeys else key for key in self.keys]
+        return columns + ['CustomerCount']
+
+    ############################################################################################
+    # Method to describe the query's plan as text
+    ############################################################################################
+    def explain(self):
+        filters = []
+        if(self.states != None):
+            filters.append('State in ' + str(self.states))
+        if(self.statuses != None):
+            filters.append('Status in ' + str(self.statuses))
+        if(self.startDate != None):
+            filters.append('StatusDate >= ' + str(self.startDate))
+        if(self.endDate != None):
+            filters.append('StatusDate <= ' + str(self.endDate))
+        where = ' where ' + ' and '.join(filters) if len(filters) > 0 else ''
+        by = ' by ' + ', '.join(self.keys) if len(self.keys) > 0 else ''
+
+        plan = self.getPlan()
+        if(plan == 'rollup'):
+            return 'rollup(' + self.getRollupPeriod() + '): sum of CustomerCount' + by + where
+        if(plan == 'cube'):
+            return 'cube: sum of CustomerCount' + by + where
+        return ('scan: read ' + ', '.join(self.getColumns()) + where + '; ' +
+                self.aggregation + ' of CustomerCount' + by)
+
+    ############################################################################################
+    # Method to run the query. Returns a frame with a CustomerCount column, indexed by the
+    # group keys and holding only the groups that had rows (a single row without keys)
+    ############################################################################################
+    def collect(self):
+        instrumentation = self.salesData.instrumentation
+        plan = self.getPlan()
+        if(plan != 'scan'):
+            period = self.getRollupPeriod()
+            cube = self.salesData.getRollup(period) if plan == 'rollup' else self.salesData.getSalesDataCube()
+            with instrumentation.stage('transform', plan=plan, query=self.explain()) as info:
+                result = self.__aggregateCube(cube, period)
+                info['rows'] = len(result.index)
+            return result
+
+        df = self.salesData.scanSalesData(self.getColumns(), self.states, self.statuses, self.startDate, self.endDate)
+        with instrumentation.stage('transform', plan='scan', query=self.explain()) as info:
+            if(len(self.keys) == 0):
+                result = df[['CustomerCount']].agg([self.aggregation]).reset_index(drop=True)
+            else:
+                if('StatusDate' in df.index.names):
+                    df = df.reset_index()
+                keyPeriod = self.__getKeyPeriod()
+                if(keyPeriod != None):
+                    df[SalesDataQuery.__getPeriodKey(keyPeriod)] = SalesDataCube.getPeriodStarts(df['StatusDate'], keyPeriod)
+                grouped = df.groupby(self.keys, observed=True)['CustomerCount'].agg(self.aggregation)
+                result = grouped.to_frame('CustomerCount').sort_index()
+            info['rows'] = len(result.index)
+        return result
+
+    ############################################################################################
+    # Helper method to aggregate a cube, or its rollup to period (None for the cube itself),
+    # by the group keys with the filters, rolling it up further first when a coarser period
+    # is grouped by
+    ############################################################################################
+    def __aggregateCube(self, cube, period):
+        keys = ['StatusDate' if key in SalesDataQuery.periodKeys else key for key in self.keys]
+        keyPeriod = self.__getKeyPeriod()
+        if(keyPeriod == None or keyPeriod == period):
+            result = cube.aggregate(keys, self.states, self.statuses, self.startDate, self.endDate)
+        else:
+            cube = cube.select(self.states, self.statuses, self.startDate, self.endDate).rollup(keyPeriod)
+            result = cube.aggregate(keys)
+        if(len(keys) > 0):
+            result.index.names = self.keys
+        return result
+
+    ############################################################################################
+    # Helper methods to get the period grouped by (None if none is), and the group key of a
+    # period
+    ############################################################################################
+    def __getKeyPeriod(self):
+        for key in self.keys:
+            if(key in SalesDataQuery.periodKeys):
+                return SalesDataCube.periods[SalesDataQuery.periodKeys.index(key)]
+        return None
+
+    @staticmethod
+    def __getPeriodKey(period):
+        return SalesDataQuery.periodKeys[SalesDataCube.periods.index(period)]
+
+    ############################################################################################
+    # Helper method to check whether a date, plus the given number of days, is the start of
+    # a period, a missing date always being on the period's bounds. A StatusDate range of
+    # whole periods starts on a period start and ends the day before one
+    ############################################################################################
+    @staticmethod
+    def __isPeriodStart(date, period, days):
+        if(date == None):
+            return True
+        date = pd.Timestamp(date) + pd.Timedelta(days=days)
+        return SalesDataCube.getPeriodStarts([date], period)[0] == date
+
+    ############################################################################################
+    # Helper method to treat a single value as a list of one
+    ############################################################################################
+    @staticmethod
+    def __asList(values):
+        if(isinstance(values, (list, tuple, set))):
+            return list(values)
+        return [values]
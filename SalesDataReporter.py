@@ -1,154 +1,311 @@
-###########################################################################################
-# Bruce Rhoades
-#
-# Sales Data Report
-#
-# Driver program for SalesData facade class to interface to mock customer data for XYX
-# Corporation. 
-###########################################################################################
-
-import SalesData as sd
-
-def intro():
-    print("""XYZ Corporation started in the begining of 2015 and has expanded across the eastern seaboard. 
-    They have expanded their customer base across that area and have maintained customer data from 2015-2018.
-    2019 data will be release shortly after the new year. This program provides access to that data and is 
-    organized in a variety of ways and in a variety of formats - spreadseets, charts and on screen info. 
-
-    Please select views of data through the menuing system below. Spreadsheets will be outputted to the folder
-    that this script exists in and their filenames will be outputted to the console. 
-
-    Enter q at any time to quit. Cheers!\n""")
-
-############################################################################################
-# Method to prompt user for Region Selection - Validates for selections of 1, 2, 3 or q only
-############################################################################################
-def getRegionSelection():
-    regions = { '1' : ['Northeast','NE'],  '2' : ['Middle Atlantic','MA'], '3' : ['Southeast','SE']}
-    regionSelection = ''
-    while (regionSelection != 'q'):
-        for key, value in regions.items():
-            print(key, value[0])
-        
-        regionSelection = input("Please select from the above regions: ")
-        if(regionSelection not in ['1', '2', '3']):
-            if(regionSelection != 'q'):
-                print("\nINVALID SELECTION!\n")
-            continue
-        else:
-            regionName = regions[regionSelection]
-            regionSelection = regionName[1]
-            break
-
-    return regionSelection
-
-############################################################################################
-# Method to prompt user for Start Year and End Year Selection - 
-# Validates for selections of years 2015-2018, q,  and for Start Year being less than End Year
-############################################################################################
-def getDateRangeSelection():
-    startDateSelection = ''
-    endDateSelection = ''
-    while (startDateSelection != 'q' and endDateSelection != 'q'):
-        startDateSelection = input("Please enter a start year in the range of 2015-2018: ")
-        endDateSelection = input("Please enter an end year in the range of 2015-2018: ")
-        if(startDateSelection not in ['2015', '2016', '2017', '2018'] or endDateSelection not in ['2015', '2016', '2017', '2018']):
-            if(startDateSelection != 'q' and endDateSelection != 'q'):
-                print("\nINVALID SELECTION!\n")
-            continue
-        elif int(startDateSelection) > int(endDateSelection):
-            print("\nSTART YEAR MUST BE BEFORE END YEAR")
-            continue
-        else:
-            break
-
-    return startDateSelection, endDateSelection
-
-############################################################################################
-# Method to prompt user for Customer Type Selection - Validates for selections of 1, 2, 3 or q only
-############################################################################################
-def getCustomerTypeSelection():
-    customerTypeSelection = ''
-    while (customerTypeSelection != 'q'):
-        customerTypeSelection = input("Please enter a Customer Type (1, 2, 3 or a for all): ")
-        if(customerTypeSelection not in ['1', '2', '3', 'a']):
-            if(customerTypeSelection != 'q'):
-                print("\nINVALID SELECTION!\n")
-            continue
-        else:
-            break
-
-    return customerTypeSelection
-
-
-############################################################################################
-# Method to prompt user for Process Selection - Validates for selections 
-# of 1, 2, 3, 4, 5 or q only
-############################################################################################
-def getProcessSelection():
-    processSelection = ''
-    while (processSelection != 'q'):
-        processSelection = input("""Please enter a Process to Run: 
-        1. Group Customer Data by State
-        2. Group Customer Data by Date
-        3. Count Customers Data by State
-        4. Max Weekly Customer Count
-        5. Totals relative to goals, Pct change to prior year, Next Year Forecast\n""")
-        if(processSelection not in ['1', '2', '3', '4', '5']):
-            if(processSelection != 'q'):
-                print("\nINVALID SELECTION!\n")
-            continue
-        else:
-            break
-
-    return processSelection
-
-############################################################################################
-# Method to take in several parameters to initialize and parameterize SalesData facade
-# regionSelection: NE, MA, SE variables to pass to SalesData
-# processTypeSelection: to determine which function within SalesData
-# startYearSelection: the beginning year for which to pull data from SalesData
-# endYearSelection: the end year for which to pull data from SalesData
-# customerTypeSelection: The customer type for which to pull data from SalesData
-############################################################################################
-def getSalesData(regionSelection, processTypeSelection, startYearSelection, endYearSelection, customerTypeSelection):
-    if(sd.SalesData.setYearRangeAndRegion(startYearSelection, endYearSelection, regionSelection) == True):
-        custType = 0
-        if(customerTypeSelection == 'a'):
-            custType = None
-        else:
-            custType = int(customerTypeSelection)
-
-        if(processTypeSelection == '1'):
-            sd.SalesData.exportGroupedByStateDate(custType)
-        elif(processTypeSelection == '2'):
-            sd.SalesData.exportGroupedByDateState(custType)
-        if(processTypeSelection == '3'):
-            sd.SalesData.exportCountByState(custType)
-        elif(processTypeSelection == '4'):
-            sd.SalesData.exportCountByDate(custType)
-        if(processTypeSelection == '5'):
-            sd.SalesData.annualGoals(custType)
-
-
-############################################################################################
-## Main section to kick off retrieval of options from the user
-############################################################################################
-intro()
-regionSelection = ''
-processTypeSelection = ''
-startYearSelection = ''
-endYearSelection = ''
-customerTypeSelection = ''
-while((regionSelection != 'q') and (processTypeSelection != 'q') and (startYearSelection != 'q') and 
-(endYearSelection != 'q') and (customerTypeSelection != 'q')):
-    print("\n\n")
-    regionSelection = getRegionSelection()
-    if(regionSelection != 'q'):
-        processTypeSelection = getProcessSelection()
-        if(processTypeSelection != 'q'):
-            startYearSelection, endYearSelection = getDateRangeSelection()
-            if(startYearSelection != 'q') and (endYearSelection != 'q'):
-                customerTypeSelection = getCustomerTypeSelection()
-                if(customerTypeSelection != 'q'):
-                    getSalesData(regionSelection, processTypeSelection, startYearSelection, endYearSelection, customerTypeSelection)
+###########################################################################################
+# Bruce Rhoades
+#
+# Sales Data Report
+#
+# Driver program for SalesData facade class to interface to mock customer data for XYX
+# Corporation. 
+#
+# Run without arguments for the interactive menu, or with a command to run one report from
+# a script (see --help):
+#
+#   python SalesDataReporter.py countByState --region NE --years 2015-2018 --status 1
+#
+# Commands are parsed before SalesData (and with it pandas) is imported, and matplotlib is
+# only imported when a chart is drawn, so scripted runs without charts start quickly.
+# --timing reports how long importing, setting up the data set and the report took.
+#
+# Run with --profile to print a summary of the time, rows and bytes of every stage (and the
+# cache hits and misses) after each report. --profile=cprofile or --profile=tracemalloc also
+# profiles the report's functions or memory allocations.
+###########################################################################################
+
+import time
+startTime = time.perf_counter()
+
+import argparse
+import sys
+from SalesDataOptions import exportFormats, forecastModels, reportMethods, seriesKeys
+from SalesDataOptions import parsePositiveInteger, parseYearRange
+
+def intro():
+    print("""XYZ Corporation started in the begining of 2015 and has expanded across the eastern seaboard. 
+    They have expanded their customer base across that area and have maintained customer data from 2015-2018.
+    2019 data will be release shortly after the new year. This program provides access to that data and is 
+    organized in a variety of ways and in a variety of formats - spreadseets, charts and on screen info. 
+
+    Please select views of data through the menuing system below. Spreadsheets will be outputted to the folder
+    that this script exists in and their filenames will be outputted to the console. 
+
+    Enter q at any time to quit. Cheers!\n""")
+
+############################################################################################
+# Method to prompt user for Region Selection - Validates for selections of 1, 2, 3 or q only
+############################################################################################
+def getRegionSelection():
+    regions = { '1' : ['Northeast','NE'],  '2' : ['Middle Atlantic','MA'], '3' : ['Southeast','SE']}
+    regionSelection = ''
+    while (regionSelection != 'q'):
+        for key, value in regions.items():
+            print(key, value[0])
+        
+        regionSelection = input("Please select from the above regions: ")
+        if(regionSelection not in ['1', '2', '3']):
+            if(regionSelection != 'q'):
+                print("\nINVALID SELECTION!\n")
+            continue
+        else:
+            regionName = regions[regionSelection]
+            regionSelection = regionName[1]
+            break
+
+    return regionSelection
+
+############################################################################################
+# Method to prompt user for Start Year and End Year Selection - 
+# Validates for selections of years 2015-2018, q,  and for Start Year being less than End Year
+############################################################################################
+def getDateRangeSelection():
+    startDateSelection = ''
+    endDateSelection = ''
+    while (startDateSelection != 'q' and endDateSelection != 'q'):
+        startDateSelection = input("Please enter a start year in the range of 2015-2018: ")
+        endDateSelection = input("Please enter an end year in the range of 2015-2018: ")
+        if(startDateSelection not in ['2015', '2016', '2017', '2018'] or endDateSelection not in ['2015', '2016', '2017', '2018']):
+            if(startDateSelection != 'q' and endDateSelection != 'q'):
+                print("\nINVALID SELECTION!\n")
+            continue
+        elif int(startDateSelection) > int(endDateSelection):
+            print("\nSTART YEAR MUST BE BEFORE END YEAR")
+            continue
+        else:
+            break
+
+    return startDateSelection, endDateSelection
+
+############################################################################################
+# Method to prompt user for Customer Type Selection - Validates for selections of 1, 2, 3 or q only
+############################################################################################
+def getCustomerTypeSelection():
+    customerTypeSelection = ''
+    while (customerTypeSelection != 'q'):
+        customerTypeSelection = input("Please enter a Customer Type (1, 2, 3 or a for all): ")
+        if(customerTypeSelection not in ['1', '2', '3', 'a']):
+            if(customerTypeSelection != 'q'):
+                print("\nINVALID SELECTION!\n")
+            continue
+        else:
+            break
+
+    return customerTypeSelection
+
+
+############################################################################################
+# Method to prompt user for Process Selection - Validates for selections 
+# of 1, 2, 3, 4, 5 or q only
+############################################################################################
+def getProcessSelection():
+    processSelection = ''
+    while (processSelection != 'q'):
+        processSelection = input("""Please enter a Process to Run: 
+        1. Group Customer Data by State
+        2. Group Customer Data by Date
+        3. Count Customers Data by State
+        4. Max Weekly Customer Count
+        5. Totals relative to goals, Pct change to prior year, Next Year Forecast\n""")
+        if(processSelection not in ['1', '2', '3', '4', '5']):
+            if(processSelection != 'q'):
+                print("\nINVALID SELECTION!\n")
+            continue
+        else:
+            break
+
+    return processSelection
+
+############################################################################################
+# Method to take in several parameters to initialize and parameterize SalesData facade
+# regionSelection: NE, MA, SE variables to pass to SalesData
+# processTypeSelection: to determine which function within SalesData
+# startYearSelection: the beginning year for which to pull data from SalesData
+# endYearSelection: the end year for which to pull data from SalesData
+# customerTypeSelection: The customer type for which to pull data from SalesData
+############################################################################################
+def getSalesData(regionSelection, processTypeSelection, startYearSelection, endYearSelection, customerTypeSelection):
+    if(salesData.setYearRangeAndRegion(startYearSelection, endYearSelection, regionSelection) == True):
+        custType = 0
+        if(customerTypeSelection == 'a'):
+            custType = None
+        else:
+            custType = int(customerTypeSelection)
+
+        if(processTypeSelection == '1'):
+            salesData.exportGroupedByStateDate(custType)
+        elif(processTypeSelection == '2'):
+            salesData.exportGroupedByDateState(custType)
+        if(processTypeSelection == '3'):
+            salesData.exportCountByState(custType)
+        elif(processTypeSelection == '4'):
+            salesData.exportCountByDate(custType)
+        if(processTypeSelection == '5'):
+            salesData.annualGoals(custType)
+
+        if(profiling):
+            salesData.instrumentation.printSummary()
+            salesData.instrumentation.reset()
+
+############################################################################################
+# Method to read the --profile[=cprofile|tracemalloc] option from the command line. Returns
+# whether stage summaries should be printed and the profile mode
+############################################################################################
+def getProfileOption(arguments):
+    for argument in arguments:
+        if(argument == '--profile'):
+            return True, None
+        if(argument.startswith('--profile=')):
+            profileMode = argument[len('--profile='):]
+            if(profileMode in ['cprofile', 'tracemalloc']):
+                return True, profileMode
+            print("Unknown profile mode", profileMode, "- use cprofile or tracemalloc")
+            return True, None
+    return False, None
+
+
+############################################################################################
+## Method to kick off retrieval of options from the user in the interactive menu
+############################################################################################
+def runMenu(profilingOption, profileMode):
+    global salesData, profiling
+    import SalesData as sd
+
+    intro()
+    salesData = sd.SalesData()
+    profiling = profilingOption
+    salesData.instrumentation.setProfileMode(profileMode)
+    regionSelection = ''
+    processTypeSelection = ''
+    startYearSelection = ''
+    endYearSelection = ''
+    customerTypeSelection = ''
+    while((regionSelection != 'q') and (processTypeSelection != 'q') and (startYearSelection != 'q') and 
+    (endYearSelection != 'q') and (customerTypeSelection != 'q')):
+        print("\n\n")
+        regionSelection = getRegionSelection()
+        if(regionSelection != 'q'):
+            processTypeSelection = getProcessSelection()
+            if(processTypeSelection != 'q'):
+                startYearSelection, endYearSelection = getDateRangeSelection()
+                if(startYearSelection != 'q') and (endYearSelection != 'q'):
+                    customerTypeSelection = getCustomerTypeSelection()
+                    if(customerTypeSelection != 'q'):
+                        getSalesData(regionSelection, processTypeSelection, startYearSelection, endYearSelection, customerTypeSelection)
+
+############################################################################################
+# Method to build the command line parser, with a command per report plus forecast,
+# checkRollups and menu
+############################################################################################
+def getArgumentParser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--region', default='NE', choices=['NE', 'MA', 'SE'])
+    common.add_argument('--years', type=parseYearRange, default='2015-2018', help='year range of the data set, e.g. 2015-2018')
+    common.add_argument('--store', default=None, help='directory of a partitioned store to read the data set from')
+    common.add_argument('--print', dest='printData', action='store_true', help='print the data on screen')
+    common.add_argument('--timing', action='store_true', help='report the startup and run times')
+    common.add_argument('--profile', nargs='?', const='stages', choices=['stages', 'cprofile', 'tracemalloc'],
+                        help='print a summary of every stage, and profile with cprofile or tracemalloc')
+
+    parser = argparse.ArgumentParser(description='Run SalesData reports. Without a command the interactive menu '
+                                                 'is started')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    descriptions = {
+        'groupByStateDate': 'Group Customer Data by State',
+        'groupByDateState': 'Group Customer Data by Date',
+        'countByState': 'Count Customers Data by State',
+        'countByDate': 'Max Weekly Customer Count',
+        'annualGoals': 'Totals relative to goals, Pct change to prior year, Next Year Forecast'
+    }
+    for report in reportMethods:
+        command = commands.add_parser(report, parents=[common], help=descriptions[report])
+        command.add_argument('--status', default='a', choices=['a', '1', '2', '3'], help='customer type, a for all')
+        command.add_argument('--format', default='xlsx', choices=exportFormats, help='export format, none to skip it')
+        command.add_argument('--charts', default='none', choices=['png', 'svg', 'show', 'none'],
+                             help='save charts as png or svg files, show them on screen, or skip them (default)')
+        command.add_argument('--chart-directory', default='.')
+
+    command = commands.add_parser('forecast', parents=[common], help='Forecast yearly customer counts of every series')
+    command.add_argument('--horizons', type=parsePositiveInteger, default=3, help='years to forecast ahead')
+    command.add_argument('--models', nargs='+', default=None, choices=forecastModels,
+                         help='growth, movingAverage and/or linearTrend')
+    command.add_argument('--window', type=parsePositiveInteger, default=3, help='years in the moving average')
+    command.add_argument('--keys', nargs='*', default=seriesKeys, choices=seriesKeys, help='State and/or Status')
+
+    commands.add_parser('checkRollups', parents=[common],
+                        help='Check the week, month, quarter and year rollups against the data set')
+    commands.add_parser('menu', parents=[common], help='Start the interactive menu')
+    return parser
+
+############################################################################################
+# Method to run a command given on the command line. Returns the exit code
+############################################################################################
+def runCommand(args):
+    if(args.command == 'menu'):
+        runMenu(args.profile != None, None if args.profile == 'stages' else args.profile)
+        return 0
+
+    importStart = time.perf_counter()
+    import SalesData as sd
+    importSeconds = time.perf_counter() - importStart
+
+    setupStart = time.perf_counter()
+    salesData = sd.SalesData()
+    salesData.instrumentation.setProfileMode(None if args.profile in [None, 'stages'] else args.profile)
+    if(args.store != None):
+        salesData.setStore(args.store)
+    startYear, endYear = args.years
+    if(salesData.setYearRangeAndRegion(startYear, endYear, args.region) == False):
+        return 1
+    setupSeconds = time.perf_counter() - setupStart
+
+    reportStart = time.perf_counter()
+    if(args.command == 'forecast'):
+        df = salesData.forecast(args.horizons, args.models, args.keys, args.window)
+        print(df.to_string(index=False))
+    elif(args.command == 'checkRollups'):
+        df = salesData.checkRollups()
+        print(df)
+        if((df['Mismatches'] > 0).any()):
+            return 1
+    else:
+        if(salesData.setExportFormat(args.format) == False):
+            return 1
+        if(args.charts == 'show'):
+            salesData.setChartOutput(None)
+        elif(salesData.setChartOutput(None if args.charts == 'none' else args.chart_directory, args.charts) == False):
+            return 1
+        status = None if args.status == 'a' else int(args.status)
+        df = getattr(salesData, reportMethods[args.command])(status)
+        if(df is None):
+            return 1
+        if(args.printData):
+            print(df)
+    reportSeconds = time.perf_counter() - reportStart
+
+    if(args.profile != None):
+        salesData.instrumentation.printSummary()
+    if(args.timing):
+        print("Startup %.3fs (importing SalesData %.3fs), data set %.3fs, report %.3fs, total %.3fs" %
+              (importStart - startTime + importSeconds, importSeconds, setupSeconds, reportSeconds,
+               time.perf_counter() - startTime))
+    return 0
+
+############################################################################################
+# Method to start the interactive menu when there are no arguments (other than --profile),
+# or run the command given
+############################################################################################
+def main(arguments):
+    if(all(argument.startswith('--profile') for argument in arguments)):
+        runMenu(*getProfileOption(arguments))
+        return 0
+    return runCommand(getArgumentParser().parse_args(arguments))
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+###########################################################################################
+# Sales Data Rolling
+#
+# Trailing window metrics of weekly customer counts for many series at once (such as every
+# State x Status, see SalesDataCube.weeklySeries):
+#
+#   Sum<n>       - the total of the last n weeks, e.g. Sum4, Sum13 and Sum52
+#   Mean<n>      - the average of the last n weeks
+#   WeekOverWeek - the change from the week before
+#
+# Every window of every series comes from one running (cumulative) sum along the weeks, so
+# the cost is linear in the number of weeks no matter how many or how long the windows
+# are. A week without a full window behind it gets NaN, as a pandas rolling window would.
+#
+# The windows are kept between calls: update() takes only the weeks after the last week it
+# has seen and computes them from the last weeks it kept, so new weeks never recompute
+# the history.
+###########################################################################################
+
+import numpy
+import pandas as pd
+
+class SalesDataRollingWindows:
+
+    ############################################################################################
+    # windows are the trailing window lengths in weeks. keys are the series keys (State
+    # and/or Status) the caller gets weekly series for
+    ############################################################################################
+    def __init__(self, windows=[4, 13, 52], keys=['State', 'Status']):
+        if(len(windows) == 0 or any(int(window) < 1 for window in windows)):
+            raise ValueError("Please Enter Windows of at least 1 Week")
+        self.windows = sorted(set(int(window) for window in windows))
+        self.keys = list(keys)
+        self.lastDate = None
+        self.tail = None
+
+    ############################################################################################
+    # Method to get the names of the metric columns
+    ############################################################################################
+    def getMetricNames(self):
+        names = []
+        for window in self.windows:
+            names += ['Sum' + str(window), 'Mean' + str(window)]
+        return names + ['WeekOverWeek']
+
+    ############################################################################################
+    # Method to add the weekly series (a row per series, a column per week) of the weeks after
+    # the last week seen so far. Returns a tidy frame of the new weeks with the series keys,
+    # StatusDate, CustomerCount and a column per metric
+    ############################################################################################
+    def update(self, series):
+        dates = pd.DatetimeIndex(series.columns, name='StatusDate')
+        if(self.lastDate != None and len(dates) > 0 and dates[0] <= self.lastDate):
+            raise ValueError("Please Update with Weeks after " + str(self.lastDate.date()))
+
+        # put the kept weeks in front of the new ones, series new since then starting at 0
+        kept = 0
+        values = series.to_numpy(dtype='int64')
+        if(self.tail is not None):
+            tail = self.tail.reindex(series.index, fill_value=0)
+            kept = tail.shape[1]
+            values = numpy.hstack([tail.to_numpy(dtype='int64'), values])
+
+        # one running sum answers every window, the n weeks up to week i adding up to
+        # running[i + 1] - running[i + 1 - n]
+        running = numpy.zeros((values.shape[0], values.shape[1] + 1), dtype='int64')
+        numpy.cumsum(values, axis=1, out=running[:, 1:])
+        metrics = {}
+        for window in self.windows:
+            sums = numpy.full(values.shape, numpy.nan)
+            if(window <= values.shape[1]):
+                sums[:, window - 1:] = running[:, window:] - running[:, :-window]
+            metrics['Sum' + str(window)] = sums[:, kept:]
+            metrics['Mean' + str(window)] = sums[:, kept:] / window
+        changes = numpy.full(values.shape, numpy.nan)
+        changes[:, 1:] = values[:, 1:] - values[:, :-1]
+        metrics['WeekOverWeek'] = changes[:, kept:]
+
+        result = series.index.repeat(len(dates)).to_frame(index=False)
+        result['StatusDate'] = numpy.tile(dates.values, len(series.index))
+        result['CustomerCount'] = values[:, kept:].reshape(-1)
+        for name in self.getMetricNames():
+            result[name] = metrics[name].reshape(-1)
+
+        # keep just enough weeks for the longest window, and at least the last week for the
+        # next update's first WeekOverWeek
+        if(len(dates) > 0):
+            keep = min(max(self.windows[-1] - 1, 1), values.shape[1])
+            allDates = dates if self.tail is None else self.tail.columns.append(dates)
+            self.tail = pd.DataFrame(values[:, values.shape[1] - keep:], index=series.index,
+                                     columns=allDates[len(allDates) - keep:])
+            self.lastDate = dates[-1]
+        return result
@@ -0,0 +1,298 @@
+###########################################################################################
+# Sales Data Server
+#
+# Long running local HTTP server answering SalesData report requests as JSON. Each data set
+# (region and year range) is set up once in its own SalesData instance and kept warm: its
+# cube, clean data and report results stay cached in memory, so after the first request
+# reports are answered in milliseconds. Every request is handled on its own thread.
+# Requests for the same data set take turns on its lock, while requests for different data
+# sets run side by side.
+#
+#   GET /reports/<report>?region=NE&startYear=2015&endYear=2018&status=1
+#       the data of a report (see SalesData.reportTypes), status a or none for all
+#   GET /stats
+#       uptime, request counts and latencies per endpoint, and for every data set its
+#       result cache size, hits and misses and the time spent in each stage
+#
+# Example: python SalesDataServer.py --port 8080 --warm NE:2015-2018 MA:2016-2017
+###########################################################################################
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy
+import pandas as pd
+import SalesData as sd
+from SalesDataOptions import parseYearRange
+
+###########################################################################################
+# The warm data sets and request statistics shared by every request handler
+###########################################################################################
+class SalesDataService:
+    latencySamples = 1000
+
+    def __init__(self, storeDirectory=None):
+        self.storeDirectory = storeDirectory
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.dataSets = {}
+        self.regionLocks = {}
+        self.requests = {}
+
+    ############################################################################################
+    # Method to get the warm data set of a region and year range, setting it up (generating
+    # its data if needed) on first use. With a store the year ranges of a region share its
+    # partitions, so a region's data sets are set up one at a time. Raises ValueError for an
+    # invalid region or years
+    ############################################################################################
+    def getDataSet(self, region, startYear, endYear):
+        key = (region, str(startYear), str(endYear))
+        with self.lock:
+            dataSet = self.dataSets.get(key)
+            if(dataSet == None):
+                dataSet = {'salesData': sd.SalesData(), 'lock': threading.Lock(), 'ready': False}
+                self.dataSets[key] = dataSet
+            regionLock = self.regionLocks.setdefault(region, threading.Lock())
+
+        with dataSet['lock']:
+            if(dataSet['ready'] == False):
+                # a data set that fails to set up, or raises, is not kept
+                ready = None
+                try:
+                    if(self.storeDirectory != None):
+                        with regionLock:
+                            ready = self.__setUpDataSet(dataSet['salesData'], key)
+                    else:
+                        ready = self.__setUpDataSet(dataSet['salesData'], key)
+                finally:
+                    if(ready != True):
+                        with self.lock:
+                            if(self.dataSets.get(key) is dataSet):
+                                del self.dataSets[key]
+                if(ready == False):
+                    raise ValueError("Invalid region or year range: " + " ".join(key))
+                dataSet['ready'] = True
+        return dataSet
+
+    ############################################################################################
+    # Helper method to set up the SalesData instance of a data set. Returns False for an
+    # invalid region or year range
+    ############################################################################################
+    def __setUpDataSet(self, salesData, key):
+        if(self.storeDirectory != None):
+            salesData.setStore(self.storeDirectory)
+        return salesData.setYearRangeAndRegion(key[1], key[2], key[0])
+
+    ############################################################################################
+    # Method to load a data set ahead of any request and compute all of its reports, so even
+    # the first requests for it are answered from memory
+    ############################################################################################
+    def warm(self, region, startYear, endYear):
+        dataSet = self.getDataSet(region, startYear, endYear)
+        with dataSet['lock']:
+            salesData = dataSet['salesData']
+            salesData.prepareSalesData()
+            for report in sd.SalesData.reportTypes:
+                for status in [None, 1, 2, 3]:
+                    salesData.getReport(report, status)
+
+    ############################################################################################
+    # Method to get a report of a data set as a JSON ready dict with its rows as records.
+    # Raises ValueError for an unknown report or an invalid status
+    ############################################################################################
+    def getReport(self, report, region, startYear, endYear, status):
+        if(report not in sd.SalesData.reportTypes):
+            raise ValueError("Unknown report type: " + str(report))
+        if(status != None and status not in [1,2,3]):
+            raise ValueError("Invalid Status Value")
+
+        dataSet = self.getDataSet(region, startYear, endYear)
+        with dataSet['lock']:
+            df = dataSet['salesData'].getReport(report, status)
+
+        response = {'report': report, 'region': region, 'startYear': str(startYear), 'endYear': str(endYear),
+                    'status': status, 'rows': len(df.index), 'data': SalesDataService.getRecords(df)}
+        if(report == 'annualGoals'):
+            forecast = sd.SalesData.getNextYearForecast(df, int(endYear))
+            response['forecast'] = {'year': int(endYear) + 1,
+                                    'CustomerCount': None if pd.isna(forecast) else float(forecast)}
+        return response
+
+    ############################################################################################
+    # Method to get the uptime, request latencies and data set cache statistics
+    ############################################################################################
+    def getStats(self):
+        with self.lock:
+            dataSets = list(self.dataSets.items())
+            requests = [(endpoint, dict(stats), list(stats['latencies'])) for endpoint, stats in self.requests.items()]
+
+        stats = {'uptimeSeconds': time.time() - self.started, 'requests': {}, 'dataSets': []}
+        for endpoint, endpointStats, latencies in requests:
+            milliseconds = numpy.array(latencies) * 1000.0
+            stats['requests'][endpoint] = {
+                'count': endpointStats['count'],
+                'errors': endpointStats['errors'],
+                'meanMs': float(milliseconds.mean()),
+                'p50Ms': float(numpy.percentile(milliseconds, 50)),
+                'p95Ms': float(numpy.percentile(milliseconds, 95)),
+                'maxMs': float(milliseconds.max())
+            }
+
+        # the data sets' counters are copied without taking their locks, so a data set being
+        # set up or running a slow report does not hold up the stats. Each copy is taken in
+        # one step, so it is never of a half updated dict
+        for (region, startYear, endYear), dataSet in dataSets:
+            salesData = dataSet['salesData']
+            stages = list(salesData.instrumentation.stages.items())
+            stats['dataSets'].append({
+                'region': region, 'startYear': startYear, 'endYear': endYear,
+                'ready': dataSet['ready'],
+                'cubeLoaded': salesData.cube is not None,
+                'rollupsLoaded': sorted(list(salesData.rollups)),
+                'cachedResults': len(salesData.resultCache),
+                'cachedBytes': salesData.resultCache.totalBytes,
+                'cacheHits': salesData.resultCache.hits,
+                'cacheMisses': salesData.resultCache.misses,
+                'stages': {name: dict(totals) for name, totals in stages},
+                'counters': dict(salesData.instrumentation.counters)
+            })
+        return stats
+
+    ############################################################################################
+    # Method to record the latency of a request to an endpoint, keeping the latest
+    # latencySamples latencies of each endpoint
+    ############################################################################################
+    def recordRequest(self, endpoint, seconds, failed):
+        with self.lock:
+            stats = self.requests.get(endpoint)
+            if(stats == None):
+                stats = {'count': 0, 'errors': 0, 'latencies': deque(maxlen=SalesDataService.latencySamples)}
+                self.requests[endpoint] = stats
+            stats['count'] += 1
+            stats['errors'] += 1 if failed else 0
+            stats['latencies'].append(seconds)
+
+    ############################################################################################
+    # Method to get the rows of a frame, index included, as JSON ready records with dates in
+    # ISO format and missing values as None
+    ############################################################################################
+    @staticmethod
+    def getRecords(df):
+        if(df.index.nlevels == 1 and df.index.name == None):
+            df = df.rename_axis('Year' if df.index.dtype.kind == 'i' else 'index')
+        return json.loads(df.reset_index().to_json(orient='records', date_format='iso'))
+
+
+###########################################################################################
+# Handler of a single HTTP request. The service is the server's service attribute
+###########################################################################################
+class SalesDataRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        parameters = parse_qs(url.query)
+        endpoint = url.path
+        service = self.server.service
+
+        try:
+            if(url.path == '/stats'):
+                code, body = 200, service.getStats()
+            elif(url.path.startswith('/reports/')):
+                # only known reports get stats of their own, so clients can not add endpoints
+                report = url.path[len('/reports/'):]
+                if(report not in sd.SalesData.reportTypes):
+                    endpoint = 'unknown'
+                status = SalesDataRequestHandler.__getParameter(parameters, 'status', 'a')
+                code, body = 200, service.getReport(report,
+                                                    SalesDataRequestHandler.__getParameter(parameters, 'region', 'NE'),
+                                                    SalesDataRequestHandler.__getParameter(parameters, 'startYear', '2015'),
+                                                    SalesDataRequestHandler.__getParameter(parameters, 'endYear', '2018'),
+                                                    None if status in ['a', 'none'] else int(status))
+                body['milliseconds'] = (time.perf_counter() - start) * 1000.0
+            else:
+                endpoint = 'unknown'
+                code, body = 404, {'error': 'Unknown path: ' + url.path}
+        except ValueError as e:
+            code, body = 400, {'error': str(e)}
+        except Exception as e:
+            code, body = 500, {'error': repr(e)}
+
+        self.__sendJson(code, body)
+        service.recordRequest(endpoint, time.perf_counter() - start, code != 200)
+
+    ############################################################################################
+    # Only log requests when the server is verbose
+    ############################################################################################
+    def log_message(self, format, *args):
+        if(self.server.verbose):
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    ############################################################################################
+    # Helper methods to send a JSON response and to get a query string parameter
+    ############################################################################################
+    def __sendJson(self, code, body):
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    @staticmethod
+    def __getParameter(parameters, name, default):
+        values = parameters.get(name)
+        if(values == None or len(values) == 0):
+            return default
+        return values[0]
+
+
+############################################################################################
+# Helper method to parse a data set argument such as NE:2015-2018 into its region, start
+# year and end year
+############################################################################################
+def parseDataSet(value):
+    region, separator, years = value.partition(':')
+    if(region not in ['NE', 'MA', 'SE'] or separator == ''):
+        raise argparse.ArgumentTypeError("Data sets look like NE:2015-2018, with a region of NE, MA or SE")
+    startYear, endYear = parseYearRange(years)
+    return region, startYear, endYear
+
+############################################################################################
+# Method to create a server for the service on the given host and port, handling each
+# request on its own thread. Call serve_forever() on it to start serving
+############################################################################################
+def createServer(service, host='127.0.0.1', port=8080, verbose=False):
+    server = ThreadingHTTPServer((host, port), SalesDataRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve SalesData reports as JSON over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--store', default=None, help='directory of a partitioned store to read data sets from')
+    parser.add_argument('--warm', nargs='*', type=parseDataSet, default=[], help='data sets to load up front, e.g. NE:2015-2018')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    service = SalesDataService(args.store)
+    for region, startYear, endYear in args.warm:
+        start = time.perf_counter()
+        service.warm(region, startYear, endYear)
+        print("Warmed", region + ':' + startYear + '-' + endYear, "in %.3f seconds" % (time.perf_counter() - start))
+
+    server = createServer(service, args.host, args.port, args.verbose)
+    print("Serving SalesData reports on http://%s:%d" % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
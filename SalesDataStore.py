@@ -0,0 +1,293 @@
+###########################################################################################
+# Sales Data Store
+#
+# Partitioned on-disk store of cleaned sales data with one partition per region and year:
+#
+#   <store>/<region>/<year>/ - a columnar cache (see SalesDataCache) of the year's rows
+#
+# Each partition's meta.json holds its statistics (row count, first and last StatusDate
+# and states), so a year range, or a date range within it, is assembled from only the
+# partitions it needs and the others are pruned without being read. Overlapping year
+# ranges share partitions rather than each keeping its own copy of the data.
+#
+# Each partition also keeps the cube of its year and the cube's rollups (see
+# SalesDataCache.saveCubeToDirectory), and those of a year range are merged from them.
+###########################################################################################
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+import pandas as pd
+from SalesDataCache import SalesDataCache, SalesDataCacheWriter
+
+class SalesDataStore:
+
+    def __init__(self, directory='SalesDataStore'):
+        self.directory = directory
+
+    ############################################################################################
+    # Method to get the directory of a region and year's partition
+    ############################################################################################
+    def getPartitionDirectory(self, region, year):
+        return os.path.join(self.directory, region, str(year))
+
+    ############################################################################################
+    # Method to get the meta (statistics) of a region and year's partition, or None if the
+    # partition does not exist
+    ############################################################################################
+    def getPartitionMeta(self, region, year):
+        return SalesDataCache.readMeta(self.getPartitionDirectory(region, year))
+
+    ############################################################################################
+    # Method to check whether a region and year's partition exists
+    ############################################################################################
+    def hasPartition(self, region, year):
+        return self.getPartitionMeta(region, year) != None
+
+    ############################################################################################
+    # Method to list the (directory, meta) of the partitions holding rows of a region between
+    # startYear and endYear, and between minDate and maxDate when given. Other partitions are
+    # pruned on their statistics
+    ############################################################################################
+    def getPartitions(self, region, startYear, endYear, minDate=None, maxDate=None):
+        partitions = []
+        for year in range(int(startYear), int(endYear) + 1):
+            meta = self.getPartitionMeta(region, year)
+            if(meta == None or meta['rows'] == 0):
+                continue
+            if(minDate != None and meta['maxDate'] < pd.Timestamp(minDate).value):
+                continue
+            if(maxDate != None and meta['minDate'] > pd.Timestamp(maxDate).value):
+                continue
+            partitions.append((self.getPartitionDirectory(region, year), meta))
+        return partitions
+
+    ############################################################################################
+    # Method to get the statistics of every partition (of the given regions) as a frame with
+    # one row per partition
+    ############################################################################################
+    def getPartitionStats(self, regions=None):
+        columns = ['Region', 'Year', 'Rows', 'MinDate', 'MaxDate', 'States', 'Bytes']
+        if(regions == None):
+            regions = []
+            if(os.path.isdir(self.directory)):
+                regions = [entry.name for entry in os.scandir(self.directory) if entry.is_dir()]
+
+        stats = []
+        for region in sorted(regions):
+            regionDirectory = os.path.join(self.directory, region)
+            if(os.path.isdir(regionDirectory) == False):
+                continue
+            for year in sorted(os.listdir(regionDirectory)):
+                partitionDirectory = os.path.join(regionDirectory, year)
+                meta = SalesDataCache.readMeta(partitionDirectory)
+                if(meta == None):
+                    continue
+                size = sum(entry.stat().st_size for entry in os.scandir(partitionDirectory) if entry.is_file())
+                stats.append([region, int(year), meta['rows'], pd.Timestamp(meta['minDate']),
+                              pd.Timestamp(meta['maxDate']), len(meta['stateCategories']), size])
+        return pd.DataFrame(stats, columns=columns)
+
+    ############################################################################################
+    # Method to write the partitions of the given years from cleaned chunks (StatusDate index;
+    # State, Status and CustomerCount columns) in any order. Rows of other years are skipped
+    # and years without rows get an empty partition. Returns the years written
+    ############################################################################################
+    def writePartitions(self, region, chunks, stateCategories, dtypes, years):
+        years = [int(year) for year in years]
+        writers = {}
+        for chunk in chunks:
+            chunkYears = numpy.asarray(chunk.index.year)
+            for year in numpy.unique(chunkYears):
+                year = int(year)
+                if(year not in years):
+                    continue
+                if(year not in writers):
+                    writers[year] = SalesDataCacheWriter(None, region, year, year, stateCategories, dtypes,
+                                                         self.getPartitionDirectory(region, year))
+                writers[year].append(chunk[chunkYears == year])
+
+        for year in years:
+            if(year not in writers):
+                writers[year] = SalesDataCacheWriter(None, region, year, year, stateCategories, dtypes,
+                                                     self.getPartitionDirectory(region, year))
+        for writer in writers.values():
+            writer.close()
+        return sorted(writers.keys())
+
+    ############################################################################################
+    # Method to split an existing cleaned data set of a region into the partitions of the
+    # given years (every year in it if None). Returns the years written
+    ############################################################################################
+    def importDataSet(self, region, dataFrame, years=None):
+        if(years == None):
+            years = sorted(set(int(year) for year in dataFrame.index.year))
+        stateCategories = sorted(set(str(state) for state in dataFrame['State'].unique()))
+        dtypes = SalesDataCache.getColumnDtypes(dataFrame, stateCategories)
+        return self.writePartitions(region, [dataFrame], stateCategories, dtypes, years)
+
+    ############################################################################################
+    # Method to append cleaned rows of a region to the partitions of their years, creating
+    # partitions that do not exist yet. Returns the number of rows appended
+    ############################################################################################
+    def append(self, region, dataFrame):
+        dataYears = numpy.asarray(dataFrame.index.year)
+        for year in numpy.unique(dataYears):
+            rows = dataFrame[dataYears == year]
+            meta = self.getPartitionMeta(region, year)
+            if(meta == None):
+                self.importDataSet(region, rows, [year])
+            else:
+                SalesDataCache.appendToDirectory(rows, self.getPartitionDirectory(region, year), meta)
+        return len(dataFrame.index)
+
+    ############################################################################################
+    # Method to load the cleaned rows of a region between startYear and endYear (and between
+    # minDate and maxDate when given), reading only the partitions needed, on threads
+    ############################################################################################
+    def load(self, region, startYear, endYear, minDate=None, maxDate=None, threads=None):
+        partitions = self.getPartitions(region, startYear, endYear, minDate, maxDate)
+        stateCategories = SalesDataStore.__getStateCategories(partitions)
+
+        def readPartition(partition):
+            df = SalesDataStore.__setStateCategories(SalesDataCache.readFrame(*partition), stateCategories)
+            if(minDate != None or maxDate != None):
+                df = df[SalesDataStore.__getDateMask(df.index, minDate, maxDate)]
+            return df
+
+        if(len(partitions) <= 1):
+            frames = [readPartition(partition) for partition in partitions]
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                frames = list(pool.map(readPartition, partitions))
+
+        if(len(frames) == 0):
+            return SalesDataStore.__getEmptyFrame()
+        if(len(frames) == 1):
+            return frames[0]
+        return pd.concat(frames)
+
+    ############################################################################################
+    # Method to read just the given columns of a region's rows with one of the given States
+    # and Statuses and a StatusDate between minDate and maxDate (None for any), between
+    # startYear and endYear. Partitions are pruned on their dates and states, and the rest
+    # are scanned (see SalesDataCache.scanDirectory) on threads
+    ############################################################################################
+    def scan(self, region, startYear, endYear, columns, states=None, statuses=None, minDate=None, maxDate=None,
+             threads=None):
+        partitions = self.getPartitions(region, startYear, endYear, minDate, maxDate)
+        if(states != None):
+            states = [str(state) for state in states]
+            partitions = [partition for partition in partitions
+                          if len(set(partition[1]['stateCategories']) & set(states)) > 0]
+        stateCategories = SalesDataStore.__getStateCategories(partitions)
+
+        def scanPartition(partition):
+            df = SalesDataCache.scanDirectory(partition[0], partition[1], columns, states, statuses, minDate, maxDate)
+            if('State' in columns):
+                df = SalesDataStore.__setStateCategories(df, stateCategories)
+            return df
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            frames = list(pool.map(scanPartition, partitions))
+
+        if(len(frames) == 0):
+            df = SalesDataStore.__getEmptyFrame()
+            if('StatusDate' not in columns):
+                df = df.reset_index(drop=True)
+            return df[[name for name in df.columns if name in columns]]
+        if(len(frames) == 1):
+            return frames[0]
+        return pd.concat(frames, ignore_index='StatusDate' not in columns)
+
+    ############################################################################################
+    # Method to keep the cube of a region's rows between startYear and endYear in the
+    # partitions of those years, each partition getting the cube (and rollups) of its year
+    ############################################################################################
+    def saveCube(self, region, startYear, endYear, cube):
+        for partitionDirectory, meta in self.getPartitions(region, startYear, endYear):
+            year = int(meta['startYear'])
+            yearCube = cube.select(minDate=pd.Timestamp(year, 1, 1),
+                                   maxDate=pd.Timestamp(year + 1, 1, 1) - pd.Timedelta(1, 'ns'))
+            SalesDataCache.saveCubeToDirectory(yearCube, partitionDirectory, meta)
+
+    ############################################################################################
+    # Method to get the cube of a region's rows between startYear and endYear, or its rollup
+    # to a period (see SalesDataCube.periods), merged from the cubes kept in the partitions.
+    # Returns None if a partition does not have a cube of all its rows
+    ############################################################################################
+    def loadCube(self, region, startYear, endYear, period=None):
+        partitions = self.getPartitions(region, startYear, endYear)
+        if(len(partitions) == 0):
+            return None
+
+        cube = None
+        for partitionDirectory, meta in partitions:
+            partitionCube = SalesDataCache.loadCubeFromDirectory(partitionDirectory, meta, period)
+            if(partitionCube == None):
+                return None
+            cube = partitionCube if cube == None else cube.merge(partitionCube)
+        return cube
+
+    ############################################################################################
+    # Method to load several regions in parallel, one thread per region. Returns a dict of
+    # region to cleaned rows
+    ############################################################################################
+    def loadRegions(self, regions, startYear, endYear, minDate=None, maxDate=None, threads=None):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            frames = pool.map(lambda region: self.load(region, startYear, endYear, minDate, maxDate, 1), regions)
+            return dict(zip(regions, frames))
+
+    ############################################################################################
+    # Generator of the cleaned rows of a region between startYear and endYear in chunks of at
+    # most chunkRows rows, a partition at a time. Always yields at least one chunk
+    ############################################################################################
+    def loadChunks(self, region, startYear, endYear, chunkRows):
+        partitions = self.getPartitions(region, startYear, endYear)
+        if(len(partitions) == 0):
+            yield SalesDataStore.__getEmptyFrame()
+            return
+
+        stateCategories = SalesDataStore.__getStateCategories(partitions)
+        for partition in partitions:
+            for chunk in SalesDataCache.readChunks(partition[0], partition[1], chunkRows):
+                yield SalesDataStore.__setStateCategories(chunk, stateCategories)
+
+    ############################################################################################
+    # Helper methods to get the states of all the partitions, and to give a partition's
+    # State column those categories so partitions can be concatenated as categoricals
+    ############################################################################################
+    @staticmethod
+    def __getStateCategories(partitions):
+        stateCategories = set()
+        for partitionDirectory, meta in partitions:
+            stateCategories.update(meta['stateCategories'])
+        return sorted(stateCategories)
+
+    @staticmethod
+    def __setStateCategories(df, stateCategories):
+        if(list(df['State'].cat.categories) != stateCategories):
+            df['State'] = df['State'].cat.set_categories(stateCategories)
+        return df
+
+    ############################################################################################
+    # Helper method to get which dates lie between minDate and maxDate (either may be None)
+    ############################################################################################
+    @staticmethod
+    def __getDateMask(dates, minDate, maxDate):
+        mask = numpy.ones(len(dates), dtype=bool)
+        if(minDate != None):
+            mask &= dates >= pd.Timestamp(minDate)
+        if(maxDate != None):
+            mask &= dates <= pd.Timestamp(maxDate)
+        return mask
+
+    ############################################################################################
+    # Helper method to get a cleaned frame without any rows
+    ############################################################################################
+    @staticmethod
+    def __getEmptyFrame():
+        return pd.DataFrame({'State': pd.Categorical([]),
+                             'Status': numpy.empty(0, dtype='int8'),
+                             'CustomerCount': numpy.empty(0, dtype='int16')},
+                            index=pd.DatetimeIndex([], name='StatusDate'))
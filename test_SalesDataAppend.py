@@ -0,0 +1,84 @@
+###########################################################################################
+# Regression tests for appending rows to a data set: rows that can not be appended are
+# turned away and leave the data set (its columnar cache and cube) as it was
+###########################################################################################
+
+import numpy
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from SalesData import SalesData
+from SalesDataCache import SalesDataCache
+
+############################################################################################
+# Fixture of a small data set set up in its own directory
+############################################################################################
+@pytest.fixture
+def salesData(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    salesData = SalesData()
+    salesData.setYearRangeAndRegion('2016', '2016', 'SE', NumberOfSources=1)
+    salesData.prepareSalesData()
+    return salesData
+
+def getReports(salesData):
+    return [salesData.getReport(report, None) for report in ['countByState', 'groupByStateDate']]
+
+@pytest.mark.parametrize('rows', [
+    pd.DataFrame({'State': ['AA', None], 'Status': [1, 2], 'CustomerCount': [5, 6],
+                  'StatusDate': pd.to_datetime(['2016-05-02', '2016-05-02'])}),
+    pd.DataFrame({'State': ['GA', 'AA'], 'Status': [1, 2], 'CustomerCount': [5, numpy.nan],
+                  'StatusDate': pd.to_datetime(['2016-05-02', '2016-05-02'])}),
+    pd.DataFrame({'State': ['GA'], 'Status': [1], 'CustomerCount': [2.5],
+                  'StatusDate': pd.to_datetime(['2016-05-02'])})
+])
+def test_rejected_append_leaves_data_set(salesData, rows):
+    before = getReports(salesData)
+    assert salesData.appendSalesData(rows) == False
+
+    reopened = SalesData()
+    reopened.setYearRangeAndRegion('2016', '2016', 'SE')
+    for expected, actual in zip(before, getReports(reopened)):
+        pdt.assert_frame_equal(expected, actual)
+
+def test_append_to_directory_with_null_state_changes_nothing(salesData):
+    cacheDirectory = SalesDataCache.getCacheDirectory(salesData.excelFileName)
+    meta = SalesDataCache.readMeta(cacheDirectory)
+    before = SalesDataCache.readFrame(cacheDirectory, meta).copy()
+
+    rows = pd.DataFrame({'State': ['AA', None], 'Status': [1, 2], 'CustomerCount': [5, 6]},
+                        index=pd.DatetimeIndex(['2016-05-02', '2016-05-02'], name='StatusDate'))
+    with pytest.raises(ValueError):
+        SalesDataCache.appendToDirectory(rows, cacheDirectory, meta)
+
+    meta = SalesDataCache.readMeta(cacheDirectory)
+    pdt.assert_frame_equal(before, SalesDataCache.readFrame(cacheDirectory, meta))
+
+def test_append_new_state_keeps_other_states(salesData):
+    before = salesData.getReport('countByState', None)
+    rows = pd.DataFrame({'State': ['AA', 'GA'], 'Status': [1, 2], 'CustomerCount': [5, 6],
+                         'StatusDate': pd.to_datetime(['2016-05-02', '2016-05-02'])})
+    assert salesData.appendSalesData(rows)
+
+    reopened = SalesData()
+    reopened.setYearRangeAndRegion('2016', '2016', 'SE')
+    after = reopened.getReport('countByState', None)['CustomerCount']
+    after.index = after.index.astype(str)
+    expected = before['CustomerCount'].copy()
+    expected.index = expected.index.astype(str)
+    expected['GA'] += 6
+    expected['AA'] = 5
+    pdt.assert_series_equal(expected.sort_index(), after.sort_index(), check_names=False)
+
+def test_appended_rows_survive_a_changed_spreadsheet(salesData, capsys):
+    rows = pd.DataFrame({'State': ['GA'], 'Status': [1], 'CustomerCount': [5],
+                         'StatusDate': pd.to_datetime(['2016-05-02'])})
+    assert salesData.appendSalesData(rows)
+    expected = salesData.getReport('countByState', None)
+
+    with open(salesData.excelFileName, 'ab') as spreadsheet:
+        spreadsheet.write(b'changed')
+    reopened = SalesData()
+    reopened.setYearRangeAndRegion('2016', '2016', 'SE')
+    pdt.assert_frame_equal(expected, reopened.getReport('countByState', None))
+    assert 'appended rows' in capsys.readouterr().out
@@ -0,0 +1,51 @@
+###########################################################################################
+# Regression tests for the forecasting engine: each model's forecasts of small series
+# worked out by hand, NaN where a series has too few years, and bad arguments turned away
+###########################################################################################
+
+import numpy
+import pandas as pd
+import pytest
+import SalesDataForecast
+
+def getHistory():
+    return pd.DataFrame([[100.0, 110.0, 121.0], [10.0, 20.0, 30.0], [0.0, 0.0, 5.0]],
+                        index=pd.Index(['GA', 'NC', 'SC'], name='State'), columns=[2015, 2016, 2017])
+
+def getForecasts(df, model):
+    rows = df[df['Model'] == model]
+    return dict(((state, year), value) for state, year, value in zip(rows['State'], rows['Year'], rows['Forecast']))
+
+def test_frame_layout():
+    df = SalesDataForecast.forecast(getHistory(), horizons=2)
+    assert df.columns.tolist() == ['State', 'Model', 'Horizon', 'Year', 'Forecast']
+    assert len(df.index) == 3 * 2 * len(SalesDataForecast.forecastModels)
+    assert sorted(df['Year'].unique().tolist()) == [2018, 2019]
+
+@pytest.mark.parametrize('model, expected', [
+    ('growth', {('GA', 2018): 133.1, ('GA', 2019): 146.41, ('NC', 2018): 45.0, ('NC', 2019): 67.5}),
+    ('movingAverage', {('GA', 2018): 115.5, ('GA', 2019): 115.5, ('NC', 2018): 25.0, ('SC', 2018): 2.5}),
+    ('linearTrend', {('NC', 2018): 40.0, ('NC', 2019): 50.0, ('SC', 2018): 20.0 / 3})
+])
+def test_models(model, expected):
+    forecasts = getForecasts(SalesDataForecast.forecast(getHistory(), 2, [model], window=2), model)
+    for key, value in expected.items():
+        assert forecasts[key] == pytest.approx(value)
+
+def test_growth_without_customers_the_year_before_is_nan():
+    forecasts = getForecasts(SalesDataForecast.forecast(getHistory(), 1, ['growth']), 'growth')
+    assert numpy.isnan(forecasts[('SC', 2018)])
+
+def test_one_year_of_history():
+    df = SalesDataForecast.forecast(getHistory()[[2017]], 1)
+    assert df[df['Model'] != 'movingAverage']['Forecast'].isna().all()
+    assert getForecasts(df, 'movingAverage')[('GA', 2018)] == 121.0
+
+@pytest.mark.parametrize('arguments', [
+    {'models': ['noSuchModel']},
+    {'horizons': 0},
+    {'window': 0}
+])
+def test_bad_arguments(arguments):
+    with pytest.raises(ValueError):
+        SalesDataForecast.forecast(getHistory(), **arguments)
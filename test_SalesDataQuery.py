@@ -0,0 +1,72 @@
+###########################################################################################
+# Regression tests for the query planner: sums are answered from the coarsest rollup that
+# fits the query, then the cube, and other aggregations scan the rows, each giving the
+# same results as grouping the rows
+###########################################################################################
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from SalesData import SalesData
+from SalesDataCube import SalesDataCube
+
+############################################################################################
+# Fixture of a small data set of two years set up in its own directory
+############################################################################################
+@pytest.fixture
+def salesData(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    salesData = SalesData()
+    salesData.setYearRangeAndRegion('2016', '2017', 'SE', NumberOfSources=1)
+    return salesData
+
+def getExpected(salesData, keys, aggregation='sum', startDate=None, endDate=None, statuses=None):
+    df = salesData.scanSalesData().reset_index()
+    if(startDate != None):
+        df = df[df['StatusDate'] >= pd.Timestamp(startDate)]
+    if(endDate != None):
+        df = df[df['StatusDate'] <= pd.Timestamp(endDate)]
+    if(statuses != None):
+        df = df[df['Status'].isin(statuses)]
+    for key, period in zip(['Week', 'Month', 'Quarter', 'Year'], SalesDataCube.periods):
+        df[key] = SalesDataCube.getPeriodStarts(df['StatusDate'], period)
+    return df.groupby(keys, observed=True)['CustomerCount'].agg(aggregation)
+
+def normalize(series):
+    df = series.rename('CustomerCount').reset_index()
+    if('State' in df.columns):
+        df['State'] = df['State'].astype(str)
+    df['CustomerCount'] = df['CustomerCount'].astype('int64')
+    return df.sort_values(list(df.columns[:-1])).reset_index(drop=True)
+
+@pytest.mark.parametrize('keys, filters, plan', [
+    (['Year'], {}, 'rollup(year)'),
+    (['State'], {}, 'rollup(year)'),
+    (['State', 'Quarter'], {'statuses': [1, 2]}, 'rollup(quarter)'),
+    (['Year'], {'startDate': '2016-04-01'}, 'rollup(quarter)'),
+    (['Month'], {'startDate': '2016-04-01', 'endDate': '2016-06-30'}, 'rollup(month)'),
+    (['Year'], {'startDate': '2016-04-04'}, 'rollup(week)'),
+    (['Year'], {'startDate': '2016-04-06'}, 'cube'),
+    (['StatusDate', 'Status'], {}, 'cube')
+])
+def test_sums_are_planned_on_the_coarsest_rollup_that_fits(salesData, keys, filters, plan):
+    query = salesData.query().where(**filters).groupBy(*keys)
+    assert query.explain().split(':')[0] == plan
+
+    expected = getExpected(salesData, keys, **filters)
+    pdt.assert_frame_equal(normalize(expected), normalize(query.collect()['CustomerCount']))
+
+def test_other_aggregations_scan_the_rows(salesData):
+    query = salesData.query().where(statuses=3).groupBy('Quarter').aggregate('max')
+    assert query.getPlan() == 'scan'
+    expected = getExpected(salesData, ['Quarter'], 'max', statuses=[3])
+    pdt.assert_frame_equal(normalize(expected), normalize(query.collect()['CustomerCount']))
+
+def test_rollup_query_does_not_load_the_cube(salesData):
+    reopened = SalesData()
+    reopened.setYearRangeAndRegion('2016', '2017', 'SE')
+    result = reopened.query().groupBy('Year').collect()
+
+    assert reopened.cube is None
+    assert reopened.instrumentation.counters.get('rollupCacheHit') == 1
+    assert int(result['CustomerCount'].sum()) == int(salesData.scanSalesData()['CustomerCount'].sum())
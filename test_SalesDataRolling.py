@@ -0,0 +1,47 @@
+###########################################################################################
+# Regression tests for the rolling window metrics: they match pandas rolling windows, and
+# updating week by week gives the same metrics as one update of every week
+###########################################################################################
+
+import numpy
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from SalesDataRolling import SalesDataRollingWindows
+
+def getSeries():
+    dates = pd.date_range('2016-01-04', periods=8, freq='W-MON')
+    values = numpy.array([[5, 7, 0, 3, 9, 2, 4, 6], [1, 1, 2, 3, 5, 8, 13, 21]])
+    return pd.DataFrame(values, index=pd.Index(['GA', 'NC'], name='State'), columns=dates)
+
+def sortRows(df):
+    return df.sort_values(['State', 'StatusDate']).reset_index(drop=True)
+
+def test_metrics_match_pandas_rolling_windows():
+    series = getSeries()
+    result = sortRows(SalesDataRollingWindows([1, 3], ['State']).update(series))
+    for state, values in series.iterrows():
+        rows = result[result['State'] == state]
+        weekly = pd.Series(values.to_numpy(dtype='float64'))
+        for window in [1, 3]:
+            numpy.testing.assert_allclose(rows['Sum' + str(window)].to_numpy(),
+                                          weekly.rolling(window).sum().to_numpy())
+            numpy.testing.assert_allclose(rows['Mean' + str(window)].to_numpy(),
+                                          weekly.rolling(window).mean().to_numpy())
+        numpy.testing.assert_allclose(rows['WeekOverWeek'].to_numpy(), weekly.diff().to_numpy())
+
+@pytest.mark.parametrize('windows', [[1], [2, 4], [3, 13]])
+def test_updates_week_by_week_match_one_update(windows):
+    series = getSeries()
+    expected = sortRows(SalesDataRollingWindows(windows, ['State']).update(series))
+
+    rollingWindows = SalesDataRollingWindows(windows, ['State'])
+    updates = [rollingWindows.update(series.iloc[:, week:week + 1]) for week in range(len(series.columns))]
+    pdt.assert_frame_equal(expected, sortRows(pd.concat(updates, ignore_index=True)))
+
+def test_update_with_earlier_weeks_is_refused():
+    series = getSeries()
+    rollingWindows = SalesDataRollingWindows([4], ['State'])
+    rollingWindows.update(series.iloc[:, :4])
+    with pytest.raises(ValueError):
+        rollingWindows.update(series.iloc[:, 3:])
@@ -0,0 +1,82 @@
+###########################################################################################
+# Regression tests for the report server: bad requests get a 400 without leaving a data
+# set behind, only known reports get request stats of their own, and the stats are served
+# while a data set is busy
+###########################################################################################
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from SalesDataServer import SalesDataService, createServer
+
+############################################################################################
+# Fixture of a server on a free port serving from its own directory. Yields a function
+# getting a path, which returns the response code and JSON body
+############################################################################################
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = createServer(SalesDataService(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def get(path):
+        try:
+            with urllib.request.urlopen('http://127.0.0.1:%d%s' % (server.server_address[1], path)) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+    get.service = server.service
+    yield get
+    server.shutdown()
+    server.server_close()
+
+# a request is recorded after its response is sent, so wait for the given number of them
+def waitForRequests(service, count):
+    deadline = time.time() + 10
+    while(sum(stats['count'] for stats in list(service.requests.values())) < count and time.time() < deadline):
+        time.sleep(0.01)
+
+@pytest.mark.parametrize('path', [
+    '/reports/countByState?startYear=abc&endYear=2016',
+    '/reports/countByState?startYear=2016&endYear=2016&region=XX',
+    '/reports/countByState?startYear=2017&endYear=2016',
+    '/reports/countByState?startYear=2016&endYear=2016&status=4',
+    '/reports/countByState?startYear=2016&endYear=2016&status=x',
+    '/reports/noSuchReport?startYear=2016&endYear=2016'
+])
+def test_bad_requests_get_400_and_leave_no_data_set(server, path):
+    code, body = server(path)
+    assert code == 400
+    assert 'error' in body
+    assert server('/stats')[1]['dataSets'] == []
+
+def test_report_and_stats(server):
+    code, body = server('/reports/countByState?startYear=2016&endYear=2016&region=SE')
+    assert code == 200
+    assert body['rows'] == len(body['data']) > 0
+
+    waitForRequests(server.service, 1)
+    stats = server('/stats')[1]
+    assert [(dataSet['region'], dataSet['ready']) for dataSet in stats['dataSets']] == [('SE', True)]
+    assert stats['requests']['/reports/countByState']['count'] == 1
+
+def test_unknown_paths_share_one_stats_entry(server):
+    for path in ['/reports/a', '/reports/b?startYear=2016', '/reports/countByState/c', '/other']:
+        assert server(path)[0] in [400, 404]
+    waitForRequests(server.service, 4)
+    assert list(server('/stats')[1]['requests'].keys()) == ['unknown']
+    assert server.service.requests['unknown']['count'] == 4
+
+def test_stats_do_not_wait_for_a_busy_data_set(server):
+    dataSet = server.service.getDataSet('SE', '2016', '2016')
+    with dataSet['lock']:
+        result = []
+        thread = threading.Thread(target=lambda: result.append(server('/stats')))
+        thread.start()
+        thread.join(10)
+        assert thread.is_alive() == False
+    assert result[0][0] == 200
@@ -0,0 +1,70 @@
+###########################################################################################
+# Regression tests for the partitioned store: a data set is kept as one partition per
+# region and year, overlapping year ranges share them, and the store holds the same data
+# as the spreadsheet a region's years are split out of
+###########################################################################################
+
+import contextlib
+import io
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from SalesData import SalesData
+
+############################################################################################
+# Fixture of a store holding SE 2015-2017 in its own directory
+############################################################################################
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        salesData = getStoreSalesData('2015', '2017', NumberOfSources=1)
+    return salesData.store
+
+def getStoreSalesData(startYear, endYear, region='SE', **options):
+    salesData = SalesData()
+    salesData.setStore('SalesDataStore')
+    assert salesData.setYearRangeAndRegion(startYear, endYear, region, **options)
+    return salesData
+
+def getRows(salesData):
+    df = salesData.scanSalesData().reset_index()
+    df['State'] = df['State'].astype(str)
+    return df.sort_values(['StatusDate', 'State', 'Status', 'CustomerCount']).reset_index(drop=True)
+
+def test_a_partition_per_year(store):
+    stats = store.getPartitionStats()
+    assert stats['Region'].tolist() == ['SE', 'SE', 'SE']
+    assert stats['Year'].tolist() == [2015, 2016, 2017]
+    assert (stats['MinDate'].dt.year == stats['Year']).all()
+    assert (stats['MaxDate'].dt.year == stats['Year']).all()
+    assert stats['Rows'].sum() == getStoreSalesData('2015', '2017').prepareSalesData()
+
+def test_overlapping_ranges_share_partitions(store):
+    salesData = getStoreSalesData('2016', '2016')
+    assert salesData.instrumentation.stages.get('generate') == None
+    assert len(store.getPartitionStats().index) == 3
+
+    rows = getRows(getStoreSalesData('2015', '2017'))
+    expected = rows[rows['StatusDate'].dt.year == 2016].reset_index(drop=True)
+    pdt.assert_frame_equal(expected, getRows(salesData))
+
+def test_appended_rows_go_to_the_partition_of_their_year(store):
+    salesData = getStoreSalesData('2015', '2017')
+    rows = pd.DataFrame({'State': ['GA', 'FL'], 'Status': [1, 2], 'CustomerCount': [5, 6],
+                         'StatusDate': pd.to_datetime(['2015-06-01', '2017-06-05'])})
+    before = store.getPartitionStats()['Rows'].tolist()
+    assert salesData.appendSalesData(rows)
+    assert store.getPartitionStats()['Rows'].tolist() == [before[0] + 1, before[1], before[2] + 1]
+
+def test_store_splits_the_spreadsheet_of_a_region(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spreadsheet = SalesData()
+        spreadsheet.setYearRangeAndRegion('2016', '2017', 'MA', NumberOfSources=1)
+        salesData = getStoreSalesData('2017', '2017', 'MA')
+
+    assert salesData.instrumentation.stages.get('generate') == None
+    rows = getRows(spreadsheet)
+    expected = rows[rows['StatusDate'].dt.year == 2017].reset_index(drop=True)
+    pdt.assert_frame_equal(expected, getRows(salesData))